@@ -41,6 +41,26 @@ ROOT_HELPER_OPTS = [
     # rootwrap daemon command, which may be necessary for Xen?
     cfg.StrOpt('root_helper_daemon',
                help=_('Root helper daemon application to use when possible.')),
+    cfg.IntOpt('root_helper_daemon_pool_size', default=1, min=1,
+               help=_('Number of root helper daemon processes the commands '
+                      'run as root are dispatched to in turn. Each daemon '
+                      'executes concurrently the commands it is sent and is '
+                      'spawned when it is first used. Several daemons only '
+                      'help when a single daemon saturates a CPU.')),
+]
+
+COMMAND_ACCOUNTING_OPTS = [
+    cfg.BoolOpt('command_accounting', default=False,
+                help=_('Account the external commands executed by the agent: '
+                       'number of executions and failures, time spent and '
+                       'size of the input and output of the commands, per '
+                       'binary and per function of the agent executing '
+                       'them. The accounting is part of the Guru Meditation '
+                       'Report the agent produces when it receives '
+                       'SIGUSR2.')),
+    cfg.IntOpt('command_accounting_dump_interval', default=0, min=0,
+               help=_('Seconds between dumps of the accounting of the '
+                      'external commands to the log, 0 to disable them.')),
 ]
 
 AGENT_STATE_OPTS = [
@@ -79,6 +99,13 @@ PROCESS_MONITOR_OPTS = [
     cfg.IntOpt('check_child_processes_interval', default=60,
                help=_('Interval between checks of child process liveness '
                       '(seconds), use 0 to disable')),
+    cfg.IntOpt('check_child_processes_shards', default=1, min=1,
+               help=_('Number of shards the child processes are split into '
+                      'for their liveness checks. The processes of one '
+                      'shard are checked every check_child_processes_interval'
+                      ' / check_child_processes_shards seconds, spreading the '
+                      'checks of agents running many child processes over '
+                      'the interval instead of doing them all at once.')),
 ]
 
 AVAILABILITY_ZONE_OPTS = [
@@ -131,6 +158,10 @@ def register_root_helper(conf):
     conf.register_opts(ROOT_HELPER_OPTS, 'AGENT')
 
 
+def register_command_accounting_opts(conf):
+    conf.register_opts(COMMAND_ACCOUNTING_OPTS, 'AGENT')
+
+
 def register_agent_state_opts_helper(conf):
     conf.register_opts(AGENT_STATE_OPTS, 'AGENT')
 
@@ -15,6 +15,7 @@
 
 import collections
 import os
+import time
 
 import eventlet
 from neutron_lib import constants
@@ -24,6 +25,7 @@ from oslo_log import log as logging
 import oslo_messaging
 from oslo_service import loopingcall
 from oslo_utils import importutils
+from oslo_utils import timeutils
 
 from neutron._i18n import _, _LE, _LI, _LW
 from neutron.agent.linux import dhcp
@@ -35,10 +37,16 @@ from neutron.common import rpc as n_rpc
 from neutron.common import topics
 from neutron.common import utils
 from neutron import context
+from neutron.extensions import portbindings
 from neutron import manager
 
 LOG = logging.getLogger(__name__)
 
+# Port attributes with few distinct values, which the ports of the cache share
+# instead of storing a copy of them per port
+SHARED_PORT_ATTRIBUTES = ('status', 'device_owner', portbindings.HOST_ID,
+                          portbindings.VNIC_TYPE)
+
 
 class DhcpAgent(manager.Manager):
     """DHCP agent service manager.
@@ -70,6 +78,13 @@ class DhcpAgent(manager.Manager):
         self._process_monitor = external_process.ProcessMonitor(
             config=self.conf,
             resource_type='dhcp')
+        # Networks whose allocations reload is delayed, to coalesce the port
+        # notifications received meanwhile
+        self._pending_reloads = {}  # {network_id: PendingReload}
+        # Number of reloads saved by coalescing port notifications
+        self.reloads_saved = 0
+        # Seconds it took the last full sync to get all networks ready
+        self.last_sync_duration = None
 
     def init_host(self):
         self.sync_state()
@@ -149,14 +164,29 @@ class DhcpAgent(manager.Manager):
         """
         only_nets = set([] if (not networks or None in networks) else networks)
         LOG.info(_LI('Synchronizing state'))
+        watch = timeutils.StopWatch().start()
         pool = eventlet.GreenPool(self.conf.num_sync_threads)
         known_network_ids = set(self.cache.get_network_ids())
 
         try:
-            active_networks = self.plugin_rpc.get_active_networks_info()
+            # The networks with ports waiting for DHCP to be provisioned
+            # come first, they are configured first for their ports to
+            # become ready sooner
+            active_networks = None
+            try:
+                active_network_ids = self.plugin_rpc.get_active_network_ids()
+            except oslo_messaging.RemoteError as e:
+                if e.exc_type not in ('NoSuchMethod', 'UnsupportedVersion'):
+                    raise
+                LOG.info(_LI("Server does not support fetching networks in "
+                             "chunks, fetching all of them at once."))
+                active_networks = sorted(
+                    self.plugin_rpc.get_active_networks_info(),
+                    key=lambda network: not self._has_pending_ports(network))
+                active_network_ids = [network.id
+                                      for network in active_networks]
             LOG.info(_LI('All active networks have been fetched through RPC.'))
-            active_network_ids = set(network.id for network in active_networks)
-            for deleted_id in known_network_ids - active_network_ids:
+            for deleted_id in known_network_ids - set(active_network_ids):
                 try:
                     self.disable_dhcp_helper(deleted_id)
                 except Exception as e:
@@ -164,16 +194,25 @@ class DhcpAgent(manager.Manager):
                     LOG.exception(_LE('Unable to sync network state on '
                                       'deleted network %s'), deleted_id)
 
-            for network in active_networks:
+            network_ids = [
+                network_id for network_id in active_network_ids
                 if (not only_nets or  # specifically resync all
-                        network.id not in known_network_ids or  # missing net
-                        network.id in only_nets):  # specific network to sync
+                    network_id not in known_network_ids or  # missing net
+                    network_id in only_nets)]  # specific network to sync
+            for networks in self._iter_networks_info(network_ids,
+                                                     active_networks):
+                for network in networks:
                     pool.spawn(self.safe_configure_dhcp_for_network, network)
             pool.waitall()
             # we notify all ports in case some were created while the agent
             # was down
             self.dhcp_ready_ports |= set(self.cache.get_port_ids())
-            LOG.info(_LI('Synchronizing state complete'))
+            elapsed = watch.elapsed()
+            if not only_nets:
+                self.last_sync_duration = elapsed
+            LOG.info(_LI('Synchronizing state complete: %(count)d networks '
+                         'configured in %(elapsed).2f seconds'),
+                     {'count': len(network_ids), 'elapsed': elapsed})
 
         except Exception as e:
             if only_nets:
@@ -183,6 +222,36 @@ class DhcpAgent(manager.Manager):
                 self.schedule_resync(e)
             LOG.exception(_LE('Unable to sync network state.'))
 
+    @staticmethod
+    def _has_pending_ports(network):
+        """Check if ports of the network wait for DHCP to be provisioned."""
+        return any(port.get('status') == constants.PORT_STATUS_DOWN and
+                   not (port.get('device_owner') or '').startswith(
+                       constants.DEVICE_OWNER_NETWORK_PREFIX)
+                   for port in network.ports)
+
+    def _iter_networks_info(self, network_ids, active_networks=None):
+        """Yield the info of networks, in chunks fetched through RPC.
+
+        The networks are yielded in the order of network_ids, the server
+        returns those of a chunk in no particular order. The networks of a
+        chunk are configured by the sync pool while the next chunk is
+        fetched. active_networks, when the server does not support fetching
+        networks in chunks, already holds their info.
+        """
+        if active_networks is not None:
+            network_ids = set(network_ids)
+            yield [network for network in active_networks
+                   if network.id in network_ids]
+            return
+        chunk_size = self.conf.sync_networks_chunk_size
+        for i in range(0, len(network_ids), chunk_size):
+            chunk = network_ids[i:i + chunk_size]
+            positions = {network_id: position
+                         for position, network_id in enumerate(chunk)}
+            yield sorted(self.plugin_rpc.get_networks_info(chunk),
+                         key=lambda network: positions[network.id])
+
     def _dhcp_ready_ports_loop(self):
         """Notifies the server of any ports that had reservations setup."""
         while True:
@@ -390,8 +459,58 @@ class DhcpAgent(manager.Manager):
                 if old_ips != new_ips:
                     driver_action = 'restart'
             self.cache.put_port(updated_port)
-            self.call_driver(driver_action, network)
-            self.dhcp_ready_ports.add(updated_port.id)
+            if driver_action == 'reload_allocations':
+                self.reload_allocations(network, updated_port.id)
+            else:
+                self.call_driver(driver_action, network)
+                self.dhcp_ready_ports.add(updated_port.id)
+
+    def reload_allocations(self, network, port_id=None):
+        """Reload the allocations of a network after a port change.
+
+        When reload_allocations_delay is set, the reload is delayed until no
+        other port notification was received on the network for that delay,
+        or reload_allocations_max_delay after the first notification, and
+        the notifications received meanwhile are coalesced into one reload.
+        The changed port is reported as ready once the reload is done.
+        """
+        if self.conf.reload_allocations_delay <= 0:
+            self.call_driver('reload_allocations', network)
+            if port_id:
+                self.dhcp_ready_ports.add(port_id)
+            return
+
+        pending = self._pending_reloads.get(network.id)
+        if pending is None:
+            pending = self._pending_reloads[network.id] = PendingReload()
+            eventlet.spawn_n(self._delayed_reload_allocations, network.id)
+        pending.notified(port_id)
+
+    def _delayed_reload_allocations(self, network_id):
+        pending = self._pending_reloads[network_id]
+        while True:
+            reload_at = min(
+                pending.last_notified + self.conf.reload_allocations_delay,
+                pending.first_notified +
+                self.conf.reload_allocations_max_delay)
+            delay = reload_at - time.time()
+            if delay <= 0:
+                break
+            eventlet.sleep(delay)
+        self._reload_pending_allocations(network_id)
+
+    @utils.synchronized('dhcp-agent')
+    def _reload_pending_allocations(self, network_id):
+        pending = self._pending_reloads.pop(network_id)
+        network = self.cache.get_network_by_id(network_id)
+        if network:
+            self.call_driver('reload_allocations', network)
+        self.dhcp_ready_ports |= pending.port_ids
+        self.reloads_saved += pending.notifications - 1
+        LOG.debug("Reloaded allocations of network %(net)s once for "
+                  "%(count)d port notifications, %(saved)d reloads saved so "
+                  "far", {'net': network_id, 'count': pending.notifications,
+                          'saved': self.reloads_saved})
 
     def _is_port_on_this_agent(self, port):
         thishost = utils.get_dhcp_agent_device_id(
@@ -409,7 +528,7 @@ class DhcpAgent(manager.Manager):
         if port:
             network = self.cache.get_network_by_id(port.network_id)
             self.cache.remove_port(port)
-            self.call_driver('reload_allocations', network)
+            self.reload_allocations(network)
 
     def enable_isolated_metadata_proxy(self, network):
 
@@ -454,6 +573,21 @@ class DhcpAgent(manager.Manager):
             del self._metadata_routers[network.id]
 
 
+class PendingReload(object):
+    """Port notifications coalesced into a network allocations reload."""
+
+    def __init__(self):
+        self.first_notified = self.last_notified = time.time()
+        self.notifications = 0
+        self.port_ids = set()
+
+    def notified(self, port_id=None):
+        self.last_notified = time.time()
+        self.notifications += 1
+        if port_id:
+            self.port_ids.add(port_id)
+
+
 class DhcpPluginApi(object):
     """Agent side of the dhcp rpc API.
 
@@ -467,6 +601,7 @@ class DhcpPluginApi(object):
         1.1 - Added get_active_networks_info, create_dhcp_port,
               and update_dhcp_port methods.
         1.5 - Added dhcp_ready_on_ports
+        1.7 - Added get_active_network_ids and get_networks_info
 
     """
 
@@ -494,6 +629,19 @@ class DhcpPluginApi(object):
                               host=self.host)
         return [dhcp.NetModel(n) for n in networks]
 
+    def get_active_network_ids(self):
+        """Make a remote process call to retrieve the active networks."""
+        cctxt = self.client.prepare(version='1.7')
+        return cctxt.call(self.context, 'get_active_network_ids',
+                          host=self.host)
+
+    def get_networks_info(self, network_ids):
+        """Make a remote process call to retrieve many networks info."""
+        cctxt = self.client.prepare(version='1.7')
+        networks = cctxt.call(self.context, 'get_networks_info',
+                              network_ids=network_ids, host=self.host)
+        return [dhcp.NetModel(n) for n in networks]
+
     def get_network_info(self, network_id):
         """Make a remote process call to retrieve network info."""
         cctxt = self.client.prepare()
@@ -533,12 +681,21 @@ class DhcpPluginApi(object):
 
 
 class NetworkCache(object):
-    """Agent cache of the current network state."""
+    """Agent cache of the current network state.
+
+    The position of each port in the ports of its network is indexed, so
+    that ports are looked up, updated and removed without scanning the ports
+    of their network. To reduce the memory used by large numbers of ports,
+    the ports share the values they have in common with their network and
+    with the other ports of the cache instead of holding copies of them.
+    """
     def __init__(self):
         self.cache = {}
         self.subnet_lookup = {}
         self.port_lookup = {}
+        self.port_index = {}
         self.deleted_ports = set()
+        self._shared_values = {}
 
     def is_port_message_stale(self, payload):
         orig = self.get_port_by_id(payload['id'])
@@ -569,11 +726,15 @@ class NetworkCache(object):
 
         self.cache[network.id] = network
 
+        subnet_ids = {}
         for subnet in network.subnets:
             self.subnet_lookup[subnet.id] = network.id
+            subnet_ids[subnet.id] = subnet.id
 
-        for port in network.ports:
+        for index, port in enumerate(network.ports):
+            self._share_port_values(network, subnet_ids, port)
             self.port_lookup[port.id] = network.id
+            self.port_index[port.id] = index
 
     def remove(self, network):
         del self.cache[network.id]
@@ -583,33 +744,57 @@ class NetworkCache(object):
 
         for port in network.ports:
             del self.port_lookup[port.id]
+            self.port_index.pop(port.id, None)
+
+    def _share_port_values(self, network, subnet_ids, port):
+        """Replace port values by the equal values already in the cache."""
+        if port.get('network_id') == network.id:
+            port.network_id = network.id
+        tenant_id = network.get('tenant_id')
+        for key in ('tenant_id', 'project_id'):
+            if tenant_id and port.get(key) == tenant_id:
+                port[key] = tenant_id
+        for key in SHARED_PORT_ATTRIBUTES:
+            value = port.get(key)
+            if value is not None:
+                port[key] = self._shared_values.setdefault(value, value)
+        for fixed_ip in port.get('fixed_ips', []):
+            fixed_ip.subnet_id = subnet_ids.get(fixed_ip.subnet_id,
+                                                fixed_ip.subnet_id)
 
     def put_port(self, port):
         network = self.get_network_by_id(port.network_id)
-        for index in range(len(network.ports)):
-            if network.ports[index].id == port.id:
-                network.ports[index] = port
-                break
+        self._share_port_values(
+            network, {subnet.id: subnet.id for subnet in network.subnets},
+            port)
+        index = self.port_index.get(port.id)
+        if self.port_lookup.get(port.id) == network.id:
+            network.ports[index] = port
         else:
+            self.port_index[port.id] = len(network.ports)
             network.ports.append(port)
 
         self.port_lookup[port.id] = network.id
 
     def remove_port(self, port):
         network = self.get_network_by_port_id(port.id)
+        index = self.port_index[port.id]
+        if network.ports[index] != port:
+            return
 
-        for index in range(len(network.ports)):
-            if network.ports[index] == port:
-                del network.ports[index]
-                del self.port_lookup[port.id]
-                break
+        # The last port takes the place of the removed one, for the ports
+        # after it not to be moved
+        last_port = network.ports.pop()
+        if index < len(network.ports):
+            network.ports[index] = last_port
+            self.port_index[last_port.id] = index
+        del self.port_index[port.id]
+        del self.port_lookup[port.id]
 
     def get_port_by_id(self, port_id):
         network = self.get_network_by_port_id(port_id)
         if network:
-            for port in network.ports:
-                if port.id == port_id:
-                    return port
+            return network.ports[self.port_index[port_id]]
 
     def get_state(self):
         net_ids = self.get_network_ids()
@@ -651,6 +836,14 @@ class DhcpAgentWithStateReport(DhcpAgent):
         try:
             self.agent_state.get('configurations').update(
                 self.cache.get_state())
+            self.agent_state.get('configurations')[
+                'reload_allocations_saved'] = self.reloads_saved
+            self.agent_state.get('configurations')[
+                'respawned_processes'] = (
+                    self._process_monitor.get_respawn_counts())
+            if self.last_sync_duration is not None:
+                self.agent_state.get('configurations')[
+                    'last_sync_duration'] = round(self.last_sync_duration, 2)
             ctx = context.get_admin_context_without_session()
             agent_status = self.state_rpc.report_state(
                 ctx, self.agent_state, True)
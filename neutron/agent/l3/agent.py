@@ -39,6 +39,8 @@ from neutron.agent.l3 import l3_agent_extensions_manager as l3_ext_manager
 from neutron.agent.l3 import legacy_router
 from neutron.agent.l3 import namespace_manager
 from neutron.agent.l3 import namespaces
+from neutron.agent.l3 import router_digest
+from neutron.agent.l3 import router_metrics
 from neutron.agent.l3 import router_processing_queue as queue
 from neutron.agent.linux import external_process
 from neutron.agent.linux import ip_lib
@@ -95,6 +97,7 @@ class L3PluginApi(object):
               - delete_agent_gateway_port
         1.8 - Added address scope information
         1.9 - Added get_router_ids
+        1.10 - DVR support: added get_ports_by_subnets
     """
 
     def __init__(self, topic, host):
@@ -135,6 +138,12 @@ class L3PluginApi(object):
         return cctxt.call(context, 'get_ports_by_subnet', host=self.host,
                           subnet_id=subnet_id)
 
+    def get_ports_by_subnets(self, context, subnet_ids):
+        """Retrieve the ports of several subnets, grouped by subnet id."""
+        cctxt = self.client.prepare(version='1.10')
+        return cctxt.call(context, 'get_ports_by_subnets', host=self.host,
+                          subnet_ids=subnet_ids)
+
     def get_agent_gateway_port(self, context, fip_net):
         """Get or create an agent_gateway_port."""
         cctxt = self.client.prepare(version='1.2')
@@ -183,8 +192,10 @@ class L3NATAgent(ha.AgentMixin,
         1.3 - fipnamespace_delete_on_ext_net - to delete fipnamespace
               after the external network is removed
               Needed by the L3 service when dealing with DVR
+        1.4 - routers_delta_updated - to apply revisioned floating IP
+              changes without resyncing the whole router
     """
-    target = oslo_messaging.Target(version='1.3')
+    target = oslo_messaging.Target(version='1.4')
 
     def __init__(self, host, conf=None):
         if conf:
@@ -247,6 +258,14 @@ class L3NATAgent(ha.AgentMixin,
             self.metadata_driver)
 
         self._queue = queue.RouterProcessingQueue()
+        self.router_digests = None
+        if self.conf.persist_router_digests:
+            self.router_digests = router_digest.RouterDigestCache(
+                self.conf.state_path)
+        self.router_metrics = None
+        if self.conf.enable_router_metrics:
+            self.router_metrics = router_metrics.RouterMetrics()
+            eventlet.spawn(self._start_router_metrics_server)
         super(L3NATAgent, self).__init__(host=self.conf.host)
 
         self.target_ex_net_id = None
@@ -258,6 +277,11 @@ class L3NATAgent(ha.AgentMixin,
                                       self.create_pd_router_update,
                                       self.conf)
 
+    def _start_router_metrics_server(self):
+        metrics_server = router_metrics.RouterMetricsServer(
+            self.router_metrics, self._queue, self.conf)
+        metrics_server.run()
+
     def _check_config_params(self):
         """Check items in configuration files.
 
@@ -342,6 +366,9 @@ class L3NATAgent(ha.AgentMixin,
         return legacy_router.LegacyRouter(*args, **kwargs)
 
     def _router_added(self, router_id, router):
+        # Prevent the background cleanup of stale namespaces from deleting
+        # the namespaces of the router
+        self.namespaces_manager.keep_router(router_id)
         ri = self._create_router(router_id, router)
         registry.notify(resources.ROUTER, events.BEFORE_CREATE,
                         self, router=ri)
@@ -375,6 +402,10 @@ class L3NATAgent(ha.AgentMixin,
 
         ri.delete(self)
         del self.router_info[router_id]
+        if self.router_digests:
+            self.router_digests.remove(router_id)
+        if self.router_metrics:
+            self.router_metrics.remove_router(router_id)
 
         registry.notify(resources.ROUTER, events.AFTER_DELETE, self, router=ri)
 
@@ -406,6 +437,16 @@ class L3NATAgent(ha.AgentMixin,
                 update = queue.RouterUpdate(id, queue.PRIORITY_RPC)
                 self._queue.add(update)
 
+    def routers_delta_updated(self, context, deltas):
+        """Deal with incremental routers modification RPC message."""
+        LOG.debug('Got routers delta updated notification :%s', deltas)
+        for delta in deltas:
+            update = queue.RouterUpdate(delta['router_id'],
+                                        queue.PRIORITY_RPC,
+                                        action=queue.DELTA_ROUTER,
+                                        delta=delta)
+            self._queue.add(update)
+
     def router_removed_from_agent(self, context, payload):
         LOG.debug('Got router removed from agent :%r', payload)
         router_id = payload['router_id']
@@ -444,11 +485,38 @@ class L3NATAgent(ha.AgentMixin,
         else:
             self._process_updated_router(router)
 
+    def _store_router_digest(self, router):
+        if self.router_digests:
+            try:
+                self.router_digests.update(router)
+            except (IOError, OSError):
+                LOG.exception(_LE("Failed to store the digest of router %s"),
+                              router['id'])
+
+    def _process_router_info(self, ri, process):
+        """Run process(agent) for a router, measuring its phases."""
+        ri.phase_timer.reset()
+        watch = timeutils.StopWatch().start()
+        try:
+            process(self)
+        finally:
+            if self.router_metrics:
+                self.router_metrics.record_processing(
+                    ri.router_id, watch.elapsed(), ri.phase_timer.timings)
+
     def _process_added_router(self, router):
         self._router_added(router['id'], router)
         ri = self.router_info[router['id']]
         ri.router = router
-        ri.process(self)
+        # A router processed with the same configuration before the agent
+        # restarted keeps the state it left on the system
+        if (self.router_digests and
+                self.router_digests.is_unchanged(router) and ri.adopt()):
+            LOG.debug("Configuration of router %s is unchanged since it was "
+                      "last processed, adopted its state", router['id'])
+        else:
+            self._process_router_info(ri, ri.process)
+            self._store_router_digest(router)
         registry.notify(resources.ROUTER, events.AFTER_CREATE, self, router=ri)
         self.l3_ext_manager.add_router(self.context, router)
 
@@ -457,25 +525,92 @@ class L3NATAgent(ha.AgentMixin,
         ri.router = router
         registry.notify(resources.ROUTER, events.BEFORE_UPDATE,
                         self, router=ri)
-        ri.process(self)
+        self._process_router_info(ri, ri.process)
+        self._store_router_digest(router)
         registry.notify(resources.ROUTER, events.AFTER_UPDATE, self, router=ri)
         self.l3_ext_manager.update_router(self.context, router)
 
+    def _apply_router_delta(self, delta):
+        """Apply a router delta on top of the cached router.
+
+        Returns False when the delta does not apply to the cached revision
+        of the router and the whole router must be fetched instead.
+        """
+        ri = self.router_info.get(delta['router_id'])
+        if not ri or ri.router.get('distributed') or ri.adopted:
+            # an adopted router must be processed as a whole
+            return False
+        revision = ri.router.get('revision_number')
+        if revision is None:
+            return False
+        if delta['revision_number'] <= revision:
+            LOG.debug("Ignoring router %(id)s delta for revision %(rev)s, "
+                      "revision %(cur)s is already processed",
+                      {'id': ri.router_id, 'rev': delta['revision_number'],
+                       'cur': revision})
+            return True
+        if delta['revision_number'] != revision + 1:
+            LOG.debug("Missed router %(id)s revisions between %(cur)s and "
+                      "%(rev)s, resyncing it",
+                      {'id': ri.router_id, 'rev': delta['revision_number'],
+                       'cur': revision})
+            return False
+
+        fip = delta['floatingip']
+        floating_ips = [f for f in ri.get_floating_ips()
+                        if f['id'] != fip['id']]
+        if delta['type'] == l3_constants.ROUTER_DELTA_FLOATINGIP_ADDED:
+            floating_ips.append(fip)
+        elif delta['type'] != l3_constants.ROUTER_DELTA_FLOATINGIP_REMOVED:
+            return False
+        router = dict(ri.router)
+        router[lib_const.FLOATINGIP_KEY] = floating_ips
+        router['revision_number'] = delta['revision_number']
+        ri.router = router
+        registry.notify(resources.ROUTER, events.BEFORE_UPDATE,
+                        self, router=ri)
+        self._process_router_info(ri, ri.process_floating_ips)
+        self._store_router_digest(router)
+        registry.notify(resources.ROUTER, events.AFTER_UPDATE, self, router=ri)
+        self.l3_ext_manager.update_router(self.context, router)
+        return True
+
     def _resync_router(self, router_update,
                        priority=queue.PRIORITY_SYNC_ROUTERS_TASK):
         router_update.timestamp = timeutils.utcnow()
         router_update.priority = priority
         router_update.router = None  # Force the agent to resync the router
+        if self.router_metrics:
+            self.router_metrics.record_resync(router_update.id)
         self._queue.add(router_update)
 
+    def _record_queue_wait(self, update):
+        if self.router_metrics and update.enqueued_at:
+            self.router_metrics.record_queue_wait(
+                update.priority,
+                timeutils.delta_seconds(update.enqueued_at,
+                                        timeutils.utcnow()))
+
     def _process_router_update(self):
         for rp, update in self._queue.each_update_to_next_router():
             LOG.debug("Starting router update for %s, action %s, priority %s",
                       update.id, update.action, update.priority)
+            self._record_queue_wait(update)
             if update.action == queue.PD_UPDATE:
                 self.pd.process_prefix_update()
                 LOG.debug("Finished a router update for %s", update.id)
                 continue
+            if update.action == queue.DELTA_ROUTER:
+                try:
+                    applied = self._apply_router_delta(update.delta)
+                except Exception:
+                    LOG.exception(_LE("Failed to apply delta to router %s"),
+                                  update.id)
+                    applied = False
+                if applied:
+                    LOG.debug("Finished a router update for %s", update.id)
+                    continue
+                # fall back to fetching and processing the whole router
             router = update.router
             if update.action != queue.DELETE_ROUTER and not router:
                 try:
@@ -624,6 +759,9 @@ class L3NATAgent(ha.AgentMixin,
                                         action=queue.DELETE_ROUTER)
             self._queue.add(update)
 
+        if self.router_digests:
+            self.router_digests.remove_stale(curr_router_ids)
+
     @property
     def context(self):
         # generate a new request-id on each call to make server side tracking
@@ -695,6 +833,8 @@ class L3NATAgentWithStateReport(L3NATAgent):
         configurations['ex_gw_ports'] = num_ex_gw_ports
         configurations['interfaces'] = num_interfaces
         configurations['floating_ips'] = num_floating_ips
+        configurations['respawned_processes'] = (
+            self.process_monitor.get_respawn_counts())
         try:
             agent_status = self.state_rpc.report_state(self.context,
                                                        self.agent_state,
@@ -14,6 +14,8 @@
 
 import weakref
 
+import oslo_messaging
+
 from neutron.agent.l3 import dvr_fip_ns
 from neutron.agent.l3 import dvr_snat_ns
 
@@ -49,6 +51,18 @@ class AgentMixin(object):
     def get_ports_by_subnet(self, subnet_id):
         return self.plugin_rpc.get_ports_by_subnet(self.context, subnet_id)
 
+    def get_ports_by_subnets(self, subnet_ids):
+        """Return a dict mapping each subnet id to the list of its ports."""
+        try:
+            return self.plugin_rpc.get_ports_by_subnets(self.context,
+                                                        subnet_ids)
+        except oslo_messaging.RemoteError as e:
+            if e.exc_type != 'UnsupportedVersion':
+                raise
+            # The server does not support the bulk call yet
+            return {subnet_id: self.get_ports_by_subnet(subnet_id)
+                    for subnet_id in subnet_ids}
+
     def _update_arp_entry(self, context, payload, action):
         router_id = payload['router_id']
         ri = self.router_info.get(router_id)
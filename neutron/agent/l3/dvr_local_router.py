@@ -48,6 +48,9 @@ class DvrLocalRouter(dvr_router_base.DvrRouterBase):
         self.dist_fip_count = None
         self.fip_ns = None
         self._pending_arp_set = set()
+        # Ports of the subnets attached to new internal ports, fetched
+        # with a single RPC while the internal ports are processed.
+        self._subnet_ports = {}
 
     def get_floating_ips(self):
         """Filter Floating IPs to be hosted on this agent."""
@@ -245,21 +248,85 @@ class DvrLocalRouter(dvr_router_base.DvrRouterBase):
             with excutils.save_and_reraise_exception():
                 LOG.exception(_LE("DVR: Failed updating arp entry"))
 
+    @staticmethod
+    def _get_permanent_arp_entries(device, ip_versions):
+        """Return the permanent neighbor entries of a device as ip -> mac."""
+        entries = {}
+        for ip_version in ip_versions:
+            output = device.neigh.show(ip_version)
+            for line in output.splitlines():
+                fields = line.split()
+                if 'PERMANENT' in fields and 'lladdr' in fields[1:-1]:
+                    entries[fields[0]] = fields[fields.index('lladdr') + 1]
+        return entries
+
+    def _add_arp_entries(self, arp_entries, subnet_id):
+        """Add the ARP entries of a subnet missing in the router namespace.
+
+        The device lookup and the neighbor table read are done once for the
+        subnet, only the entries which are missing or point to another MAC
+        are programmed.
+        """
+        port = self._get_internal_port(subnet_id)
+        # update arp entry only if the subnet is attached to the router
+        if not port or not arp_entries:
+            return
+
+        try:
+            interface_name = self.get_internal_device_name(port['id'])
+            device = ip_lib.IPDevice(interface_name, namespace=self.ns_name)
+            if not device.exists():
+                LOG.warning(_LW("Device %s does not exist so ARP entries "
+                                "cannot be updated, will cache "
+                                "information to be applied later "
+                                "when the device exists"),
+                            device)
+                for ip, mac in arp_entries:
+                    self._cache_arp_entry(ip, mac, subnet_id, 'add')
+                return
+
+            ip_versions = set(ip_lib.get_ip_version(ip)
+                              for ip, mac in arp_entries)
+            current = self._get_permanent_arp_entries(device, ip_versions)
+            for ip, mac in arp_entries:
+                if current.get(ip) != mac:
+                    device.neigh.add(ip, mac)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                LOG.exception(_LE("DVR: Failed updating arp entry"))
+
     def _set_subnet_arp_info(self, subnet_id):
         """Set ARP info retrieved from Plugin for existing ports."""
-        # TODO(Carl) Can we eliminate the need to make this RPC while
-        # processing a router.
-        subnet_ports = self.agent.get_ports_by_subnet(subnet_id)
+        subnet_ports = self._subnet_ports.get(subnet_id)
+        if subnet_ports is None:
+            # TODO(Carl) Can we eliminate the need to make this RPC while
+            # processing a router.
+            subnet_ports = self.agent.get_ports_by_subnet(subnet_id)
 
+        arp_entries = []
         for p in subnet_ports:
             if p['device_owner'] not in lib_constants.ROUTER_INTERFACE_OWNERS:
                 for fixed_ip in p['fixed_ips']:
-                    self._update_arp_entry(fixed_ip['ip_address'],
-                                           p['mac_address'],
-                                           subnet_id,
-                                           'add')
+                    arp_entries.append((fixed_ip['ip_address'],
+                                        p['mac_address']))
+        self._add_arp_entries(arp_entries, subnet_id)
         self._process_arp_cache_for_internal_port(subnet_id)
 
+    def _process_internal_ports(self, pd):
+        existing_port_ids = set(p['id'] for p in self.internal_ports)
+        subnet_ids = set(
+            subnet['id']
+            for p in self.router.get(lib_constants.INTERFACE_KEY, [])
+            if p['admin_state_up'] and p['id'] not in existing_port_ids
+            for subnet in p['subnets'])
+        if subnet_ids:
+            self._subnet_ports = self.agent.get_ports_by_subnets(
+                list(subnet_ids))
+        try:
+            super(DvrLocalRouter, self)._process_internal_ports(pd)
+        finally:
+            self._subnet_ports = {}
+
     @staticmethod
     def _get_snat_idx(ip_cidr):
         """Generate index for DVR snat rules and route tables.
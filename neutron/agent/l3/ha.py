@@ -14,13 +14,14 @@
 #    under the License.
 
 import os
+import time
 
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 import webob
 
-from neutron._i18n import _, _LI
+from neutron._i18n import _, _LE, _LI
 from neutron.agent.linux import keepalived
 from neutron.agent.linux import utils as agent_utils
 from neutron.common import utils as common_utils
@@ -45,6 +46,13 @@ OPTS = [
     cfg.IntOpt('ha_vrrp_advert_int',
                default=2,
                help=_('The advertisement interval in seconds')),
+    cfg.IntOpt('ha_state_change_workers',
+               default=8, min=1,
+               help=_('Number of HA routers whose state transition (metadata '
+                      'proxy, radvd and gateway router advertisements '
+                      'reconfiguration) is handled concurrently. Raising it '
+                      'shortens failovers of nodes hosting many HA '
+                      'routers.')),
 ]
 
 
@@ -93,6 +101,14 @@ class AgentMixin(object):
         super(AgentMixin, self).__init__(host)
         self.state_change_notifier = batch_notifier.BatchNotifier(
             self._calculate_batch_duration(), self.notify_server)
+        self._state_change_pool = eventlet.GreenPool(
+            self.conf.ha_state_change_workers)
+        # Latest transition (state, notification time) not yet handled, per
+        # router, and routers whose transitions are being handled.
+        self._pending_state_changes = {}
+        self._routers_changing_state = set()
+        # Notification time of the transitions not yet reported to the server
+        self._state_change_times = {}
         eventlet.spawn(self._start_keepalived_notifications_server)
 
     def _start_keepalived_notifications_server(self):
@@ -115,19 +131,56 @@ class AgentMixin(object):
                  {'router_id': router_id,
                   'state': state})
 
+        if router_id not in self.router_info:
+            LOG.info(_LI('Router %s is not managed by this agent. It was '
+                         'possibly deleted concurrently.'), router_id)
+            return
+
+        # Transitions of a router which are queued while a previous one is
+        # being handled are grouped: only the latest state is applied.
+        # Transitions of different routers are handled concurrently.
+        if router_id in self._pending_state_changes:
+            notified_at = self._pending_state_changes[router_id][1]
+        else:
+            notified_at = time.time()
+        self._pending_state_changes[router_id] = (state, notified_at)
+        if router_id in self._routers_changing_state:
+            return
+        self._routers_changing_state.add(router_id)
+        self._state_change_pool.spawn_n(self._handle_state_changes, router_id)
+
+    def _handle_state_changes(self, router_id):
         try:
-            ri = self.router_info[router_id]
-        except KeyError:
+            while router_id in self._pending_state_changes:
+                state, notified_at = self._pending_state_changes.pop(
+                    router_id)
+                self._handle_state_change(router_id, state, notified_at)
+        finally:
+            self._routers_changing_state.discard(router_id)
+
+    def _handle_state_change(self, router_id, state, notified_at):
+        ri = self.router_info.get(router_id)
+        if ri is None:
             LOG.info(_LI('Router %s is not managed by this agent. It was '
                          'possibly deleted concurrently.'), router_id)
             return
 
-        self._configure_ipv6_ra_on_ext_gw_port_if_necessary(ri, state)
-        if self.conf.enable_metadata_proxy:
-            self._update_metadata_proxy(ri, router_id, state)
-        self._update_radvd_daemon(ri, state)
+        try:
+            self._configure_ipv6_ra_on_ext_gw_port_if_necessary(ri, state)
+            if self.conf.enable_metadata_proxy:
+                self._update_metadata_proxy(ri, router_id, state)
+            self._update_radvd_daemon(ri, state)
+        except Exception:
+            LOG.exception(_LE('Failed to handle the transition of router '
+                              '%(router_id)s to %(state)s'),
+                          {'router_id': router_id, 'state': state})
+        self._state_change_times.setdefault(router_id, notified_at)
         self.state_change_notifier.queue_event((router_id, state))
 
+    def wait_state_changes(self):
+        """Wait until all queued transitions have been handled."""
+        self._state_change_pool.waitall()
+
     def _configure_ipv6_ra_on_ext_gw_port_if_necessary(self, ri, state):
         # If ipv6 is enabled on the platform, ipv6_gateway config flag is
         # not set and external_network associated to the router does not
@@ -167,10 +220,29 @@ class AgentMixin(object):
                            'fault': 'standby'}
         translated_states = dict((router_id, translation_map[state]) for
                                  router_id, state in batched_events)
+        notified_at = dict((router_id,
+                            self._state_change_times.pop(router_id, None))
+                           for router_id in translated_states)
         LOG.debug('Updating server with HA routers states %s',
                   translated_states)
         self.plugin_rpc.update_ha_routers_states(
             self.context, translated_states)
+        self._log_failover_times(translated_states, notified_at)
+
+    @staticmethod
+    def _log_failover_times(translated_states, notified_at):
+        now = time.time()
+        failover_times = [now - notified_at[router_id]
+                          for router_id, state in translated_states.items()
+                          if state == 'active' and notified_at[router_id]]
+        if failover_times:
+            LOG.info(_LI('Reported %(count)d HA routers active to the '
+                         'server, %(max).2f seconds at most after their '
+                         'transition was notified by keepalived '
+                         '(%(avg).2f seconds on average)'),
+                     {'count': len(failover_times),
+                      'max': max(failover_times),
+                      'avg': sum(failover_times) / len(failover_times)})
 
     def _init_ha_conf_path(self):
         ha_full_path = os.path.dirname("/%s/" % self.conf.ha_confs_path)
@@ -388,7 +388,16 @@ class HaRouter(router.RouterInfo):
         self.ha_port = self.router.get(n_consts.HA_INTERFACE_KEY)
         if (self.ha_port and
                 self.ha_port['status'] == n_consts.PORT_STATUS_ACTIVE):
-            self.enable_keepalived()
+            with self.phase_timer.phase('keepalived'):
+                self.enable_keepalived()
+
+    def process_floating_ips(self, agent):
+        super(HaRouter, self).process_floating_ips(agent)
+        # floating IPs are keepalived VIPs, have it reload its configuration
+        if (self.ha_port and
+                self.ha_port['status'] == n_consts.PORT_STATUS_ACTIVE):
+            with self.phase_timer.phase('keepalived'):
+                self.enable_keepalived()
 
     @common_utils.synchronized('enable_radvd')
     def enable_radvd(self, internal_ports=None):
@@ -14,12 +14,18 @@
 
 import os
 
+import netaddr
 from oslo_log import log as logging
 
-from neutron._i18n import _LW
+from neutron._i18n import _, _LW
+from neutron.common import utils
 
 LOG = logging.getLogger(__name__)
 
+# The state file is compacted once it holds more than this number of records
+# and twice as many records as there are allocations.
+COMPACTION_MIN_RECORDS = 256
+
 
 class ItemAllocator(object):
     """Manages allocation of items from a pool
@@ -33,6 +39,13 @@ class ItemAllocator(object):
     The persistent datastore is a file. The records are one per line of
     the format: key<delimiter>value.  For example if the delimiter is a ','
     (the default value) then the records will be: key,value (one per line)
+
+    Allocations and releases are appended to the file, a release being
+    recorded with an empty value, and the last record of a key wins.  The
+    file is atomically rewritten with only the current allocations once
+    enough records accumulated.  A record is only valid once its line is
+    terminated, the last line of the file being left unterminated when the
+    agent stops while appending it.
     """
 
     def __init__(self, state_file, ItemClass, item_pool, delimiter=','):
@@ -42,6 +55,7 @@ class ItemAllocator(object):
         """
         self.ItemClass = ItemClass
         self.state_file = state_file
+        self.delimiter = delimiter
 
         self.allocations = {}
 
@@ -49,11 +63,18 @@ class ItemAllocator(object):
         self.pool = item_pool
 
         read_error = False
+        self._records = 0
         for line in self._read():
+            self._records += 1
             try:
+                if not line.endswith('\n'):
+                    raise ValueError(_('Unterminated record'))
                 key, saved_value = line.strip().split(delimiter)
-                self.remembered[key] = self.ItemClass(saved_value)
-            except ValueError:
+                if saved_value:
+                    self.remembered[key] = self._load_item(saved_value)
+                else:
+                    self.remembered.pop(key, None)
+            except (ValueError, netaddr.AddrFormatError):
                 read_error = True
                 LOG.warning(_LW("Invalid line in %(file)s, "
                                 "ignoring: %(line)s"),
@@ -63,6 +84,8 @@ class ItemAllocator(object):
         if read_error:
             LOG.debug("Re-writing file %s due to read error", state_file)
             self._write_allocations()
+        elif self._needs_compaction():
+            self._write_allocations()
 
     def allocate(self, key):
         """Try to allocate an item of ItemClass type.
@@ -99,24 +122,63 @@ class ItemAllocator(object):
                 raise RuntimeError("Cannot allocate item of type:"
                                    " %s from pool using file %s"
                                    % (self.ItemClass, self.state_file))
+            # The remembered allocations are gone from the file as well
+            self.allocations[key] = self.pool.pop()
+            self._write_allocations()
+            return self.allocations[key]
 
         self.allocations[key] = self.pool.pop()
-        self._write_allocations()
+        self._record(key, self.allocations[key])
         return self.allocations[key]
 
     def release(self, key):
         self.pool.add(self.allocations.pop(key))
-        self._write_allocations()
+        self._record(key, '')
+
+    def _load_item(self, value):
+        item = self.ItemClass(value)
+        if str(item) != value:
+            raise ValueError(_('Invalid item %s') % value)
+        return item
+
+    def _format(self, key, value):
+        return "%s%s%s\n" % (key, self.delimiter, value)
+
+    def _needs_compaction(self):
+        live = len(self.allocations) + len(self.remembered)
+        return self._records > max(COMPACTION_MIN_RECORDS, 2 * live)
+
+    def _record(self, key, value):
+        self._records += 1
+        if (self._needs_compaction() or
+                not self._append([self._format(key, value)])):
+            self._write_allocations()
 
     def _write_allocations(self):
-        current = ["%s,%s\n" % (k, v) for k, v in self.allocations.items()]
-        remembered = ["%s,%s\n" % (k, v) for k, v in self.remembered.items()]
+        current = [self._format(k, v) for k, v in self.allocations.items()]
+        remembered = [self._format(k, v) for k, v in self.remembered.items()]
         current.extend(remembered)
         self._write(current)
+        self._records = len(current)
+
+    def _append(self, lines):
+        """Append lines to the file.
+
+        Returns False if the file doesn't end with a terminated line: the
+        truncated record would be terminated by the lines and read as valid,
+        the file must be rewritten instead.
+        """
+        with open(self.state_file, "ab+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    return False
+            f.write(''.join(lines).encode('utf-8'))
+        return True
 
     def _write(self, lines):
-        with open(self.state_file, "w") as f:
-            f.writelines(lines)
+        utils.replace_file(self.state_file, ''.join(lines))
 
     def _read(self):
         if not os.path.exists(self.state_file):
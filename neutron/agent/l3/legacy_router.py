@@ -19,6 +19,25 @@ from neutron.agent.linux import ip_lib
 
 
 class LegacyRouter(router.RouterInfo):
+    def adopt(self):
+        if any(fip.get('status') != lib_constants.FLOATINGIP_STATUS_ACTIVE
+               for fip in self.get_floating_ips()):
+            return False
+        ports = self.router.get(lib_constants.INTERFACE_KEY, [])
+        if any(self._port_has_ipv6_subnet(port) for port in ports):
+            # radvd is only configured and monitored by processing the router
+            return False
+        devices = set(self.get_internal_device_name(port['id'])
+                      for port in ports)
+        ex_gw_port = self.get_ex_gw_port()
+        if ex_gw_port:
+            devices.add(self.get_external_device_interface_name(ex_gw_port))
+        if not devices.issubset(self._get_existing_devices()):
+            return False
+        self.adopted = True
+        self.iptables_manager.defer_apply_on()
+        return True
+
     def add_floating_ip(self, fip, interface_name, device):
         if not self._add_fip_addr_to_device(fip, device):
             return lib_constants.FLOATINGIP_STATUS_ERROR
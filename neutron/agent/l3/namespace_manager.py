@@ -10,9 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
-from neutron._i18n import _LE
+from neutron._i18n import _LE, _LI
 from neutron.agent.l3 import dvr_fip_ns
 from neutron.agent.l3 import dvr_snat_ns
 from neutron.agent.l3 import namespaces
@@ -21,6 +23,9 @@ from neutron.agent.linux import ip_lib
 
 LOG = logging.getLogger(__name__)
 
+# Number of stale namespaces cleaned up between progress reports
+CLEANUP_PROGRESS_INTERVAL = 100
+
 
 class NamespaceManager(object):
 
@@ -35,7 +40,9 @@ class NamespaceManager(object):
     to communicate. In the "with" statement, the agent calls keep_router to
     record the id's of the routers whose namespaces should be preserved.
     Any other router and snat namespace present in the system will be deleted
-    by the __exit__ method of this context manager
+    in the background once the __exit__ method of this context manager is
+    called, so that the cleanup of many stale namespaces does not delay the
+    processing of the routers kept by the agent.
 
     This pattern can be more generally applicable to other resources
     besides namespaces in the future because it is idempotent and, as such,
@@ -59,6 +66,9 @@ class NamespaceManager(object):
         self.agent_conf = agent_conf
         self.driver = driver
         self._clean_stale = True
+        self._all_namespaces = set()
+        self._ids_to_keep = set()
+        self._cleanup_thread = None
         self.metadata_driver = metadata_driver
         if metadata_driver:
             self.process_monitor = external_process.ProcessMonitor(
@@ -66,9 +76,10 @@ class NamespaceManager(object):
                 resource_type='router')
 
     def __enter__(self):
-        self._all_namespaces = set()
-        self._ids_to_keep = set()
+        # The ids to keep are not reset once the stale namespaces cleanup
+        # started as it still relies on them
         if self._clean_stale:
+            self._ids_to_keep = set()
             self._all_namespaces = self.list_all()
         return self
 
@@ -83,19 +94,68 @@ class NamespaceManager(object):
             return True
         self._clean_stale = False
 
-        for ns in self._all_namespaces:
-            _ns_prefix, ns_id = self.get_prefix_and_id(ns)
-            if ns_id in self._ids_to_keep:
-                continue
-            self._cleanup(_ns_prefix, ns_id)
+        stale_namespaces = [self.get_prefix_and_id(ns)
+                            for ns in self._all_namespaces]
+        stale_namespaces = [(ns_prefix, ns_id)
+                            for ns_prefix, ns_id in stale_namespaces
+                            if ns_id not in self._ids_to_keep]
+        self._all_namespaces = set()
+        if stale_namespaces:
+            self._cleanup_thread = eventlet.spawn(self._cleanup_stale,
+                                                  stale_namespaces)
 
         return True
 
+    def _cleanup_stale(self, stale_namespaces):
+        total = len(stale_namespaces)
+        LOG.info(_LI("Cleaning up %d stale namespaces"), total)
+        start = timeutils.now()
+        pool = eventlet.GreenPool(self.agent_conf.namespace_cleanup_workers)
+        cleaned = 0
+        try:
+            for _ in pool.imap(lambda ns: self._cleanup_if_stale(*ns),
+                               stale_namespaces):
+                cleaned += 1
+                if (cleaned % CLEANUP_PROGRESS_INTERVAL == 0 and
+                        cleaned < total):
+                    LOG.info(_LI("Cleaned up %(cleaned)d of %(total)d stale "
+                                 "namespaces"),
+                             {'cleaned': cleaned, 'total': total})
+        finally:
+            # The ids to keep are not needed anymore
+            self._cleanup_thread = None
+            self._ids_to_keep = set()
+        LOG.info(_LI("Finished cleaning up %(total)d stale namespaces in "
+                     "%(elapsed).3f seconds"),
+                 {'total': total, 'elapsed': timeutils.now() - start})
+
+    def _cleanup_if_stale(self, ns_prefix, ns_id):
+        # The router may have been scheduled to the agent again since the
+        # cleanup started
+        if ns_id in self._ids_to_keep:
+            return
+        try:
+            self._cleanup(ns_prefix, ns_id)
+        except Exception:
+            LOG.exception(_LE('Failed to destroy stale namespace %s'),
+                          ns_prefix + ns_id)
+
+    def wait(self):
+        """Wait for the stale namespaces cleanup to complete."""
+        cleanup_thread = self._cleanup_thread
+        if cleanup_thread is not None:
+            cleanup_thread.wait()
+
+    def _is_cleaning_stale(self):
+        return self._clean_stale or self._cleanup_thread is not None
+
     def keep_router(self, router_id):
-        self._ids_to_keep.add(router_id)
+        if self._is_cleaning_stale():
+            self._ids_to_keep.add(router_id)
 
     def keep_ext_net(self, ext_net_id):
-        self._ids_to_keep.add(ext_net_id)
+        if self._is_cleaning_stale():
+            self._ids_to_keep.add(ext_net_id)
 
     def get_prefix_and_id(self, ns_name):
         """Get the prefix and id from the namespace name.
@@ -0,0 +1,98 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import hashlib
+import os
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from neutron._i18n import _LW
+from neutron.common import utils
+
+LOG = logging.getLogger(__name__)
+
+DIGESTS_DIR = 'router-digests'
+
+# Router and port attributes which change without any effect on the
+# configuration applied by the agent (the status of floating IPs and ports is
+# even set as a consequence of processing the router).
+VOLATILE_KEYS = frozenset(['status', 'created_at', 'updated_at',
+                           'revision_number', 'revision'])
+
+
+def _strip_volatile(data):
+    if isinstance(data, dict):
+        return {k: _strip_volatile(v) for k, v in data.items()
+                if k not in VOLATILE_KEYS}
+    if isinstance(data, (list, tuple)):
+        return [_strip_volatile(v) for v in data]
+    return data
+
+
+def get_digest(router):
+    """Return a digest of the router configuration applied by the agent."""
+    data = jsonutils.dumps(_strip_volatile(router), sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class RouterDigestCache(object):
+    """Persists the digest of the last router processed by the agent
+
+    The digests are stored under state_path, one file per router named after
+    the router id, so that they survive agent restarts. They allow the agent
+    to recognize, after a restart, routers whose configuration did not change
+    since they were last successfully processed.
+    """
+
+    def __init__(self, state_path):
+        self.directory = os.path.join(state_path, DIGESTS_DIR)
+        utils.ensure_dir(self.directory)
+        self.digests = {}
+        for router_id in os.listdir(self.directory):
+            try:
+                with open(self._get_path(router_id)) as f:
+                    self.digests[router_id] = f.read().strip()
+            except IOError:
+                LOG.warning(_LW("Unable to read the digest of router %s"),
+                            router_id)
+
+    def _get_path(self, router_id):
+        return os.path.join(self.directory, router_id)
+
+    def is_unchanged(self, router):
+        """Check if the router was last processed with the same config."""
+        digest = self.digests.get(router['id'])
+        return digest is not None and digest == get_digest(router)
+
+    def update(self, router):
+        digest = get_digest(router)
+        if self.digests.get(router['id']) == digest:
+            return
+        utils.replace_file(self._get_path(router['id']), digest)
+        self.digests[router['id']] = digest
+
+    def remove(self, router_id):
+        self.digests.pop(router_id, None)
+        try:
+            os.unlink(self._get_path(router_id))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def remove_stale(self, router_ids):
+        """Remove the digests of the routers not in router_ids."""
+        for router_id in set(self.digests) - set(router_ids):
+            self.remove(router_id)
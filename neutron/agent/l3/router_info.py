@@ -19,6 +19,7 @@ from oslo_log import log as logging
 
 from neutron._i18n import _, _LE, _LW
 from neutron.agent.l3 import namespaces
+from neutron.agent.l3 import router_metrics
 from neutron.agent.linux import ip_lib
 from neutron.agent.linux import iptables_manager
 from neutron.agent.linux import ra
@@ -51,6 +52,8 @@ class RouterInfo(object):
         self.ex_gw_port = None
         self._snat_enabled = None
         self.fip_map = {}
+        # NAT rules of the floating IPs in the router iptables manager
+        self.fip_nat_rules = set()
         self.internal_ports = []
         self.floating_ips = set()
         # Invoke the setter for establishing initial SNAT action
@@ -73,6 +76,12 @@ class RouterInfo(object):
         self.driver = interface_driver
         # radvd is a neutron.agent.linux.ra.DaemonMonitor
         self.radvd = None
+        # Set while the router keeps the state a previous run of the agent
+        # left on the system, until it is processed, see adopt()
+        self.adopted = False
+        # Time spent in each phase of the processing of the router, reset by
+        # the agent before the router is processed.
+        self.phase_timer = router_metrics.PhaseTimer()
 
     def initialize(self, process_monitor):
         """Initialize the router on the system.
@@ -190,20 +199,28 @@ class RouterInfo(object):
     def process_floating_ip_nat_rules(self):
         """Configure NAT rules for the router's floating IPs.
 
-        Configures iptables rules for the floating ips of the given router
+        Configures iptables rules for the floating ips of the given router.
+        Only the rules of the floating IPs which were added, removed or
+        associated to another fixed IP are changed.
         """
-        # Clear out all iptables rules for floating ips
-        self.iptables_manager.ipv4['nat'].clear_rules_by_tag('floating_ip')
-
-        floating_ips = self.get_floating_ips()
-        # Loop once to ensure that floating ips are configured.
-        for fip in floating_ips:
-            # Rebuild iptables rules for the floating ip.
+        nat_table = self.iptables_manager.ipv4['nat']
+        fip_nat_rules = set()
+        rules_to_add = []
+        for fip in self.get_floating_ips():
             fixed = fip['fixed_ip_address']
             fip_ip = fip['floating_ip_address']
             for chain, rule in self.floating_forward_rules(fip_ip, fixed):
-                self.iptables_manager.ipv4['nat'].add_rule(chain, rule,
-                                                           tag='floating_ip')
+                if (chain, rule) in fip_nat_rules:
+                    continue
+                fip_nat_rules.add((chain, rule))
+                if (chain, rule) not in self.fip_nat_rules:
+                    rules_to_add.append((chain, rule))
+
+        for chain, rule in self.fip_nat_rules - fip_nat_rules:
+            nat_table.remove_rule(chain, rule)
+        for chain, rule in rules_to_add:
+            nat_table.add_rule(chain, rule, tag='floating_ip')
+        self.fip_nat_rules = fip_nat_rules
 
         self.iptables_manager.apply()
 
@@ -553,7 +570,8 @@ class RouterInfo(object):
 
         # Enable RA
         if enable_ra:
-            self.enable_radvd(internal_ports)
+            with self.phase_timer.phase('radvd'):
+                self.enable_radvd(internal_ports)
 
         existing_devices = self._get_existing_devices()
         current_internal_devs = set(n for n in existing_devices
@@ -835,20 +853,24 @@ class RouterInfo(object):
     def process_external(self, agent):
         fip_statuses = {}
         try:
-            with self.iptables_manager.defer_apply():
+            with self.phase_timer.phase('iptables_apply'), \
+                    self.iptables_manager.defer_apply():
                 ex_gw_port = self.get_ex_gw_port()
-                self._process_external_gateway(ex_gw_port, agent.pd)
+                with self.phase_timer.phase('external_gateway'):
+                    self._process_external_gateway(ex_gw_port, agent.pd)
                 if not ex_gw_port:
                     return
 
                 # Process SNAT/DNAT rules and addresses for floating IPs
-                self.process_snat_dnat_for_fip()
+                with self.phase_timer.phase('floating_ips'):
+                    self.process_snat_dnat_for_fip()
 
             # Once NAT rules for floating IPs are safely in place
             # configure their addresses on the external gateway port
             interface_name = self.get_external_device_interface_name(
                 ex_gw_port)
-            fip_statuses = self.configure_fip_addresses(interface_name)
+            with self.phase_timer.phase('floating_ips'):
+                fip_statuses = self.configure_fip_addresses(interface_name)
 
         except (n_exc.FloatingIpSetupException,
                 n_exc.IpTablesApplyException):
@@ -856,7 +878,39 @@ class RouterInfo(object):
                 LOG.exception(_LE("Failed to process floating IPs."))
                 fip_statuses = self.put_fips_in_error_state()
         finally:
-            self.update_fip_statuses(agent, fip_statuses)
+            with self.phase_timer.phase('floating_ips'):
+                self.update_fip_statuses(agent, fip_statuses)
+
+    def process_floating_ips(self, agent):
+        """Process a change limited to the floating IPs of this router.
+
+        Unlike process_external, the external gateway is expected to be
+        unchanged and is not processed again.
+        """
+        fip_statuses = {}
+        try:
+            ex_gw_port = self.get_ex_gw_port()
+            if ex_gw_port:
+                with self.phase_timer.phase('iptables_apply'), \
+                        self.iptables_manager.defer_apply():
+                    with self.phase_timer.phase('floating_ips'):
+                        self.process_snat_dnat_for_fip()
+                        self.process_floating_ip_address_scope_rules()
+                interface_name = self.get_external_device_interface_name(
+                    ex_gw_port)
+                with self.phase_timer.phase('floating_ips'):
+                    fip_statuses = self.configure_fip_addresses(
+                        interface_name)
+        except (n_exc.FloatingIpSetupException,
+                n_exc.IpTablesApplyException):
+            LOG.exception(_LE("Failed to process floating IPs."))
+            fip_statuses = self.put_fips_in_error_state()
+        finally:
+            with self.phase_timer.phase('floating_ips'):
+                self.update_fip_statuses(agent, fip_statuses)
+        self.fip_map = dict([(fip['floating_ip_address'],
+                              fip['fixed_ip_address'])
+                             for fip in self.get_floating_ips()])
 
     def update_fip_statuses(self, agent, fip_statuses):
         # Identify floating IPs which were disabled
@@ -1023,9 +1077,11 @@ class RouterInfo(object):
         iptables_manager.ipv4['nat'].add_rule('snat', rule)
 
     def process_address_scope(self):
-        with self.iptables_manager.defer_apply():
-            self.process_ports_address_scope_iptables()
-            self.process_floating_ip_address_scope_rules()
+        with self.phase_timer.phase('iptables_apply'), \
+                self.iptables_manager.defer_apply():
+            with self.phase_timer.phase('address_scope'):
+                self.process_ports_address_scope_iptables()
+                self.process_floating_ip_address_scope_rules()
 
     @common_utils.exception_logger()
     def process_delete(self, agent):
@@ -1047,6 +1103,20 @@ class RouterInfo(object):
             LOG.warning(_LW("Can't gracefully delete the router %s: "
                             "no router namespace found."), self.router['id'])
 
+    def adopt(self):
+        """Adopt the state left on the system by a previous run of the agent
+
+        The router is not processed: its devices, addresses, routes and
+        iptables rules are kept as they are. The iptables rules added to the
+        router meanwhile are only applied when the router is next processed,
+        which then processes all of it since none of its state is known in
+        memory.
+
+        Returns False if the state of the router can't be adopted, it must
+        then be processed.
+        """
+        return False
+
     @common_utils.exception_logger()
     def process(self, agent):
         """Process updates to this router
@@ -1057,12 +1127,19 @@ class RouterInfo(object):
         :param agent: Passes the agent in order to send RPC messages.
         """
         LOG.debug("process router updates")
-        self._process_internal_ports(agent.pd)
-        agent.pd.sync_router(self.router['id'])
+        if self.adopted:
+            # the rules applied by the previous run of the agent are rebuilt
+            # along with the rest of the router before being applied
+            self.adopted = False
+            self.iptables_manager.iptables_apply_deferred = False
+        with self.phase_timer.phase('internal_ports'):
+            self._process_internal_ports(agent.pd)
+            agent.pd.sync_router(self.router['id'])
         self.process_external(agent)
         self.process_address_scope()
         # Process static routes for router
-        self.routes_updated(self.routes, self.router['routes'])
+        with self.phase_timer.phase('routes'):
+            self.routes_updated(self.routes, self.router['routes'])
         self.routes = self.router['routes']
 
         # Update ex_gw_port and enable_snat on the router info cache
@@ -0,0 +1,209 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import contextlib
+import os
+
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import timeutils
+import webob
+
+from neutron.agent.linux import utils as agent_utils
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_SLOW_ROUTERS_LIMIT = 10
+
+
+class PhaseTimer(object):
+    """Measures the time spent in the phases of an operation.
+
+    Phases may be nested: the time spent in a nested phase is not accounted
+    to the phase enclosing it, so that the timings of the phases add up to
+    (at most) the duration of the operation.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timings = {}
+        # Time spent in the phases nested in each phase being measured
+        self._nested = []
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        watch = timeutils.StopWatch().start()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = watch.elapsed()
+            exclusive = elapsed - self._nested.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + exclusive
+            if self._nested:
+                self._nested[-1] += elapsed
+
+
+class Timing(object):
+    """Aggregate of the durations of an operation."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def to_dict(self):
+        return {'count': self.count,
+                'total': self.total,
+                'average': self.total / self.count if self.count else 0.0,
+                'max': self.max,
+                'last': self.last}
+
+
+class RouterStats(object):
+    def __init__(self):
+        self.processing = Timing()
+        self.phases = collections.defaultdict(Timing)
+        self.last_phases = {}
+        self.resyncs = 0
+
+    def to_dict(self):
+        return {'processing': self.processing.to_dict(),
+                'phases': {phase: timing.to_dict()
+                           for phase, timing in self.phases.items()},
+                'last_phases': self.last_phases,
+                'resyncs': self.resyncs}
+
+
+class RouterMetrics(object):
+    """Router processing statistics of the L3 agent."""
+
+    def __init__(self):
+        self.routers = collections.defaultdict(RouterStats)
+        self.processing = Timing()
+        self.phases = collections.defaultdict(Timing)
+        self.queue_waits = collections.defaultdict(Timing)
+        self.resyncs = 0
+
+    def record_processing(self, router_id, seconds, phase_timings):
+        stats = self.routers[router_id]
+        stats.processing.add(seconds)
+        stats.last_phases = dict(phase_timings)
+        self.processing.add(seconds)
+        for phase, phase_seconds in phase_timings.items():
+            stats.phases[phase].add(phase_seconds)
+            self.phases[phase].add(phase_seconds)
+
+    def record_queue_wait(self, priority, seconds):
+        self.queue_waits[priority].add(seconds)
+
+    def record_resync(self, router_id):
+        self.routers[router_id].resyncs += 1
+        self.resyncs += 1
+
+    def remove_router(self, router_id):
+        self.routers.pop(router_id, None)
+
+    def get_router_stats(self, router_id):
+        stats = self.routers.get(router_id)
+        return stats.to_dict() if stats else None
+
+    def get_slowest_routers(self, limit=DEFAULT_SLOW_ROUTERS_LIMIT):
+        """Return the routers whose last processing was the longest."""
+        slowest = sorted(self.routers.items(),
+                         key=lambda item: item[1].processing.last,
+                         reverse=True)[:limit]
+        return [{'router_id': router_id,
+                 'last': stats.processing.last,
+                 'max': stats.processing.max,
+                 'count': stats.processing.count,
+                 'last_phases': stats.last_phases,
+                 'resyncs': stats.resyncs}
+                for router_id, stats in slowest]
+
+    def get_stats(self, queue_depths=None):
+        return {'routers': len(self.routers),
+                'processing': self.processing.to_dict(),
+                'phases': {phase: timing.to_dict()
+                           for phase, timing in self.phases.items()},
+                'queue': {'depth': dict(queue_depths or {}),
+                          'wait': {priority: timing.to_dict()
+                                   for priority, timing
+                                   in self.queue_waits.items()}},
+                'resyncs': self.resyncs}
+
+
+class RouterMetricsHandler(object):
+    """Serves the router processing statistics as JSON documents
+
+    / returns aggregate statistics, /routers/<router_id> the statistics of a
+    router and /slow-routers?limit=<n> the routers whose last processing was
+    the longest.
+    """
+
+    def __init__(self, metrics, queue):
+        self.metrics = metrics
+        self.queue = queue
+
+    @webob.dec.wsgify(RequestClass=webob.Request)
+    def __call__(self, req):
+        path = req.path_info.strip('/')
+        if not path:
+            data = self.metrics.get_stats(self.queue.get_depths())
+        elif path == 'slow-routers':
+            try:
+                limit = int(req.params.get('limit',
+                                           DEFAULT_SLOW_ROUTERS_LIMIT))
+            except ValueError:
+                return webob.exc.HTTPBadRequest()
+            data = self.metrics.get_slowest_routers(limit)
+        elif path.startswith('routers/'):
+            data = self.metrics.get_router_stats(path[len('routers/'):])
+            if data is None:
+                return webob.exc.HTTPNotFound()
+        else:
+            return webob.exc.HTTPNotFound()
+        return webob.Response(body=jsonutils.dump_as_bytes(data),
+                              content_type='application/json')
+
+
+class RouterMetricsServer(object):
+    def __init__(self, metrics, queue, conf):
+        self.metrics = metrics
+        self.queue = queue
+        self.conf = conf
+
+        agent_utils.ensure_directory_exists_without_file(
+            self.get_socket_path(self.conf))
+
+    @classmethod
+    def get_socket_path(cls, conf):
+        return os.path.join(conf.state_path, 'l3-agent-metrics')
+
+    def run(self):
+        server = agent_utils.UnixDomainWSGIServer('neutron-l3-agent-metrics')
+        server.start(RouterMetricsHandler(self.metrics, self.queue),
+                     self.get_socket_path(self.conf),
+                     workers=0)
+        server.wait()
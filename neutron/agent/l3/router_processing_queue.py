@@ -13,6 +13,7 @@
 #    under the License.
 #
 
+import collections
 import datetime
 
 from oslo_utils import timeutils
@@ -24,6 +25,7 @@ PRIORITY_SYNC_ROUTERS_TASK = 1
 PRIORITY_PD_UPDATE = 2
 DELETE_ROUTER = 1
 PD_UPDATE = 2
+DELTA_ROUTER = 3
 
 
 class RouterUpdate(object):
@@ -33,7 +35,7 @@ class RouterUpdate(object):
     and process a request to update a router.
     """
     def __init__(self, router_id, priority,
-                 action=None, router=None, timestamp=None):
+                 action=None, router=None, timestamp=None, delta=None):
         self.priority = priority
         self.timestamp = timestamp
         if not timestamp:
@@ -41,6 +43,9 @@ class RouterUpdate(object):
         self.id = router_id
         self.action = action
         self.router = router
+        self.delta = delta
+        # Set when the update is added to the RouterProcessingQueue
+        self.enqueued_at = None
 
     def __lt__(self, other):
         """Implements priority among updates
@@ -141,10 +146,18 @@ class RouterProcessingQueue(object):
     """Manager of the queue of routers to process."""
     def __init__(self):
         self._queue = Queue.PriorityQueue()
+        self._depths = collections.Counter()
 
     def add(self, update):
+        update.enqueued_at = timeutils.utcnow()
+        self._depths[update.priority] += 1
         self._queue.put(update)
 
+    def get_depths(self):
+        """Return the number of queued updates per priority."""
+        return {priority: depth for priority, depth in self._depths.items()
+                if depth}
+
     def each_update_to_next_router(self):
         """Grabs the next router from the queue and processes
 
@@ -152,6 +165,7 @@ class RouterProcessingQueue(object):
         updates stop bubbling to the front of the queue.
         """
         next_update = self._queue.get()
+        self._depths[next_update.priority] -= 1
 
         with ExclusiveRouterProcessor(next_update.id) as rp:
             # Queue the update whether this worker is the master or not.
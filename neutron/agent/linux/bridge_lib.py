@@ -135,3 +135,24 @@ class FdbInterface(object):
         if dev:
             cmd += ['dev', dev]
         return utils.execute(cmd, run_as_root=True, **kwargs)
+
+    @classmethod
+    def batch(cls, entries, **kwargs):
+        """Apply several FDB operations with a single bridge command.
+
+        :param entries: iterable of (op, mac, dev, ip_dst) tuples, ip_dst
+                        may be None.
+        """
+        lines = []
+        for op, mac, dev, ip_dst in entries:
+            line = ['fdb', op, mac, 'dev', dev]
+            if ip_dst is not None:
+                line += ['dst', ip_dst]
+            lines.append(' '.join(line))
+        if not lines:
+            return
+        # -force keeps bridge going past entries which fail, the same way
+        # the single entry callers ignore the exit code.
+        return utils.execute(['bridge', '-force', '-batch', '-'],
+                             process_input='\n'.join(lines) + '\n',
+                             run_as_root=True, **kwargs)
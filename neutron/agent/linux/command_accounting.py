@@ -0,0 +1,167 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import itertools
+import os
+import sys
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_reports import guru_meditation_report as gmr
+from oslo_reports.models import with_default_views as mwdv
+from oslo_service import loopingcall
+from oslo_utils import encodeutils
+
+from neutron._i18n import _LI
+from neutron.agent.common import config
+
+LOG = logging.getLogger(__name__)
+
+config.register_command_accounting_opts(cfg.CONF)
+
+DEFAULT_LIMIT = 20
+
+# Modules executing commands on behalf of the agent code calling them, they
+# are skipped to find the call site of a command
+_WRAPPER_MODULES = frozenset([__name__,
+                              'neutron.agent.common.utils',
+                              'neutron.agent.linux.ip_lib',
+                              'neutron.agent.linux.utils'])
+
+_accounting = None
+
+
+def get_accounting():
+    """Return the accounting of the commands, None if it is disabled."""
+    global _accounting
+    if _accounting is None and cfg.CONF.AGENT.command_accounting:
+        _accounting = CommandAccounting()
+        _accounting.start(cfg.CONF.AGENT.command_accounting_dump_interval)
+    return _accounting
+
+
+def get_binary(cmd):
+    """Return the binary executed by a command.
+
+    The binary of commands executed in a namespace and with additional
+    environment variables is the one executed by "ip netns exec" and env.
+    """
+    cmd = [str(arg) for arg in cmd]
+    if cmd[:3] == ['ip', 'netns', 'exec']:
+        cmd = cmd[4:]
+    if cmd[:1] == ['env']:
+        cmd = list(itertools.dropwhile(lambda arg: '=' in arg, cmd[1:]))
+    return os.path.basename(cmd[0]) if cmd else 'unknown'
+
+
+def get_call_site():
+    """Return the agent function executing a command."""
+    frame = sys._getframe(1)
+    while frame and frame.f_globals.get('__name__') in _WRAPPER_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return 'unknown'
+    return '%s:%s:%d' % (frame.f_globals.get('__name__'),
+                         frame.f_code.co_name, frame.f_lineno)
+
+
+class CommandStats(object):
+    """Aggregate of the executions of commands."""
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.stdin_bytes = 0
+        self.stdout_bytes = 0
+
+    def add(self, seconds, stdin_bytes, stdout_bytes, failed):
+        self.count += 1
+        self.failures += int(failed)
+        self.total_time += seconds
+        self.max_time = max(self.max_time, seconds)
+        self.stdin_bytes += stdin_bytes
+        self.stdout_bytes += stdout_bytes
+
+    def to_dict(self):
+        return {'count': self.count,
+                'failures': self.failures,
+                'failure_rate': float(self.failures) / self.count,
+                'total_time': self.total_time,
+                'average_time': self.total_time / self.count,
+                'max_time': self.max_time,
+                'stdin_bytes': self.stdin_bytes,
+                'stdout_bytes': self.stdout_bytes}
+
+
+class CommandAccounting(object):
+    """Accounting of the external commands executed by an agent.
+
+    The executions are aggregated in memory per binary and per call site,
+    the agent function which executed the command.
+    """
+
+    def __init__(self):
+        self.binaries = collections.defaultdict(CommandStats)
+        self.call_sites = collections.defaultdict(CommandStats)
+
+    def start(self, dump_interval):
+        gmr.TextGuruMeditation.register_section('Command Accounting',
+                                                self._get_report_model)
+        if dump_interval:
+            loopingcall.FixedIntervalLoopingCall(self.dump).start(
+                interval=dump_interval, initial_delay=dump_interval)
+
+    def record(self, cmd, seconds, stdin, stdout, failed, call_site=None):
+        """Account an execution of cmd.
+
+        stdin and stdout are the input and output of the command as they
+        were exchanged with it, before any decoding.
+        """
+        stdin_bytes = len(encodeutils.to_utf8(stdin or b''))
+        stdout_bytes = len(encodeutils.to_utf8(stdout or b''))
+        for stats in (self.binaries[get_binary(cmd)],
+                      self.call_sites[call_site or get_call_site()]):
+            stats.add(seconds, stdin_bytes, stdout_bytes, failed)
+
+    @staticmethod
+    def _get_top(stats, limit):
+        top = sorted(stats.items(), key=lambda item: item[1].total_time,
+                     reverse=True)[:limit]
+        return collections.OrderedDict(
+            (name, item_stats.to_dict()) for name, item_stats in top)
+
+    def get_stats(self, limit=DEFAULT_LIMIT):
+        """Return the binaries and call sites which took the most time."""
+        return {'binaries': self._get_top(self.binaries, limit),
+                'call_sites': self._get_top(self.call_sites, limit)}
+
+    def _get_report_model(self):
+        return mwdv.ModelWithDefaultViews(self.get_stats())
+
+    def dump(self):
+        stats = self.get_stats()
+        lines = []
+        for kind in ('binaries', 'call_sites'):
+            lines.append('%s:' % kind)
+            for name, item_stats in stats[kind].items():
+                lines.append(
+                    '  %(name)s: %(count)d executions, %(failures)d failed, '
+                    '%(total_time).3fs total, %(max_time).3fs max, '
+                    '%(stdin_bytes)d bytes in, %(stdout_bytes)d bytes out' %
+                    dict(item_stats, name=name))
+        LOG.info(_LI("Accounting of the commands executed by the agent:\n%s"),
+                 '\n'.join(lines))
@@ -15,18 +15,23 @@
 
 import abc
 import collections
+import functools
+import hashlib
 import os
 import re
 import shutil
 import time
 
+import eventlet
 import netaddr
 from neutron_lib import constants
 from neutron_lib import exceptions
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
+from oslo_utils import fileutils
 from oslo_utils import uuidutils
 import six
 
@@ -62,6 +67,9 @@ DNSMASQ_SERVICE_NAME = 'dnsmasq'
 class DictModel(dict):
     """Convert dict into an object that provides attribute access to values."""
 
+    # Attributes are stored as dict items, instances don't need a __dict__
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """Convert dict values to DictModel values."""
         super(DictModel, self).__init__(*args, **kwargs)
@@ -107,6 +115,8 @@ class DictModel(dict):
 
 class NetModel(DictModel):
 
+    __slots__ = ()
+
     def __init__(self, d):
         super(NetModel, self).__init__(d)
 
@@ -117,6 +127,44 @@ class NetModel(DictModel):
         return self._ns_name
 
 
+HostEntry = collections.namedtuple(
+    'HostEntry', ['fingerprint', 'hosts', 'addn_hosts', 'opts', 'leases',
+                  'dhcp_ips'])
+
+
+def get_port_fingerprint(port):
+    """Return a digest of the port attributes the host entries depend on.
+
+    The digest is kept instead of a copy of the port to detect the ports
+    which changed, so that the host table costs a few bytes per port.
+    """
+    data = (port.id, port.mac_address, port.device_owner,
+            [(ip.subnet_id, ip.ip_address) for ip in port.fixed_ips],
+            [(d.ip_address, d.hostname, d.fqdn)
+             for d in getattr(port, 'dns_assignment', None) or []],
+            [(opt.opt_name, opt.opt_value, getattr(opt, 'ip_version', None))
+             for opt in getattr(port, edo_ext.EXTRADHCPOPTS, None) or []])
+    return hashlib.sha1(repr(data).encode('utf-8')).digest()
+
+
+class HostTable(object):
+    """In-memory dnsmasq configuration of the ports of a network.
+
+    It keeps the configuration lines rendered for each port, so that only the
+    lines of the ports which changed are rendered again when the allocations
+    are reloaded, and the leases written in the hosts file, so that unused
+    leases are found without reading the hosts file back.
+    """
+
+    def __init__(self):
+        # Network attributes the rendered lines depend on
+        self.context = None
+        self.entries = {}  # {port_id: HostEntry}
+        # Leases written in the hosts file, None if it was not written yet
+        self.leases = None
+        self.contents = {}  # {kind: contents of the conf file}
+
+
 @six.add_metaclass(abc.ABCMeta)
 class DhcpBase(object):
 
@@ -125,9 +173,12 @@ class DhcpBase(object):
         self.conf = conf
         self.network = network
         self.process_monitor = process_monitor
-        self.device_manager = DeviceManager(self.conf, plugin)
+        self.device_manager = self._create_device_manager(plugin)
         self.version = version
 
+    def _create_device_manager(self, plugin):
+        return DeviceManager(self.conf, plugin)
+
     @abc.abstractmethod
     def enable(self):
         """Enables DHCP for this network."""
@@ -292,6 +343,10 @@ class Dnsmasq(DhcpLocalProcess):
 
     _ID = 'id:'
 
+    # Host tables of the networks, they outlive the driver instances which
+    # are created for each action on a network
+    _host_tables = {}  # {network_id: HostTable}
+
     @classmethod
     def check_version(cls):
         pass
@@ -309,6 +364,19 @@ class Dnsmasq(DhcpLocalProcess):
             return []
 
     def _build_cmdline_callback(self, pid_file):
+        network_args, possible_leases = self._get_network_args()
+        files_args = [
+            '--dhcp-hostsfile=%s' % self.get_conf_file_name('host'),
+            '--addn-hosts=%s' % self.get_conf_file_name('addn_hosts'),
+            '--dhcp-optsfile=%s' % self.get_conf_file_name('opts'),
+            '--dhcp-leasefile=%s' % self.get_conf_file_name('leases'),
+        ]
+        return self._build_cmdline(pid_file, files_args,
+                                   [self.interface_name], network_args,
+                                   possible_leases, self.network.id)
+
+    def _build_cmdline(self, pid_file, files_args, interface_names,
+                       network_args, possible_leases, log_name):
         # We ignore local resolv.conf if dns servers are specified
         # or if local resolution is explicitly disabled.
         _no_resolv = (
@@ -321,25 +389,66 @@ class Dnsmasq(DhcpLocalProcess):
             '--strict-order',
             '--except-interface=lo',
             '--pid-file=%s' % pid_file,
-            '--dhcp-hostsfile=%s' % self.get_conf_file_name('host'),
-            '--addn-hosts=%s' % self.get_conf_file_name('addn_hosts'),
-            '--dhcp-optsfile=%s' % self.get_conf_file_name('opts'),
-            '--dhcp-leasefile=%s' % self.get_conf_file_name('leases'),
-            '--dhcp-match=set:ipxe,175',
         ]
-        if self.device_manager.driver.bridged:
-            cmd += [
-                '--bind-interfaces',
-                '--interface=%s' % self.interface_name,
-            ]
+        cmd += files_args
+        cmd.append('--dhcp-match=set:ipxe,175')
+        if interface_names is None:
+            # all the interfaces of the namespace, as they come and go
+            cmd.append('--bind-dynamic')
+        elif self.device_manager.driver.bridged:
+            cmd.append('--bind-interfaces')
+            for interface_name in interface_names:
+                cmd.append('--interface=%s' % interface_name)
         else:
-            cmd += [
-                '--bind-dynamic',
-                '--interface=%s' % self.interface_name,
-                '--interface=tap*',
-                '--bridge-interface=%s,tap*' % self.interface_name,
-            ]
+            cmd.append('--bind-dynamic')
+            for interface_name in interface_names:
+                cmd += [
+                    '--interface=%s' % interface_name,
+                    '--interface=tap*',
+                    '--bridge-interface=%s,tap*' % interface_name,
+                ]
+
+        cmd += network_args
+
+        # Cap the limit because creating lots of subnets can inflate
+        # this possible lease cap.
+        cmd.append('--dhcp-lease-max=%d' %
+                   min(possible_leases, self.conf.dnsmasq_lease_max))
+
+        cmd.append('--conf-file=%s' % self.conf.dnsmasq_config_file)
+        for server in self.conf.dnsmasq_dns_servers:
+            cmd.append('--server=%s' % server)
+
+        if self.conf.dhcp_domain:
+            cmd.append('--domain=%s' % self.conf.dhcp_domain)
+
+        if self.conf.dhcp_broadcast_reply:
+            cmd.append('--dhcp-broadcast')
+
+        if self.conf.dnsmasq_base_log_dir:
+            log_dir = os.path.join(
+                self.conf.dnsmasq_base_log_dir,
+                log_name)
+            try:
+                if not os.path.exists(log_dir):
+                    os.makedirs(log_dir)
+            except OSError:
+                LOG.error(_LE('Error while create dnsmasq log dir: %s'),
+                    log_dir)
+            else:
+                log_filename = os.path.join(log_dir, 'dhcp_dns_log')
+                cmd.append('--log-queries')
+                cmd.append('--log-dhcp')
+                cmd.append('--log-facility=%s' % log_filename)
+
+        return cmd
+
+    def _get_network_args(self):
+        """Return the dnsmasq arguments serving the subnets of the network.
 
+        The number of leases the subnets allow is returned along with them.
+        """
+        args = []
         possible_leases = 0
         for i, subnet in enumerate(self.network.subnets):
             mode = None
@@ -368,54 +477,26 @@ class Dnsmasq(DhcpLocalProcess):
             # mode is optional and is not set - skip it
             if mode:
                 if subnet.ip_version == 4:
-                    cmd.append('--dhcp-range=%s%s,%s,%s,%s' %
-                               ('set:', self._TAG_PREFIX % i,
-                                cidr.network, mode, lease))
+                    args.append('--dhcp-range=%s%s,%s,%s,%s' %
+                                ('set:', self._TAG_PREFIX % i,
+                                 cidr.network, mode, lease))
                 else:
-                    cmd.append('--dhcp-range=%s%s,%s,%s,%d,%s' %
-                               ('set:', self._TAG_PREFIX % i,
-                                cidr.network, mode,
-                                cidr.prefixlen, lease))
+                    args.append('--dhcp-range=%s%s,%s,%s,%d,%s' %
+                                ('set:', self._TAG_PREFIX % i,
+                                 cidr.network, mode,
+                                 cidr.prefixlen, lease))
                 possible_leases += cidr.size
 
         if cfg.CONF.advertise_mtu:
             mtu = getattr(self.network, 'mtu', 0)
             # Do not advertise unknown mtu
             if mtu > 0:
-                cmd.append('--dhcp-option-force=option:mtu,%d' % mtu)
-
-        # Cap the limit because creating lots of subnets can inflate
-        # this possible lease cap.
-        cmd.append('--dhcp-lease-max=%d' %
-                   min(possible_leases, self.conf.dnsmasq_lease_max))
+                args += self._get_mtu_args(mtu)
 
-        cmd.append('--conf-file=%s' % self.conf.dnsmasq_config_file)
-        for server in self.conf.dnsmasq_dns_servers:
-            cmd.append('--server=%s' % server)
+        return args, possible_leases
 
-        if self.conf.dhcp_domain:
-            cmd.append('--domain=%s' % self.conf.dhcp_domain)
-
-        if self.conf.dhcp_broadcast_reply:
-            cmd.append('--dhcp-broadcast')
-
-        if self.conf.dnsmasq_base_log_dir:
-            log_dir = os.path.join(
-                self.conf.dnsmasq_base_log_dir,
-                self.network.id)
-            try:
-                if not os.path.exists(log_dir):
-                    os.makedirs(log_dir)
-            except OSError:
-                LOG.error(_LE('Error while create dnsmasq log dir: %s'),
-                    log_dir)
-            else:
-                log_filename = os.path.join(log_dir, 'dhcp_dns_log')
-                cmd.append('--log-queries')
-                cmd.append('--log-dhcp')
-                cmd.append('--log-facility=%s' % log_filename)
-
-        return cmd
+    def _get_mtu_args(self, mtu):
+        return ['--dhcp-option-force=option:mtu,%d' % mtu]
 
     def spawn_process(self):
         """Spawn the process, if it's not spawned already."""
@@ -461,10 +542,28 @@ class Dnsmasq(DhcpLocalProcess):
             # no need to propagate error further
             LOG.warning(e)
 
+    def _remove_config_files(self):
+        super(Dnsmasq, self)._remove_config_files()
+        self._host_tables.pop(self.network.id, None)
+
+    def _get_host_table(self):
+        return self._host_tables.setdefault(self.network.id, HostTable())
+
+    def _write_conf_file(self, kind, contents):
+        """Write a config file unless it already has these contents."""
+        table = self._get_host_table()
+        filename = self.get_conf_file_name(kind)
+        if (table.contents.get(kind) != contents or
+                not os.path.exists(filename)):
+            common_utils.replace_file(filename, contents)
+            table.contents[kind] = contents
+        return filename
+
     def _output_config_files(self):
-        self._output_hosts_file()
-        self._output_addn_hosts_file()
-        self._output_opts_file()
+        entries = self._get_host_entries()
+        self._output_hosts_file(entries)
+        self._output_addn_hosts_file(entries)
+        self._output_opts_file(entries)
 
     def reload_allocations(self):
         """Rebuild the dnsmasq config and signal the dnsmasq to reload."""
@@ -535,41 +634,106 @@ class Dnsmasq(DhcpLocalProcess):
             no_opts,  # A flag indication that options shouldn't be written
         )
         """
-        v6_nets = dict((subnet.id, subnet) for subnet in
-                       self.network.subnets if subnet.ip_version == 6)
-
+        v6_nets = self._get_v6_nets()
         for port in self.network.ports:
-            fixed_ips = self._sort_fixed_ips_for_dnsmasq(port.fixed_ips,
-                                                         v6_nets)
-            # Confirm whether Neutron server supports dns_name attribute in the
-            # ports API
-            dns_assignment = getattr(port, 'dns_assignment', None)
+            for host_tuple in self._iter_port_hosts(port, v6_nets):
+                yield host_tuple
+
+    def _get_v6_nets(self):
+        return dict((subnet.id, subnet) for subnet in
+                    self.network.subnets if subnet.ip_version == 6)
+
+    def _iter_port_hosts(self, port, v6_nets):
+        """Iterate over the hosts of a port, see _iter_hosts."""
+        fixed_ips = self._sort_fixed_ips_for_dnsmasq(port.fixed_ips, v6_nets)
+        # Confirm whether Neutron server supports dns_name attribute in the
+        # ports API
+        dns_assignment = getattr(port, 'dns_assignment', None)
+        if dns_assignment:
+            dns_ip_map = {d.ip_address: d for d in dns_assignment}
+        for alloc in fixed_ips:
+            no_dhcp = False
+            no_opts = False
+            if alloc.subnet_id in v6_nets:
+                addr_mode = v6_nets[alloc.subnet_id].ipv6_address_mode
+                no_dhcp = addr_mode in (constants.IPV6_SLAAC,
+                                        constants.DHCPV6_STATELESS)
+                # we don't setup anything for SLAAC. It doesn't make sense
+                # to provide options for a client that won't use DHCP
+                no_opts = addr_mode == constants.IPV6_SLAAC
+
+            # If dns_name attribute is supported by ports API, return the
+            # dns_assignment generated by the Neutron server. Otherwise,
+            # generate hostname and fqdn locally (previous behaviour)
             if dns_assignment:
-                dns_ip_map = {d.ip_address: d for d in dns_assignment}
-            for alloc in fixed_ips:
-                no_dhcp = False
-                no_opts = False
-                if alloc.subnet_id in v6_nets:
-                    addr_mode = v6_nets[alloc.subnet_id].ipv6_address_mode
-                    no_dhcp = addr_mode in (constants.IPV6_SLAAC,
-                                            constants.DHCPV6_STATELESS)
-                    # we don't setup anything for SLAAC. It doesn't make sense
-                    # to provide options for a client that won't use DHCP
-                    no_opts = addr_mode == constants.IPV6_SLAAC
-
-                # If dns_name attribute is supported by ports API, return the
-                # dns_assignment generated by the Neutron server. Otherwise,
-                # generate hostname and fqdn locally (previous behaviour)
-                if dns_assignment:
-                    hostname = dns_ip_map[alloc.ip_address].hostname
-                    fqdn = dns_ip_map[alloc.ip_address].fqdn
-                else:
-                    hostname = 'host-%s' % alloc.ip_address.replace(
-                        '.', '-').replace(':', '-')
-                    fqdn = hostname
-                    if self.conf.dhcp_domain:
-                        fqdn = '%s.%s' % (fqdn, self.conf.dhcp_domain)
-                yield (port, alloc, hostname, fqdn, no_dhcp, no_opts)
+                hostname = dns_ip_map[alloc.ip_address].hostname
+                fqdn = dns_ip_map[alloc.ip_address].fqdn
+            else:
+                hostname = 'host-%s' % alloc.ip_address.replace(
+                    '.', '-').replace(':', '-')
+                fqdn = hostname
+                if self.conf.dhcp_domain:
+                    fqdn = '%s.%s' % (fqdn, self.conf.dhcp_domain)
+            yield (port, alloc, hostname, fqdn, no_dhcp, no_opts)
+
+    def _get_host_entries(self):
+        """Return the host entries of the ports of the network.
+
+        The entries of the ports which did not change since the allocations
+        were last output are taken from the host table of the network, only
+        the entries of new or updated ports are rendered.
+        """
+        table = self._get_host_table()
+        context = (tuple((s.id, s.ip_version, s.enable_dhcp,
+                          getattr(s, 'ipv6_address_mode', None))
+                         for s in self.network.subnets),
+                   self.conf.dhcp_domain)
+        if context != table.context:
+            table.context = context
+            table.entries = {}
+        v6_nets = self._get_v6_nets()
+        dhcp_enabled_subnet_ids = set(s.id for s in self.network.subnets
+                                      if s.enable_dhcp)
+        entries = []
+        table_entries = {}
+        for port in self.network.ports:
+            entry = table.entries.get(port.id)
+            fingerprint = get_port_fingerprint(port)
+            if entry is None or entry.fingerprint != fingerprint:
+                entry = self._make_host_entry(port, fingerprint, v6_nets,
+                                              dhcp_enabled_subnet_ids)
+            table_entries[port.id] = entry
+            entries.append(entry)
+        table.entries = table_entries
+        return entries
+
+    def _make_host_entry(self, port, fingerprint, v6_nets,
+                         dhcp_enabled_subnet_ids):
+        hosts = []
+        addn_hosts = []
+        leases = set()
+        client_id = self._get_client_id(port)
+        for host_tuple in self._iter_port_hosts(port, v6_nets):
+            port, alloc, hostname, fqdn, no_dhcp, no_opts = host_tuple
+            line = self._format_hosts_line(port, alloc, fqdn, no_dhcp,
+                                           no_opts, dhcp_enabled_subnet_ids)
+            if line:
+                hosts.append(line)
+                if not no_dhcp:
+                    leases.add((alloc.ip_address, port.mac_address,
+                                client_id))
+            # It is compulsory to write the `fqdn` before the `hostname` in
+            # order to obtain it in PTR responses.
+            if alloc:
+                addn_hosts.append('%s\t%s %s\n' %
+                                  (alloc.ip_address, fqdn, hostname))
+        dhcp_ips = ()
+        if port.device_owner == constants.DEVICE_OWNER_DHCP:
+            dhcp_ips = tuple((ip.subnet_id, ip.ip_address)
+                             for ip in port.fixed_ips)
+        return HostEntry(fingerprint, hosts, addn_hosts,
+                         self._generate_port_extra_opts(port), leases,
+                         dhcp_ips)
 
     def _get_port_extra_dhcp_opts(self, port):
         return getattr(port, edo_ext.EXTRADHCPOPTS, False)
@@ -587,9 +751,15 @@ class Dnsmasq(DhcpLocalProcess):
         epoch-timestamp mac_addr ip_addr hostname client-ID
         """
         filename = self.get_conf_file_name('leases')
-        buf = six.StringIO()
-
         LOG.debug('Building initial lease file: %s', filename)
+        contents = self._get_init_leases()
+        common_utils.replace_file(filename, contents)
+        LOG.debug('Done building initial lease file %s with contents:\n%s',
+                  filename, contents)
+        return filename
+
+    def _get_init_leases(self):
+        buf = six.StringIO()
         # we make up a lease time for the database entry
         if self.conf.dhcp_lease_duration == -1:
             # Even with an infinite lease, a client may choose to renew a
@@ -613,11 +783,7 @@ class Dnsmasq(DhcpLocalProcess):
             # client ID will be overwritten on the next renewal.
             buf.write('%s %s %s * *\n' %
                       (timestamp, port.mac_address, ip_address))
-        contents = buf.getvalue()
-        common_utils.replace_file(filename, contents)
-        LOG.debug('Done building initial lease file %s with contents:\n%s',
-                  filename, contents)
-        return filename
+        return buf.getvalue()
 
     @staticmethod
     def _format_address_for_dnsmasq(address):
@@ -628,7 +794,7 @@ class Dnsmasq(DhcpLocalProcess):
             return '[%s]' % address
         return address
 
-    def _output_hosts_file(self):
+    def _output_hosts_file(self, entries=None):
         """Writes a dnsmasq compatible dhcp hosts file.
 
         The generated file is sent to the --dhcp-hostsfile option of dnsmasq,
@@ -644,49 +810,45 @@ class Dnsmasq(DhcpLocalProcess):
         should receive a dhcp lease, the hosts resolution in itself is
         defined by the `_output_addn_hosts_file` method.
         """
-        buf = six.StringIO()
+        if entries is None:
+            entries = self._get_host_entries()
         filename = self.get_conf_file_name('host')
 
         LOG.debug('Building host file: %s', filename)
-        dhcp_enabled_subnet_ids = [s.id for s in self.network.subnets
-                                   if s.enable_dhcp]
-        # NOTE(ihrachyshka): the loop should not log anything inside it, to
-        # avoid potential performance drop when lots of hosts are dumped
-        for host_tuple in self._iter_hosts():
-            port, alloc, hostname, name, no_dhcp, no_opts = host_tuple
-            if no_dhcp:
-                if not no_opts and self._get_port_extra_dhcp_opts(port):
-                    buf.write('%s,%s%s\n' %
-                              (port.mac_address, 'set:', port.id))
-                continue
+        self._write_conf_file(
+            'host', ''.join(line for entry in entries for line in entry.hosts))
+        self._get_host_table().leases = set().union(
+            *[entry.leases for entry in entries])
+        LOG.debug('Done building host file %s', filename)
+        return filename
 
-            # don't write ip address which belongs to a dhcp disabled subnet.
-            if alloc.subnet_id not in dhcp_enabled_subnet_ids:
-                continue
+    def _format_hosts_line(self, port, alloc, name, no_dhcp, no_opts,
+                           dhcp_enabled_subnet_ids):
+        """Return the hosts file line of an allocation, if any."""
+        if no_dhcp:
+            if not no_opts and self._get_port_extra_dhcp_opts(port):
+                return '%s,%s%s\n' % (port.mac_address, 'set:', port.id)
+            return
 
-            ip_address = self._format_address_for_dnsmasq(alloc.ip_address)
+        # don't write ip address which belongs to a dhcp disabled subnet.
+        if alloc.subnet_id not in dhcp_enabled_subnet_ids:
+            return
 
-            if self._get_port_extra_dhcp_opts(port):
-                client_id = self._get_client_id(port)
-                if client_id and len(port.extra_dhcp_opts) > 1:
-                    buf.write('%s,%s%s,%s,%s,%s%s\n' %
-                              (port.mac_address, self._ID, client_id, name,
-                               ip_address, 'set:', port.id))
-                elif client_id and len(port.extra_dhcp_opts) == 1:
-                    buf.write('%s,%s%s,%s,%s\n' %
-                          (port.mac_address, self._ID, client_id, name,
-                           ip_address))
-                else:
-                    buf.write('%s,%s,%s,%s%s\n' %
-                              (port.mac_address, name, ip_address,
-                               'set:', port.id))
-            else:
-                buf.write('%s,%s,%s\n' %
-                          (port.mac_address, name, ip_address))
+        ip_address = self._format_address_for_dnsmasq(alloc.ip_address)
 
-        common_utils.replace_file(filename, buf.getvalue())
-        LOG.debug('Done building host file %s', filename)
-        return filename
+        if self._get_port_extra_dhcp_opts(port):
+            client_id = self._get_client_id(port)
+            if client_id and len(port.extra_dhcp_opts) > 1:
+                return '%s,%s%s,%s,%s,%s%s\n' % (
+                    port.mac_address, self._ID, client_id, name,
+                    ip_address, 'set:', port.id)
+            elif client_id and len(port.extra_dhcp_opts) == 1:
+                return '%s,%s%s,%s,%s\n' % (
+                    port.mac_address, self._ID, client_id, name, ip_address)
+            else:
+                return '%s,%s,%s,%s%s\n' % (
+                    port.mac_address, name, ip_address, 'set:', port.id)
+        return '%s,%s,%s\n' % (port.mac_address, name, ip_address)
 
     def _get_client_id(self, port):
         if self._get_port_extra_dhcp_opts(port):
@@ -781,11 +943,14 @@ class Dnsmasq(DhcpLocalProcess):
         return leases
 
     def _release_unused_leases(self):
-        filename = self.get_conf_file_name('host')
-        old_leases = self._read_hosts_file_leases(filename)
-        leases_filename = self.get_conf_file_name('leases')
-        # here is dhcpv6 stuff needed to craft dhcpv6 packet
-        v6_leases = self._read_v6_leases_file_leases(leases_filename)
+        old_leases = self._get_host_table().leases
+        if old_leases is None:
+            # The hosts file was written before the agent (re)started
+            filename = self.get_conf_file_name('host')
+            old_leases = self._read_hosts_file_leases(filename)
+        # here is dhcpv6 stuff needed to craft dhcpv6 packet, the leases file
+        # is only read if an IPv6 lease must be released
+        v6_leases = None
         new_leases = set()
         dhcp_port_exists = False
         dhcp_port_on_this_host = self.device_manager.get_device_id(
@@ -798,8 +963,13 @@ class Dnsmasq(DhcpLocalProcess):
                 dhcp_port_exists = True
 
         for ip, mac, client_id in old_leases - new_leases:
-            entry = v6_leases.get(ip, None)
             version = netaddr.IPAddress(ip).version
+            entry = None
+            if version == constants.IP_VERSION_6:
+                if v6_leases is None:
+                    v6_leases = self._read_v6_leases_file_leases(
+                        self.get_conf_file_name('leases'))
+                entry = v6_leases.get(ip)
             if entry:
                 # must release IPv6 lease
                 self._release_lease(mac, ip, entry['client_id'],
@@ -813,7 +983,7 @@ class Dnsmasq(DhcpLocalProcess):
         if not dhcp_port_exists:
             self.device_manager.unplug(self.interface_name, self.network)
 
-    def _output_addn_hosts_file(self):
+    def _output_addn_hosts_file(self, entries=None):
         """Writes a dnsmasq compatible additional hosts file.
 
         The generated file is sent to the --addn-hosts option of dnsmasq,
@@ -823,25 +993,20 @@ class Dnsmasq(DhcpLocalProcess):
         Each line in this file is in the same form as a standard /etc/hosts
         file.
         """
-        buf = six.StringIO()
-        for host_tuple in self._iter_hosts():
-            port, alloc, hostname, fqdn, no_dhcp, no_opts = host_tuple
-            # It is compulsory to write the `fqdn` before the `hostname` in
-            # order to obtain it in PTR responses.
-            if alloc:
-                buf.write('%s\t%s %s\n' % (alloc.ip_address, fqdn, hostname))
-        addn_hosts = self.get_conf_file_name('addn_hosts')
-        common_utils.replace_file(addn_hosts, buf.getvalue())
-        return addn_hosts
+        if entries is None:
+            entries = self._get_host_entries()
+        return self._write_conf_file(
+            'addn_hosts',
+            ''.join(line for entry in entries for line in entry.addn_hosts))
 
-    def _output_opts_file(self):
+    def _output_opts_file(self, entries=None):
         """Write a dnsmasq compatible options file."""
+        if entries is None:
+            entries = self._get_host_entries()
         options, subnet_index_map = self._generate_opts_per_subnet()
-        options += self._generate_opts_per_port(subnet_index_map)
+        options += self._generate_opts_per_port(subnet_index_map, entries)
 
-        name = self.get_conf_file_name('opts')
-        common_utils.replace_file(name, '\n'.join(options))
-        return name
+        return self._write_conf_file('opts', '\n'.join(options))
 
     def _generate_opts_per_subnet(self):
         options = []
@@ -868,8 +1033,9 @@ class Dnsmasq(DhcpLocalProcess):
                 subnet_index_map[subnet.id] = i
 
             if self.conf.dhcp_domain and subnet.ip_version == 6:
-                options.append('tag:tag%s,option6:domain-search,%s' %
-                               (i, ''.join(self.conf.dhcp_domain)))
+                options.append('tag:%s,option6:domain-search,%s' %
+                               (self._TAG_PREFIX % i,
+                                ''.join(self.conf.dhcp_domain)))
 
             gateway = subnet.gateway_ip
             host_routes = []
@@ -923,38 +1089,44 @@ class Dnsmasq(DhcpLocalProcess):
                                                        i, 'router'))
         return options, subnet_index_map
 
-    def _generate_opts_per_port(self, subnet_index_map):
+    def _generate_port_extra_opts(self, port):
+        options = []
+        if self._get_port_extra_dhcp_opts(port):
+            port_ip_versions = set(
+                [netaddr.IPAddress(ip.ip_address).version
+                 for ip in port.fixed_ips])
+            for opt in port.extra_dhcp_opts:
+                if opt.opt_name == edo_ext.CLIENT_ID:
+                    continue
+                opt_ip_version = opt.ip_version
+                if opt_ip_version in port_ip_versions:
+                    options.append(
+                        self._format_option(opt_ip_version, port.id,
+                                            opt.opt_name, opt.opt_value))
+                else:
+                    LOG.info(_LI("Cannot apply dhcp option %(opt)s "
+                                 "because it's ip_version %(version)d "
+                                 "is not in port's address IP versions"),
+                             {'opt': opt.opt_name,
+                              'version': opt_ip_version})
+        return options
+
+    def _generate_opts_per_port(self, subnet_index_map, entries=None):
+        if entries is None:
+            entries = self._get_host_entries()
         options = []
         dhcp_ips = collections.defaultdict(list)
-        for port in self.network.ports:
-            if self._get_port_extra_dhcp_opts(port):
-                port_ip_versions = set(
-                    [netaddr.IPAddress(ip.ip_address).version
-                     for ip in port.fixed_ips])
-                for opt in port.extra_dhcp_opts:
-                    if opt.opt_name == edo_ext.CLIENT_ID:
-                        continue
-                    opt_ip_version = opt.ip_version
-                    if opt_ip_version in port_ip_versions:
-                        options.append(
-                            self._format_option(opt_ip_version, port.id,
-                                                opt.opt_name, opt.opt_value))
-                    else:
-                        LOG.info(_LI("Cannot apply dhcp option %(opt)s "
-                                     "because it's ip_version %(version)d "
-                                     "is not in port's address IP versions"),
-                                 {'opt': opt.opt_name,
-                                  'version': opt_ip_version})
+        for entry in entries:
+            options.extend(entry.opts)
 
             # provides all dnsmasq ip as dns-server if there is more than
             # one dnsmasq for a subnet and there is no dns-server submitted
             # by the server
-            if port.device_owner == constants.DEVICE_OWNER_DHCP:
-                for ip in port.fixed_ips:
-                    i = subnet_index_map.get(ip.subnet_id)
-                    if i is None:
-                        continue
-                    dhcp_ips[i].append(ip.ip_address)
+            for subnet_id, ip_address in entry.dhcp_ips:
+                i = subnet_index_map.get(subnet_id)
+                if i is None:
+                    continue
+                dhcp_ips[i].append(ip_address)
 
         for i, ips in dhcp_ips.items():
             for ip_version in (4, 6):
@@ -1068,6 +1240,498 @@ class Dnsmasq(DhcpLocalProcess):
         return any(isolated_subnets[subnet.id] for subnet in network.subnets)
 
 
+class DnsmasqGroup(object):
+    """Networks served by the same dnsmasq process of SharedDnsmasq.
+
+    The DHCP ports of the networks of a group are plugged in the namespace of
+    the group, so their subnets must not overlap. The dnsmasq process answers
+    DNS queries with the hosts of all the networks of the group on each of
+    its interfaces, so the networks of a group belong to the same project
+    and are neither shared nor external.
+    A network needing an isolated metadata proxy, or a default route to reach
+    the DNS servers dnsmasq forwards queries to, is alone in an exclusive
+    group, named after the network so that its namespace is the one the
+    agent expects.
+    """
+
+    def __init__(self, conf_dir, group_id, exclusive=False, networks=None,
+                 project_id=None):
+        self.conf_dir = conf_dir
+        self.id = group_id
+        self.exclusive = exclusive
+        self.project_id = project_id
+        # What the process of the group needs to know of each network:
+        # {network_id: {'cidrs': [...], 'interface': ..., 'args': [...],
+        #               'leases': ...}}
+        self.networks = networks or {}
+        self._ip_set = None
+
+    @property
+    def namespace(self):
+        return "%s%s" % (NS_PREFIX, self.id)
+
+    def get_conf_file_name(self, kind):
+        return os.path.join(self.conf_dir, kind)
+
+    @classmethod
+    def load(cls, conf_dir):
+        with open(os.path.join(conf_dir, 'networks')) as f:
+            data = jsonutils.loads(f.read())
+        return cls(conf_dir, os.path.basename(conf_dir),
+                   exclusive=data['exclusive'], networks=data['networks'],
+                   project_id=data.get('project_id'))
+
+    def save(self):
+        self._ip_set = None
+        common_utils.replace_file(
+            self.get_conf_file_name('networks'),
+            jsonutils.dumps({'exclusive': self.exclusive,
+                             'project_id': self.project_id,
+                             'networks': self.networks}, sort_keys=True))
+
+    def overlaps(self, cidrs, network_id=None):
+        """Check if the cidrs overlap with the subnets of the group.
+
+        The subnets of network_id, if given, are not considered.
+        """
+        if network_id in self.networks:
+            ip_set = netaddr.IPSet(
+                cidr for other_id, member in self.networks.items()
+                if other_id != network_id for cidr in member['cidrs'])
+        else:
+            if self._ip_set is None:
+                self._ip_set = netaddr.IPSet(
+                    cidr for member in self.networks.values()
+                    for cidr in member['cidrs'])
+            ip_set = self._ip_set
+        return bool(ip_set & netaddr.IPSet(cidrs))
+
+
+class SharedDnsmasq(Dnsmasq):
+    """Dnsmasq driver serving several networks with each dnsmasq process.
+
+    The networks of each project are assigned to groups of at most
+    dnsmasq_shared_max_networks networks, see DnsmasqGroup. The process of a
+    group reads the hosts and options of each network from a file of its own
+    in directories (this requires dnsmasq >= 2.73), and serves the
+    interfaces of the namespace of the group as they are plugged. It is only
+    restarted when the subnets it serves change, once for all the networks
+    changed meanwhile.
+    """
+
+    GROUPS_DIR = 'groups'
+    # the hosts and options files of the networks are in these directories
+    # of their group, the other files of the group are shared
+    NETWORK_FILES_DIRS = ('host', 'addn_hosts', 'opts')
+    GROUP_FILES = ('pid', 'leases')
+
+    # Groups of the networks, they outlive the driver instances which are
+    # created for each action on a network and are loaded on first use
+    _groups = None  # {group_id: DnsmasqGroup}
+    _network_groups = None  # {network_id: DnsmasqGroup}
+
+    # Seconds the restart of the process of a shared group is delayed by
+    RESTART_DELAY = 1
+    # Ids of the groups whose process restart is pending
+    _restarts = set()
+
+    def __init__(self, conf, network, process_monitor, version=None,
+                 plugin=None):
+        super(SharedDnsmasq, self).__init__(conf, network, process_monitor,
+                                            version, plugin)
+        # the tags of the subnets must be unique in the process of the group
+        self._TAG_PREFIX = network.id + '-tag%d'
+        self._load_groups(conf)
+        self.group = None
+        group = self._network_groups.get(network.id)
+        if group:
+            self._set_group(group)
+
+    def _create_device_manager(self, plugin):
+        return SharedDeviceManager(self.conf, plugin)
+
+    @classmethod
+    def _get_groups_dir(cls, conf):
+        return os.path.join(cls.get_confs_dir(conf), cls.GROUPS_DIR)
+
+    @classmethod
+    def _load_groups(cls, conf):
+        if cls._groups is not None:
+            return
+        cls._groups = {}
+        cls._network_groups = {}
+        groups_dir = cls._get_groups_dir(conf)
+        try:
+            group_ids = os.listdir(groups_dir)
+        except OSError:
+            group_ids = []
+        for group_id in group_ids:
+            try:
+                group = DnsmasqGroup.load(os.path.join(groups_dir, group_id))
+            except (IOError, ValueError, KeyError):
+                LOG.warning(_LW("Unable to load the networks of dnsmasq "
+                                "group %s"), group_id)
+                continue
+            cls._groups[group.id] = group
+            for network_id in group.networks:
+                cls._network_groups[network_id] = group
+
+    def _set_group(self, group):
+        self.group = group
+        # the DHCP port of the network is plugged in the namespace of its
+        # group
+        self.network._ns_name = group.namespace
+
+    def get_conf_file_name(self, kind):
+        if self.group and kind in self.GROUP_FILES:
+            return self.group.get_conf_file_name(kind)
+        if self.group and kind in self.NETWORK_FILES_DIRS:
+            return os.path.join(self.group.get_conf_file_name(kind),
+                                self.network.id)
+        return super(SharedDnsmasq, self).get_conf_file_name(kind)
+
+    def _get_process_manager(self, cmd_callback=None):
+        if not self.group:
+            return super(SharedDnsmasq, self)._get_process_manager(
+                cmd_callback)
+        return self._get_group_process_manager(self.group)
+
+    def _get_group_process_manager(self, group):
+        # the command line is built from the group, the process manager may
+        # respawn the process after the network left it
+        return external_process.ProcessManager(
+            conf=self.conf,
+            uuid=group.id,
+            namespace=group.namespace,
+            default_cmd_callback=functools.partial(self._build_group_cmdline,
+                                                   group),
+            pid_file=group.get_conf_file_name('pid'),
+            run_as_root=True)
+
+    @property
+    def active(self):
+        return (self.group is not None and
+                self._get_process_manager().active)
+
+    def _get_cidrs(self):
+        return [subnet.cidr for subnet in self.network.subnets
+                if subnet.enable_dhcp]
+
+    def _needs_exclusive_group(self):
+        # the instances of other projects on a shared or external network
+        # would resolve the hosts of the networks of the group
+        if self.network.get('shared') or self.network.get('router:external'):
+            return True
+        # without bridged DHCP ports, dnsmasq must be given the interfaces
+        # it serves
+        return (not self.device_manager.driver.bridged or
+                self.should_enable_metadata(self.conf, self.network) or
+                self._forwards_dns_off_link())
+
+    def _forwards_dns_off_link(self):
+        """Check if dnsmasq forwards DNS queries to off-link servers.
+
+        No default route is set in shared namespaces, so the DNS servers
+        dnsmasq forwards queries to must be in the subnets of the network.
+        The resolvers of the host are assumed to be off-link.
+        """
+        if not self.conf.dnsmasq_dns_servers:
+            return self.conf.dnsmasq_local_resolv
+        ip_set = netaddr.IPSet(self._get_cidrs())
+        for server in self.conf.dnsmasq_dns_servers:
+            # servers may be given as [/domain/]address[#port]
+            address = server.rsplit('/', 1)[-1].split('#', 1)[0]
+            try:
+                if netaddr.IPAddress(address) not in ip_set:
+                    return True
+            except (netaddr.AddrFormatError, ValueError):
+                return True
+        return False
+
+    def _fits_group(self, group):
+        if group.exclusive or self._needs_exclusive_group():
+            return group.id == self.network.id
+        if group.project_id != self.network.tenant_id:
+            return False
+        member = group.networks.get(self.network.id)
+        if member:
+            return (member['cidrs'] == self._get_cidrs() or
+                    not group.overlaps(self._get_cidrs(), self.network.id))
+        return (len(group.networks) < self.conf.dnsmasq_shared_max_networks
+                and not group.overlaps(self._get_cidrs()))
+
+    def _create_group(self, group_id, exclusive=False):
+        conf_dir = os.path.join(self._get_groups_dir(self.conf), group_id)
+        for kind in self.NETWORK_FILES_DIRS:
+            common_utils.ensure_dir(os.path.join(conf_dir, kind))
+        group = DnsmasqGroup(conf_dir, group_id, exclusive=exclusive,
+                             project_id=self.network.tenant_id)
+        self._groups[group_id] = group
+        return group
+
+    def _join_group(self):
+        if self.group:
+            return
+        legacy = self._stop_legacy_process()
+        if self._needs_exclusive_group():
+            group = self._create_group(self.network.id, exclusive=True)
+        else:
+            group = next((g for g in self._groups.values()
+                          if self._fits_group(g)), None)
+            if group is None:
+                group = self._create_group(uuidutils.generate_uuid())
+            if legacy:
+                self._destroy_legacy_namespace()
+        LOG.debug('Network %(network)s joins dnsmasq group %(group)s',
+                  {'network': self.network.id, 'group': group.id})
+        group.networks[self.network.id] = {'cidrs': self._get_cidrs()}
+        group.save()
+        self._network_groups[self.network.id] = group
+        self._set_group(group)
+
+    def _leave_group(self):
+        group = self.group
+        del group.networks[self.network.id]
+        del self._network_groups[self.network.id]
+        if group.networks:
+            group.save()
+        else:
+            del self._groups[group.id]
+            shutil.rmtree(group.conf_dir, ignore_errors=True)
+
+    def _stop_legacy_process(self):
+        """Stop the process spawned for the network by the Dnsmasq driver.
+
+        Returns True if the network was served by such a process.
+        """
+        pm = self._get_process_manager()
+        if not pm.pid:
+            return False
+        LOG.info(_LI('Stopping the dnsmasq process serving only network %s'),
+                 self.network.id)
+        self.process_monitor.unregister(self.network.id, DNSMASQ_SERVICE_NAME)
+        pm.disable()
+        fileutils.delete_if_exists(pm.get_pid_file_name())
+        return True
+
+    def _destroy_legacy_namespace(self):
+        interface_name = self.interface_name
+        try:
+            if interface_name:
+                self.device_manager.unplug(interface_name, self.network)
+            ip_lib.IPWrapper(namespace=self.network.namespace).netns.delete(
+                self.network.namespace)
+        except RuntimeError:
+            LOG.warning(_LW('Failed trying to delete namespace: %s'),
+                        self.network.namespace)
+
+    def _update_member(self):
+        """Update what the process of the group knows of the network.
+
+        Returns True if the process must be restarted to apply the change:
+        the process of a shared group serves the interfaces as they come and
+        go, but not new subnets.
+        """
+        network_args, possible_leases = self._get_network_args()
+        member = {'cidrs': self._get_cidrs(),
+                  'interface': self.interface_name,
+                  'args': network_args,
+                  'leases': possible_leases}
+        old_member = self.group.networks.get(self.network.id, {})
+        if old_member == member:
+            return False
+        self.group.networks[self.network.id] = member
+        self.group.save()
+        if self.group.exclusive and (old_member.get('interface') !=
+                                     member['interface']):
+            return True
+        return old_member.get('args') != member['args']
+
+    def reload_allocations(self):
+        if not self.group:
+            # the network is not served by any process, e.g. because its
+            # group could not be loaded
+            self.enable()
+            return
+        super(SharedDnsmasq, self).reload_allocations()
+
+    def enable(self):
+        """Enables DHCP for this network in the process of its group."""
+        if self.active:
+            self.restart()
+        elif self._enable_dhcp():
+            common_utils.ensure_dir(self.network_conf_dir)
+            self._join_group()
+            interface_name = self.device_manager.setup(self.network)
+            self.interface_name = interface_name
+            self.spawn_process()
+
+    def restart(self):
+        """Apply a change of the subnets of the network."""
+        if not self._fits_group(self.group):
+            self._move_to_other_group()
+            return
+        self.interface_name = self.device_manager.setup(self.network)
+        self._spawn_or_reload_process(reload_with_HUP=True)
+
+    def _move_to_other_group(self):
+        """Move the network to another group, keeping its DHCP port.
+
+        The instances keep the address of the DHCP port as DHCP and DNS
+        server, its device is only plugged in the namespace of the new group.
+        """
+        interface_name = self.interface_name
+        namespace = self.network.namespace
+        last_member = len(self.group.networks) == 1
+        if interface_name:
+            try:
+                self.device_manager.unplug(interface_name, self.network)
+            except RuntimeError:
+                LOG.warning(_LW('Failed trying to unplug interface: %s'),
+                            interface_name)
+        self.disable(retain_port=True)
+        if last_member:
+            try:
+                ip_lib.IPWrapper(namespace=namespace).netns.delete(namespace)
+            except RuntimeError:
+                LOG.warning(_LW('Failed trying to delete namespace: %s'),
+                            namespace)
+        self.enable()
+
+    def disable(self, retain_port=False):
+        """Stop serving the network in the process of its group."""
+        if not self.group:
+            self._remove_config_files()
+            return
+        pm = self._get_process_manager(
+            cmd_callback=self._build_cmdline_callback)
+        if len(self.group.networks) > 1:
+            if not retain_port:
+                try:
+                    self.device_manager.destroy(self.network,
+                                                self.interface_name)
+                except RuntimeError:
+                    LOG.warning(_LW('Failed trying to delete interface: %s'),
+                                self.interface_name)
+            self._remove_config_files()
+            self._leave_group()
+            if pm.active:
+                # the process forgets the hosts of the network, its subnets
+                # are not served anymore without its interface
+                pm.reload_cfg()
+        else:
+            self.process_monitor.unregister(self.group.id,
+                                            DNSMASQ_SERVICE_NAME)
+            pm.disable()
+            if not retain_port:
+                self._destroy_namespace_and_port()
+            self._remove_config_files()
+            self._leave_group()
+        self.group = None
+
+    def _remove_config_files(self):
+        if self.group:
+            for kind in self.NETWORK_FILES_DIRS:
+                fileutils.delete_if_exists(self.get_conf_file_name(kind))
+        super(SharedDnsmasq, self)._remove_config_files()
+
+    def spawn_process(self):
+        self._spawn_or_reload_process(reload_with_HUP=False,
+                                      init_leases=True)
+
+    def _spawn_or_reload_process(self, reload_with_HUP, init_leases=False):
+        """Spawns or reloads the dnsmasq process of the group.
+
+        The process is restarted if the arguments it is started with for the
+        network changed. The restart of the process of a shared group is
+        delayed, the other networks of the group are served meanwhile.
+        """
+        restart = self._update_member()
+        pm = self._get_process_manager()
+        if restart and pm.active:
+            if self.group.exclusive:
+                pm.disable()
+            else:
+                self._schedule_restart(self.group)
+                reload_with_HUP = True
+        if init_leases:
+            self._output_init_lease_file()
+        self._output_config_files()
+
+        pm.enable(reload_cfg=reload_with_HUP)
+
+        self.process_monitor.register(uuid=self.group.id,
+                                      service_name=DNSMASQ_SERVICE_NAME,
+                                      monitored_process=pm)
+
+    def _output_init_lease_file(self):
+        """Add the leases of the network to the lease file of the group."""
+        filename = self.get_conf_file_name('leases')
+        leases = self._get_init_leases().splitlines(True)
+        ips = set(lease.split()[2] for lease in leases)
+        try:
+            with open(filename) as f:
+                # keep the leases of the other networks and the duid line
+                leases += [line for line in f
+                           if len(line.split()) < 3 or
+                           line.split()[2] not in ips]
+        except IOError:
+            pass
+        common_utils.replace_file(filename, ''.join(leases))
+        return filename
+
+    def _schedule_restart(self, group):
+        if group.id not in self._restarts:
+            self._restarts.add(group.id)
+            eventlet.spawn_after(self.RESTART_DELAY, self._restart_group,
+                                 group)
+
+    # The lock of the DHCP agent is held while it synchronizes the networks,
+    # so the process is restarted once all of them joined their group
+    @common_utils.synchronized('dhcp-agent')
+    def _restart_group(self, group):
+        """Restart the process of a group to serve new subnets."""
+        self._restarts.discard(group.id)
+        if self._groups.get(group.id) is not group:
+            # all the networks left the group
+            return
+        LOG.debug('Restarting the dnsmasq process of group %s', group.id)
+        pm = self._get_group_process_manager(group)
+        pm.disable()
+        pm.enable()
+
+    def _build_cmdline_callback(self, pid_file):
+        return self._build_group_cmdline(self.group, pid_file)
+
+    def _build_group_cmdline(self, group, pid_file):
+        files_args = [
+            '--dhcp-hostsdir=%s' % group.get_conf_file_name('host'),
+            '--hostsdir=%s' % group.get_conf_file_name('addn_hosts'),
+            '--dhcp-optsdir=%s' % group.get_conf_file_name('opts'),
+            '--dhcp-leasefile=%s' % group.get_conf_file_name('leases'),
+        ]
+        interface_names = [] if group.exclusive else None
+        network_args = []
+        possible_leases = 0
+        for network_id, member in sorted(group.networks.items()):
+            if not member.get('interface'):
+                # the network is still being set up
+                continue
+            if group.exclusive:
+                interface_names.append(member['interface'])
+            network_args += member['args']
+            possible_leases += member['leases']
+        return self._build_cmdline(pid_file, files_args, interface_names,
+                                   network_args, possible_leases, group.id)
+
+    def _get_mtu_args(self, mtu):
+        # the option must only be sent to the clients of the network
+        return ['--dhcp-option-force=tag:%s,option:mtu,%d' %
+                (self._TAG_PREFIX % i, mtu)
+                for i, subnet in enumerate(self.network.subnets)
+                if subnet.enable_dhcp]
+
+
 class DeviceManager(object):
 
     def __init__(self, conf, plugin):
@@ -1391,3 +2055,25 @@ class DeviceManager(object):
                      % constants.DHCP_RESPONSE_PORT)
         iptables_mgr.ipv4['mangle'].add_rule('POSTROUTING', ipv4_rule)
         iptables_mgr.apply()
+
+
+class SharedDeviceManager(DeviceManager):
+    """Device manager of the networks served by SharedDnsmasq.
+
+    The networks plugged in the namespace of a group can't all set its
+    default route, and the devices of the other networks aren't stale.
+    """
+
+    @staticmethod
+    def _is_shared(network):
+        return network.namespace != "%s%s" % (NS_PREFIX, network.id)
+
+    def _set_default_route(self, network, device_name):
+        if not self._is_shared(network):
+            super(SharedDeviceManager, self)._set_default_route(
+                network, device_name)
+
+    def _cleanup_stale_devices(self, network, dhcp_port):
+        if not self._is_shared(network):
+            super(SharedDeviceManager, self)._cleanup_stale_devices(
+                network, dhcp_port)
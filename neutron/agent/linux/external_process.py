@@ -167,6 +167,8 @@ class ProcessMonitor(object):
         self._resource_type = resource_type
 
         self._monitored_processes = {}
+        # Number of times the processes of each service were respawned
+        self._respawns = collections.Counter()
 
         if self._config.AGENT.check_child_processes_interval:
             self._spawn_checking_thread()
@@ -211,6 +213,10 @@ class ProcessMonitor(object):
         service_id = ServiceId(uuid, service_name)
         self._monitored_processes.pop(service_id, None)
 
+    def get_respawn_counts(self):
+        """Return the number of respawns of the processes of each service."""
+        return dict(self._respawns)
+
     def stop(self):
         """Stop the process monitoring.
 
@@ -224,11 +230,14 @@ class ProcessMonitor(object):
         eventlet.spawn(self._periodic_checking_thread)
 
     @lockutils.synchronized("_check_child_processes")
-    def _check_child_processes(self):
+    def _check_child_processes(self, shard=0, shards=1):
+        """Check the processes of a shard, all of them by default."""
         # we build the list of keys before iterating in the loop to cover
         # the case where other threads add or remove items from the
         # dictionary which otherwise will cause a RuntimeError
         for service_id in list(self._monitored_processes):
+            if shards > 1 and hash(service_id) % shards != shard:
+                continue
             pm = self._monitored_processes.get(service_id)
 
             if pm and not pm.active:
@@ -242,9 +251,14 @@ class ProcessMonitor(object):
             eventlet.sleep(0)
 
     def _periodic_checking_thread(self):
+        shards = self._config.AGENT.check_child_processes_shards
+        interval = float(
+            self._config.AGENT.check_child_processes_interval) / shards
+        shard = 0
         while self._monitor_processes:
-            eventlet.sleep(self._config.AGENT.check_child_processes_interval)
-            eventlet.spawn(self._check_child_processes)
+            eventlet.sleep(interval)
+            eventlet.spawn(self._check_child_processes, shard, shards)
+            shard = (shard + 1) % shards
 
     def _execute_action(self, service_id):
         action = self._config.AGENT.check_child_processes_action
@@ -255,6 +269,7 @@ class ProcessMonitor(object):
         LOG.warning(_LW("Respawning %(service)s for uuid %(uuid)s"),
                     {'service': service_id.service,
                      'uuid': service_id.uuid})
+        self._respawns[service_id.service] += 1
         self._monitored_processes[service_id].enable()
 
     def _exit_action(self, service_id):
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
 import os
 import re
 
@@ -41,12 +42,35 @@ OPTS = [
 
 LOOPBACK_DEVNAME = 'lo'
 
+# Gratuitous ARPs are sent in the background, this bounds the number of
+# arping processes running at once, e.g. when the floating IPs of a router
+# with hundreds of them are configured.
+MAX_CONCURRENT_ARPINGS = 16
+_ARPING_SEMAPHORE = eventlet.Semaphore(MAX_CONCURRENT_ARPINGS)
+
 SYS_NET_PATH = '/sys/class/net'
+NETNS_RUN_DIR = '/var/run/netns'
 DEFAULT_GW_PATTERN = re.compile(r"via (\S+)")
 METRIC_PATTERN = re.compile(r"metric (\S+)")
 DEVICE_NAME_PATTERN = re.compile(r"(\d+?): (\S+?):.*")
 
 
+def _list_netns_run_dir():
+    """List the network namespaces without forking "ip netns list".
+
+    "ip netns list" only lists the entries of NETNS_RUN_DIR, which can be
+    read directly unless its permissions prevent it, in which case None is
+    returned.
+    """
+    try:
+        return os.listdir(NETNS_RUN_DIR)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            # No namespace was ever created on this host
+            return []
+        return None
+
+
 def remove_interface_suffix(interface):
     """Remove a possible "<if>@<endpoint>" suffix from an interface' name.
 
@@ -246,6 +270,9 @@ class IPWrapper(SubProcessBase):
 
     @classmethod
     def get_namespaces(cls):
+        namespaces = _list_netns_run_dir()
+        if namespaces is not None:
+            return namespaces
         output = cls._execute(
             [], 'netns', ('list',),
             run_as_root=cfg.CONF.AGENT.use_helper_for_ns_read)
@@ -1018,7 +1045,8 @@ def send_ip_addr_adv_notif(ns_name, iface_name, address, config):
     count = config.send_arp_for_ha
 
     def arping():
-        _arping(ns_name, iface_name, address, count)
+        with _ARPING_SEMAPHORE:
+            _arping(ns_name, iface_name, address, count)
 
     if count > 0 and netaddr.IPAddress(address).version == 4:
         eventlet.spawn_n(arping)
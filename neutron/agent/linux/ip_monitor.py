@@ -85,3 +85,80 @@ class IPMonitor(async_process.AsyncProcess):
 
     def stop(self):
         super(IPMonitor, self).stop(block=True)
+
+
+class IPLinkMonitorEvent(object):
+    def __init__(self, line, added, interface):
+        self.line = line
+        self.added = added
+        self.interface = interface
+
+    def __str__(self):
+        return self.line
+
+    @classmethod
+    def from_text(cls, line):
+        link = line.split()
+
+        try:
+            first_word = link[0]
+        except IndexError:
+            with excutils.save_and_reraise_exception():
+                LOG.error(_LE('Unable to parse link "%s"'), line)
+
+        added = (first_word != 'Deleted')
+        if not added:
+            link = link[1:]
+
+        try:
+            interface = ip_lib.remove_interface_suffix(link[1].rstrip(':'))
+        except IndexError:
+            with excutils.save_and_reraise_exception():
+                LOG.error(_LE('Unable to parse link "%s"'), line)
+
+        return cls(line, added, interface)
+
+
+class IPLinkMonitor(async_process.AsyncProcess):
+    """Wrapper over `ip monitor link`.
+
+    The has_updates property indicates whether links have been created,
+    changed or deleted since the monitor started or since the previous
+    access. Link notifications are available to unprivileged users, so
+    the monitor does not run as root by default.
+    """
+
+    def __init__(self,
+                 namespace=None,
+                 run_as_root=False,
+                 respawn_interval=None):
+        super(IPLinkMonitor, self).__init__(['ip', '-o', 'monitor', 'link'],
+                                            run_as_root=run_as_root,
+                                            respawn_interval=respawn_interval,
+                                            namespace=namespace)
+        self.new_events = []
+
+    def start(self):
+        super(IPLinkMonitor, self).start(block=True)
+
+    def stop(self):
+        super(IPLinkMonitor, self).stop(block=True)
+
+    @property
+    def has_updates(self):
+        self.process_events()
+        return bool(self.new_events)
+
+    def get_events(self):
+        self.process_events()
+        events = self.new_events
+        self.new_events = []
+        return events
+
+    def process_events(self):
+        for line in self.iter_stdout():
+            try:
+                self.new_events.append(IPLinkMonitorEvent.from_text(line))
+            except IndexError:
+                # already logged, the line is not a link notification
+                pass
@@ -35,3 +35,5 @@ ALLOW_ASSOC = ('Direct packets associated with a known session to the RETURN '
 PORT_SEC_ACCEPT = 'Accept all packets when port security is disabled.'
 IPV6_RA_DROP = 'Drop IPv6 Router Advts from VM Instance.'
 IPV6_ICMP_ALLOW = 'Allow IPv6 ICMP traffic.'
+SG_MATCH_RESET = 'Reset the security group match mark.'
+SG_MATCH_ACCEPT = 'Direct packets matched by a security group to RETURN.'
@@ -14,6 +14,7 @@
 #    under the License.
 
 import collections
+import itertools
 import re
 
 import netaddr
@@ -41,8 +42,13 @@ SPOOF_FILTER = 'spoof-filter'
 CHAIN_NAME_PREFIX = {firewall.INGRESS_DIRECTION: 'i',
                      firewall.EGRESS_DIRECTION: 'o',
                      SPOOF_FILTER: 's'}
+SG_CHAIN_NAME_PREFIX = {firewall.INGRESS_DIRECTION: 'gi',
+                        firewall.EGRESS_DIRECTION: 'go'}
 IPSET_DIRECTION = {firewall.INGRESS_DIRECTION: 'src',
                    firewall.EGRESS_DIRECTION: 'dst'}
+# packet mark bit used to carry a security group match from a shared
+# security group chain back to the port chain which jumped to it
+SG_MATCH_MARK = '0x1000000'
 # length of all device prefixes (e.g. qvo, tap, qvb)
 LINUX_DEV_PREFIX_LEN = 3
 LINUX_DEV_LEN = 14
@@ -84,11 +90,15 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         # List of security group rules for ports residing on this host
         self.sg_rules = {}
         self.pre_sg_rules = None
+        # Compiled iptables rules keyed by (sg_id, direction, ethertype),
+        # shared by all the ports which are members of the security group
+        self._sg_rule_templates = {}
         # List of security group member ips for ports residing on this host
         self.sg_members = collections.defaultdict(
             lambda: collections.defaultdict(list))
         self.pre_sg_members = None
         self.enable_ipset = cfg.CONF.SECURITYGROUP.enable_ipset
+        self.shared_sg_chains = cfg.CONF.SECURITYGROUP.shared_sg_chains
         self._enabled_netfilter_for_bridges = False
         self.updated_rule_sg_ids = set()
         self.updated_sg_members = set()
@@ -142,10 +152,13 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
 
     def update_security_group_rules(self, sg_id, sg_rules):
         LOG.debug("Update rules of security group (%s)", sg_id)
+        if self.sg_rules.get(sg_id) != sg_rules:
+            self._invalidate_sg_rule_templates(sg_id)
         self.sg_rules[sg_id] = sg_rules
 
     def update_security_group_members(self, sg_id, sg_members):
         LOG.debug("Update members of security group (%s)", sg_id)
+        self._invalidate_remote_sg_rule_templates(sg_id)
         self.sg_members[sg_id] = collections.defaultdict(list, sg_members)
         if self.enable_ipset:
             for ip_version, current_ips in sg_members.items():
@@ -215,6 +228,11 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
 
     def _setup_chains_apply(self, ports, unfiltered_ports):
         self._add_chain_by_name_v4v6(SG_CHAIN)
+        if self.shared_sg_chains:
+            for sg_id in sorted(self._get_sg_ids_set_for_ports(
+                    ports.values())):
+                self._setup_sg_chain(sg_id, firewall.INGRESS_DIRECTION)
+                self._setup_sg_chain(sg_id, firewall.EGRESS_DIRECTION)
         # sort by port so we always do this deterministically between
         # agent restarts and don't cause unnecessary rule differences
         for pname in sorted(ports):
@@ -242,6 +260,12 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         for port in unfiltered_ports.values():
             self._remove_rule_port_sec(port, firewall.INGRESS_DIRECTION)
             self._remove_rule_port_sec(port, firewall.EGRESS_DIRECTION)
+        if self.shared_sg_chains:
+            for sg_id in self._get_sg_ids_set_for_ports(ports.values()):
+                self._remove_chain_by_name_v4v6(
+                    self._sg_chain_name(sg_id, firewall.INGRESS_DIRECTION))
+                self._remove_chain_by_name_v4v6(
+                    self._sg_chain_name(sg_id, firewall.EGRESS_DIRECTION))
         self._remove_chain_by_name_v4v6(SG_CHAIN)
 
     def _setup_chain(self, port, DIRECTION):
@@ -252,6 +276,22 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         chain_name = self._port_chain_name(port, DIRECTION)
         self._remove_chain_by_name_v4v6(chain_name)
 
+    def _setup_sg_chain(self, sg_id, direction):
+        """Setup the chain shared by the ports of a security group.
+
+        A packet matching one of the rules is marked with SG_MATCH_MARK,
+        the port chain returns once all its security group chains have
+        been traversed if the mark is set. As with ipset, the addresses of
+        the port itself are not excluded from the remote group rules.
+        """
+        chain_name = self._sg_chain_name(sg_id, direction)
+        self._add_chain_by_name_v4v6(chain_name)
+        ipv4_rules, ipv6_rules = [
+            [rule_command for rule_command, _remote_ip in
+             self._get_sg_rule_templates(sg_id, direction, ethertype)]
+            for ethertype in (constants.IPv4, constants.IPv6)]
+        self._add_rules_to_chain_v4v6(chain_name, ipv4_rules, ipv6_rules)
+
     def _add_fallback_chain_v4v6(self):
         self.iptables.ipv4['filter'].add_chain('sg-fallback')
         self.iptables.ipv4['filter'].add_rule('sg-fallback', '-j DROP',
@@ -459,39 +499,23 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                              '-j RETURN' % icmp6_type]
         return icmpv6_rules
 
-    def _select_sg_rules_for_port(self, port, direction):
-        """Select rules from the security groups the port is member of."""
-        port_sg_ids = port.get('security_groups', [])
-        port_rules = []
+    def _expand_sg_rule_with_remote_ips(self, rule, direction):
+        """Expand a remote group rule to rule per remote group IP.
 
-        for sg_id in port_sg_ids:
-            for rule in self.sg_rules.get(sg_id, []):
-                if rule['direction'] == direction:
-                    if self.enable_ipset:
-                        port_rules.append(rule)
-                    else:
-                        port_rules.extend(
-                            self._expand_sg_rule_with_remote_ips(
-                                rule, port, direction))
-        return port_rules
-
-    def _expand_sg_rule_with_remote_ips(self, rule, port, direction):
-        """Expand a remote group rule to rule per remote group IP."""
+        Yields (rule, remote_ip) tuples, remote_ip being None for rules
+        which don't reference a remote group.
+        """
         remote_group_id = rule.get('remote_group_id')
         if remote_group_id:
             ethertype = rule['ethertype']
-            port_ips = port.get('fixed_ips', [])
-
+            direction_ip_prefix = firewall.DIRECTION_IP_PREFIX[direction]
             for ip in self.sg_members[remote_group_id][ethertype]:
-                if ip not in port_ips:
-                    ip_rule = rule.copy()
-                    direction_ip_prefix = firewall.DIRECTION_IP_PREFIX[
-                        direction]
-                    ip_prefix = str(netaddr.IPNetwork(ip).cidr)
-                    ip_rule[direction_ip_prefix] = ip_prefix
-                    yield ip_rule
+                ip_rule = rule.copy()
+                ip_prefix = str(netaddr.IPNetwork(ip).cidr)
+                ip_rule[direction_ip_prefix] = ip_prefix
+                yield ip_rule, ip
         else:
-            yield rule
+            yield rule, None
 
     def _get_remote_sg_ids(self, port, direction=None):
         sg_ids = port.get('security_groups', [])
@@ -505,10 +529,92 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                         remote_sg_ids[ether_type].add(remote_sg_id)
         return remote_sg_ids
 
+    def _invalidate_sg_rule_templates(self, sg_id):
+        for key in [key for key in self._sg_rule_templates
+                    if key[0] == sg_id]:
+            del self._sg_rule_templates[key]
+
+    def _invalidate_remote_sg_rule_templates(self, remote_sg_id):
+        """Drop the templates of groups referencing remote_sg_id.
+
+        Remote group rules are compiled either against the ipset of the
+        remote group or against its member IPs, both of which change when
+        the members of the remote group are updated.
+        """
+        for sg_id in set(key[0] for key in self._sg_rule_templates):
+            for rule in self.sg_rules.get(sg_id, []):
+                if rule.get('remote_group_id') == remote_sg_id:
+                    self._invalidate_sg_rule_templates(sg_id)
+                    break
+
+    def _get_sg_rule_templates(self, sg_id, direction, ethertype):
+        """Return the compiled iptables rules of a security group.
+
+        The result is a list of (rule_command, remote_ip) tuples, remote_ip
+        being only set for remote group rules expanded to member IPs (ipset
+        disabled), so that the port's own addresses can be skipped when the
+        port chain is assembled.
+        """
+        key = (sg_id, direction, ethertype)
+        templates = self._sg_rule_templates.get(key)
+        if templates is not None:
+            return templates
+        rules = [rule for rule in self.sg_rules.get(sg_id, [])
+                 if rule['direction'] == direction]
+        ipv4_sg_rules, ipv6_sg_rules = self._split_sgr_by_ethertype(rules)
+        templates = []
+        for rule in (ipv4_sg_rules if ethertype == constants.IPv4
+                     else ipv6_sg_rules):
+            if self.enable_ipset:
+                expanded = [(rule, None)]
+            else:
+                expanded = self._expand_sg_rule_with_remote_ips(rule,
+                                                                direction)
+            for sg_rule, remote_ip in expanded:
+                args = self._convert_sg_rule_to_iptables_args(
+                    sg_rule, target=self._sg_rule_target())
+                if args:
+                    templates.append((' '.join(args), remote_ip))
+        self._sg_rule_templates[key] = templates
+        return templates
+
+    def _sg_rule_target(self):
+        if self.shared_sg_chains:
+            return '-j MARK --set-xmark %s/%s' % (SG_MATCH_MARK,
+                                                  SG_MATCH_MARK)
+        return '-j RETURN'
+
+    def _get_port_sg_rule_templates(self, port, direction, ethertype):
+        """Compiled rules of all the security groups of a port."""
+        if self.shared_sg_chains:
+            for rule in self._get_port_sg_chain_jumps(port, direction):
+                yield rule
+            return
+        port_ips = port.get('fixed_ips', [])
+        for sg_id in port.get('security_groups', []):
+            for rule_command, remote_ip in self._get_sg_rule_templates(
+                    sg_id, direction, ethertype):
+                if remote_ip is None or remote_ip not in port_ips:
+                    yield rule_command
+
+    def _get_port_sg_chain_jumps(self, port, direction):
+        """Jump to the shared chains of the security groups of a port."""
+        sg_ids = port.get('security_groups', [])
+        if not sg_ids:
+            return []
+        rules = [comment_rule('-j MARK --set-xmark 0x0/%s' % SG_MATCH_MARK,
+                              comment=ic.SG_MATCH_RESET)]
+        rules += ['-j $%s' % self._sg_chain_name(sg_id, direction)
+                  for sg_id in sg_ids]
+        rules += [comment_rule('-m mark --mark %s/%s -j RETURN' %
+                               (SG_MATCH_MARK, SG_MATCH_MARK),
+                               comment=ic.SG_MATCH_ACCEPT)]
+        return rules
+
     def _add_rules_by_security_group(self, port, direction):
-        # select rules for current port and direction
+        # select rules for current port and direction, the rules of the
+        # security groups the port is member of are precompiled per group
         security_group_rules = self._select_sgr_by_direction(port, direction)
-        security_group_rules += self._select_sg_rules_for_port(port, direction)
         # split groups by ip version
         # for ipv4, iptables command is used
         # for ipv6, iptables6 command is used
@@ -525,9 +631,11 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
             ipv6_iptables_rules += self._accept_inbound_icmpv6()
         # include IPv4 and IPv6 iptable rules from security group
         ipv4_iptables_rules += self._convert_sgr_to_iptables_rules(
-            ipv4_sg_rules)
+            ipv4_sg_rules,
+            self._get_port_sg_rule_templates(port, direction, constants.IPv4))
         ipv6_iptables_rules += self._convert_sgr_to_iptables_rules(
-            ipv6_sg_rules)
+            ipv6_sg_rules,
+            self._get_port_sg_rule_templates(port, direction, constants.IPv6))
         # finally add the rules to the port chain for a given direction
         self._add_rules_to_chain_v4v6(self._port_chain_name(port, direction),
                                       ipv4_iptables_rules,
@@ -540,7 +648,8 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                             ipv6_iptables_rules)
         self._drop_dhcp_rule(ipv4_iptables_rules, ipv6_iptables_rules)
 
-    def _generate_ipset_rule_args(self, sg_rule, remote_gid):
+    def _generate_ipset_rule_args(self, sg_rule, remote_gid,
+                                  target='-j RETURN'):
         ethertype = sg_rule.get('ethertype')
         ipset_name = self.ipset.get_name(remote_gid, ethertype)
         if not self.ipset.set_name_exists(ipset_name):
@@ -550,7 +659,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         ipset_direction = IPSET_DIRECTION[sg_rule.get('direction')]
         args = self._generate_protocol_and_port_args(sg_rule)
         args += ['-m set', '--match-set', ipset_name, ipset_direction]
-        args += ['-j RETURN']
+        args += [target]
         return args
 
     def _generate_protocol_and_port_args(self, sg_rule):
@@ -565,7 +674,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
                                sg_rule.get('port_range_max'))
         return args
 
-    def _generate_plain_rule_args(self, sg_rule):
+    def _generate_plain_rule_args(self, sg_rule, target='-j RETURN'):
         # These arguments MUST be in the format iptables-save will
         # display them: source/dest, protocol, sport, dport, target
         # Otherwise the iptables_manager code won't be able to find
@@ -573,30 +682,33 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         args = self._ip_prefix_arg('s', sg_rule.get('source_ip_prefix'))
         args += self._ip_prefix_arg('d', sg_rule.get('dest_ip_prefix'))
         args += self._generate_protocol_and_port_args(sg_rule)
-        args += ['-j RETURN']
+        args += [target]
         return args
 
-    def _convert_sg_rule_to_iptables_args(self, sg_rule):
+    def _convert_sg_rule_to_iptables_args(self, sg_rule, target='-j RETURN'):
         remote_gid = sg_rule.get('remote_group_id')
         if self.enable_ipset and remote_gid:
-            return self._generate_ipset_rule_args(sg_rule, remote_gid)
+            return self._generate_ipset_rule_args(sg_rule, remote_gid, target)
         else:
-            return self._generate_plain_rule_args(sg_rule)
+            return self._generate_plain_rule_args(sg_rule, target)
 
-    def _convert_sgr_to_iptables_rules(self, security_group_rules):
+    def _convert_sgr_to_iptables_rules(self, security_group_rules,
+                                       compiled_rules=()):
         iptables_rules = []
         self._allow_established(iptables_rules)
         seen_sg_rules = set()
+        rule_commands = []
         for rule in security_group_rules:
             args = self._convert_sg_rule_to_iptables_args(rule)
             if args:
-                rule_command = ' '.join(args)
-                if rule_command in seen_sg_rules:
-                    # since these rules are from multiple security groups,
-                    # there may be duplicates so we prune them out here
-                    continue
-                seen_sg_rules.add(rule_command)
-                iptables_rules.append(rule_command)
+                rule_commands.append(' '.join(args))
+        for rule_command in itertools.chain(rule_commands, compiled_rules):
+            if rule_command in seen_sg_rules:
+                # since these rules are from multiple security groups,
+                # there may be duplicates so we prune them out here
+                continue
+            seen_sg_rules.add(rule_command)
+            iptables_rules.append(rule_command)
 
         self._drop_invalid_packets(iptables_rules)
         iptables_rules += [comment_rule('-j $sg-fallback',
@@ -667,6 +779,10 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         return iptables_manager.get_chain_name(
             '%s%s' % (CHAIN_NAME_PREFIX[direction], port['device'][3:]))
 
+    def _sg_chain_name(self, sg_id, direction):
+        return iptables_manager.get_chain_name(
+            '%s%s' % (SG_CHAIN_NAME_PREFIX[direction], sg_id))
+
     def filter_defer_apply_on(self):
         if not self._defer_apply:
             self.iptables.defer_apply_on()
@@ -698,6 +814,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         for remove_group_id in self._determine_sg_rules_to_remove(
                 filtered_ports):
             self.sg_rules.pop(remove_group_id, None)
+            self._invalidate_sg_rule_templates(remove_group_id)
 
     def _determine_remote_sgs_to_remove(self, filtered_ports):
         """Calculate which remote security groups we don't need anymore.
@@ -744,6 +861,7 @@ class IptablesFirewallDriver(firewall.FirewallDriver):
         """Remove system ipsets matching the provided parameters."""
         for remote_sg_id in remote_sg_ids:
             self.ipset.destroy(remote_sg_id, ip_version)
+            self._invalidate_remote_sg_rule_templates(remote_sg_id)
 
     def _remove_sg_members(self, remote_sgs_to_remove):
         """Remove sg_member entries."""
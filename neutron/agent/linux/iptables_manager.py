@@ -269,9 +269,7 @@ class IptablesTable(object):
     def clear_rules_by_tag(self, tag):
         if not tag:
             return
-        rules = [rule for rule in self.rules if rule.tag == tag]
-        for rule in rules:
-            self.rules.remove(rule)
+        self.rules = [rule for rule in self.rules if rule.tag != tag]
 
 
 class IptablesManager(object):
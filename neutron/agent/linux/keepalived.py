@@ -12,7 +12,9 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import collections
 import errno
+import hashlib
 import itertools
 import os
 
@@ -101,6 +103,62 @@ class KeepalivedVipAddress(object):
         return result
 
 
+class KeepalivedVipSet(object):
+    """Insertion ordered set of the VIPs of an instance.
+
+    VIPs are keyed by IP address, and indexed by interface name, so that
+    adding and removing a VIP does not depend on the number of VIPs of the
+    instance (every floating IP of a router is a VIP).
+    """
+
+    def __init__(self):
+        self._vips = collections.OrderedDict()
+        self._vips_by_interface = collections.defaultdict(
+            collections.OrderedDict)
+
+    def add(self, vip):
+        """Add a VIP, unless a VIP with the same IP address is present.
+
+        :return: True if the VIP was added.
+        """
+        if vip.ip_address in self._vips:
+            return False
+        self._vips[vip.ip_address] = vip
+        self._vips_by_interface[vip.interface_name][vip.ip_address] = vip
+        return True
+
+    # The VIPs used to be held in a list
+    append = add
+
+    def discard(self, ip_address):
+        vip = self._vips.pop(ip_address, None)
+        if vip is None:
+            return
+        interface_vips = self._vips_by_interface[vip.interface_name]
+        del interface_vips[ip_address]
+        if not interface_vips:
+            del self._vips_by_interface[vip.interface_name]
+
+    def discard_by_interface(self, interface_name):
+        for ip_address in self._vips_by_interface.pop(interface_name, ()):
+            del self._vips[ip_address]
+
+    def get_by_interface(self, interface_name):
+        return list(self._vips_by_interface.get(interface_name, {}).values())
+
+    def __contains__(self, vip):
+        return vip.ip_address in self._vips
+
+    def __iter__(self):
+        return iter(self._vips.values())
+
+    def __len__(self):
+        return len(self._vips)
+
+    def __str__(self):
+        return '[%s]' % ', '.join(str(vip) for vip in self)
+
+
 class KeepalivedVirtualRoute(object):
     """A virtual route entry of a keepalived configuration."""
 
@@ -172,7 +230,7 @@ class KeepalivedInstance(object):
         self.mcast_src_ip = mcast_src_ip
         self.garp_master_delay = garp_master_delay
         self.track_interfaces = []
-        self.vips = []
+        self.vips = KeepalivedVipSet()
         self.virtual_routes = KeepalivedInstanceRoutes()
         self.authentication = None
         self.primary_vip_range = get_free_range(
@@ -189,24 +247,20 @@ class KeepalivedInstance(object):
 
     def add_vip(self, ip_cidr, interface_name, scope):
         vip = KeepalivedVipAddress(ip_cidr, interface_name, scope)
-        if vip not in self.vips:
-            self.vips.append(vip)
-        else:
+        if not self.vips.add(vip):
             LOG.debug('VIP %s already present in %s', vip, self.vips)
 
     def remove_vips_vroutes_by_interface(self, interface_name):
-        self.vips = [vip for vip in self.vips
-                     if vip.interface_name != interface_name]
+        self.vips.discard_by_interface(interface_name)
 
         self.virtual_routes.remove_routes_on_interface(interface_name)
 
     def remove_vip_by_ip_address(self, ip_address):
-        self.vips = [vip for vip in self.vips
-                     if vip.ip_address != ip_address]
+        self.vips.discard(ip_address)
 
     def get_existing_vip_ip_addresses(self, interface_name):
-        return [vip.ip_address for vip in self.vips
-                if vip.interface_name == interface_name]
+        return [vip.ip_address
+                for vip in self.vips.get_by_interface(interface_name)]
 
     def _build_track_interface_config(self):
         return itertools.chain(
@@ -347,6 +401,7 @@ class KeepalivedManager(object):
         self.namespace = namespace
         self.process_monitor = process_monitor
         self.conf_path = conf_path
+        self._config_hash = None
 
     def get_conf_dir(self):
         confs_dir = os.path.abspath(os.path.normpath(self.conf_path))
@@ -359,13 +414,30 @@ class KeepalivedManager(object):
             common_utils.ensure_dir(conf_dir)
         return os.path.join(conf_dir, filename)
 
-    def _output_config_file(self):
-        config_str = self.config.get_config_str()
+    def _output_config_file(self, config_str=None):
+        if config_str is None:
+            config_str = self.config.get_config_str()
         config_path = self.get_full_config_file_path('keepalived.conf')
         common_utils.replace_file(config_path, config_str)
 
         return config_path
 
+    @staticmethod
+    def _get_config_hash(config_str):
+        return hashlib.sha256(config_str.encode('utf-8')).hexdigest()
+
+    def _get_applied_config_hash(self):
+        """Return the hash of the config keepalived was last (re)loaded with.
+
+        After an agent restart, keepalived may still run with the config
+        stored on disk by the previous agent.
+        """
+        if self._config_hash is None:
+            config_str = self.get_conf_on_disk()
+            if config_str is not None:
+                self._config_hash = self._get_config_hash(config_str)
+        return self._config_hash
+
     @staticmethod
     def _safe_remove_pid_file(pid_file):
         try:
@@ -388,7 +460,19 @@ class KeepalivedManager(object):
                 raise
 
     def spawn(self):
-        config_path = self._output_config_file()
+        """Spawn keepalived, or have it reload its config if it changed.
+
+        Spawning is cheap when the config is unchanged, so callers may spawn
+        once per processing pass of a router without causing keepalived to
+        reload (and to send gratuitous ARPs) needlessly.
+        """
+        config_str = self.config.get_config_str()
+        config_hash = self._get_config_hash(config_str)
+        config_changed = config_hash != self._get_applied_config_hash()
+        if config_changed:
+            config_path = self._output_config_file(config_str)
+        else:
+            config_path = self.get_full_config_file_path('keepalived.conf')
 
         keepalived_pm = self.get_process()
         vrrp_pm = self._get_vrrp_process(
@@ -397,20 +481,25 @@ class KeepalivedManager(object):
         keepalived_pm.default_cmd_callback = (
             self._get_keepalived_process_callback(vrrp_pm, config_path))
 
-        keepalived_pm.enable(reload_cfg=True)
+        if config_changed or not keepalived_pm.active:
+            keepalived_pm.enable(reload_cfg=True)
+            self._config_hash = config_hash
+            LOG.debug('Keepalived spawned with config %s', config_path)
+        else:
+            LOG.debug('Keepalived config %s is unchanged, not reloading it',
+                      config_path)
 
         self.process_monitor.register(uuid=self.resource_id,
                                       service_name=KEEPALIVED_SERVICE_NAME,
                                       monitored_process=keepalived_pm)
 
-        LOG.debug('Keepalived spawned with config %s', config_path)
-
     def disable(self):
         self.process_monitor.unregister(uuid=self.resource_id,
                                         service_name=KEEPALIVED_SERVICE_NAME)
 
         pm = self.get_process()
         pm.disable(sig='15')
+        self._config_hash = None
 
     def get_process(self):
         return external_process.ProcessManager(
@@ -13,17 +13,22 @@
 #    under the License.
 
 import contextlib
+import time
 
 import eventlet
 from oslo_log import log as logging
 
+from neutron._i18n import _LE
 from neutron.agent.common import base_polling
 from neutron.agent.linux import async_process
+from neutron.agent.linux import ip_monitor
 from neutron.agent.linux import ovsdb_monitor
 from neutron.plugins.ml2.drivers.openvswitch.agent.common import constants
 
 LOG = logging.getLogger(__name__)
 
+DEFAULT_LINK_MONITOR_RESPAWN = 30
+
 
 @contextlib.contextmanager
 def get_polling_manager(minimize_polling=False,
@@ -42,6 +47,22 @@ def get_polling_manager(minimize_polling=False,
             pm.stop()
 
 
+@contextlib.contextmanager
+def get_link_polling_manager(minimize_polling=False, resync_interval=0,
+                             respawn_interval=DEFAULT_LINK_MONITOR_RESPAWN):
+    if minimize_polling:
+        pm = LinkPollingMinimizer(resync_interval=resync_interval,
+                                  respawn_interval=respawn_interval)
+        pm.start()
+    else:
+        pm = base_polling.AlwaysPoll()
+    try:
+        yield pm
+    finally:
+        if minimize_polling:
+            pm.stop()
+
+
 class InterfacePollingMinimizer(base_polling.BasePollingManager):
     """Monitors ovsdb to determine when polling is required."""
 
@@ -70,3 +91,50 @@ class InterfacePollingMinimizer(base_polling.BasePollingManager):
 
     def get_events(self):
         return self._monitor.get_events()
+
+
+class LinkPollingMinimizer(base_polling.BasePollingManager):
+    """Monitors link notifications to determine when polling is required.
+
+    Polling is also required every resync_interval seconds (if set) as a
+    safety net for missed notifications, and whenever the monitor is not
+    running.
+    """
+
+    def __init__(self, resync_interval=0,
+                 respawn_interval=DEFAULT_LINK_MONITOR_RESPAWN):
+
+        super(LinkPollingMinimizer, self).__init__()
+        self._monitor = ip_monitor.IPLinkMonitor(
+            respawn_interval=respawn_interval)
+        self._resync_interval = resync_interval
+        self._last_polling = None
+
+    def start(self):
+        self._monitor.start()
+
+    def stop(self):
+        try:
+            self._monitor.stop()
+        except async_process.AsyncProcessException:
+            LOG.debug("LinkPollingMinimizer was not running when stopped")
+
+    def polling_completed(self):
+        super(LinkPollingMinimizer, self).polling_completed()
+        self._last_polling = time.time()
+
+    def _is_resync_required(self):
+        return (self._last_polling is None or
+                (self._resync_interval and
+                 time.time() - self._last_polling >= self._resync_interval))
+
+    def _is_polling_required(self):
+        # Maximize the chances of update detection having a chance to
+        # collect output.
+        eventlet.sleep()
+        if not self._monitor.is_active():
+            LOG.error(_LE("Link monitor is not active"))
+            return True
+        # Always consume the pending notifications.
+        has_updates = self._monitor.has_updates
+        return has_updates or bool(self._is_resync_required())
@@ -16,6 +16,7 @@
 import fcntl
 import glob
 import grp
+import itertools
 import os
 import pwd
 import shlex
@@ -33,10 +34,12 @@ from oslo_log import log as logging
 from oslo_rootwrap import client
 from oslo_utils import encodeutils
 from oslo_utils import excutils
+from oslo_utils import timeutils
 from six.moves import http_client as httplib
 
 from neutron._i18n import _, _LE
 from neutron.agent.common import config
+from neutron.agent.linux import command_accounting
 from neutron.common import utils
 from neutron import wsgi
 
@@ -45,7 +48,8 @@ LOG = logging.getLogger(__name__)
 
 
 class RootwrapDaemonHelper(object):
-    __client = None
+    __clients = None
+    __next_client = itertools.count()
     __lock = threading.Lock()
 
     def __new__(cls):
@@ -54,11 +58,20 @@ class RootwrapDaemonHelper(object):
 
     @classmethod
     def get_client(cls):
+        """Return the client of one of the rootwrap daemons.
+
+        The clients are handed out in turn and are not checked out: each
+        greenthread talks to a daemon over a connection of its own and the
+        daemon executes the commands of its connections concurrently.
+        """
         with cls.__lock:
-            if cls.__client is None:
-                cls.__client = client.Client(
-                    shlex.split(cfg.CONF.AGENT.root_helper_daemon))
-            return cls.__client
+            if cls.__clients is None:
+                cls.__clients = [
+                    client.Client(
+                        shlex.split(cfg.CONF.AGENT.root_helper_daemon))
+                    for i in range(
+                        cfg.CONF.AGENT.root_helper_daemon_pool_size)]
+        return cls.__clients[next(cls.__next_client) % len(cls.__clients)]
 
 
 def addl_env_args(addl_env):
@@ -104,21 +117,23 @@ def execute_rootwrap_daemon(cmd, process_input, addl_env):
 def execute(cmd, process_input=None, addl_env=None,
             check_exit_code=True, return_stderr=False, log_fail_as_error=True,
             extra_ok_codes=None, run_as_root=False):
+    accounting = command_accounting.get_accounting()
+    watch = timeutils.StopWatch().start()
+    failed = True
+    _process_input = _raw_stdout = None
     try:
         if process_input is not None:
             _process_input = encodeutils.to_utf8(process_input)
-        else:
-            _process_input = None
         if run_as_root and cfg.CONF.AGENT.root_helper_daemon:
-            returncode, _stdout, _stderr = (
+            returncode, _raw_stdout, _stderr = (
                 execute_rootwrap_daemon(cmd, process_input, addl_env))
         else:
-            obj, cmd = create_process(cmd, run_as_root=run_as_root,
-                                      addl_env=addl_env)
-            _stdout, _stderr = obj.communicate(_process_input)
+            obj = create_process(cmd, run_as_root=run_as_root,
+                                 addl_env=addl_env)[0]
+            _raw_stdout, _stderr = obj.communicate(_process_input)
             returncode = obj.returncode
             obj.stdin.close()
-        _stdout = utils.safe_decode_utf8(_stdout)
+        _stdout = utils.safe_decode_utf8(_raw_stdout)
         _stderr = utils.safe_decode_utf8(_stderr)
 
         extra_ok_codes = extra_ok_codes or []
@@ -137,9 +152,13 @@ def execute(cmd, process_input=None, addl_env=None,
             if check_exit_code:
                 raise RuntimeError(msg)
         else:
+            failed = False
             LOG.debug("Exit code: %d", returncode)
 
     finally:
+        if accounting is not None:
+            accounting.record(cmd, watch.elapsed(), _process_input,
+                              _raw_stdout, failed)
         # NOTE(termie): this appears to be necessary to let the subprocess
         #               call clean something up in between calls, without
         #               it two execute calls in a row hangs the second one
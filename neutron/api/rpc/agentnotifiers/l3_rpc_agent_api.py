@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import random
 
 from neutron_lib import constants
@@ -141,6 +142,41 @@ class L3AgentNotifyAPI(object):
             self._notification(context, 'routers_updated', router_ids,
                                operation, shuffle_agents, schedule_routers)
 
+    def routers_delta_updated(self, context, deltas):
+        """Notify incremental router changes to the hosting l3 agents.
+
+        Deltas are grouped per hosting agent so each agent receives a single
+        message, whatever the number of its routers concerned.
+        """
+        if not deltas:
+            return
+        plugin = manager.NeutronManager.get_service_plugins().get(
+            service_constants.L3_ROUTER_NAT)
+        if not plugin:
+            LOG.error(_LE('No plugin for L3 routing registered. Cannot notify '
+                          'agents with the message %s'),
+                      'routers_delta_updated')
+            return
+        if not utils.is_extension_supported(
+                plugin, constants.L3_AGENT_SCHEDULER_EXT_ALIAS):
+            cctxt = self.client.prepare(fanout=True, version='1.4')
+            cctxt.cast(context, 'routers_delta_updated', deltas=deltas)
+            return
+        adminContext = context if context.is_admin else context.elevated()
+        host_deltas = collections.defaultdict(list)
+        for delta in deltas:
+            for host in plugin.get_hosts_to_notify(adminContext,
+                                                   delta['router_id']):
+                host_deltas[host].append(delta)
+        for host, agent_deltas in host_deltas.items():
+            LOG.debug('Notify agent at %(topic)s.%(host)s the message '
+                      'routers_delta_updated',
+                      {'topic': topics.L3_AGENT, 'host': host})
+            cctxt = self.client.prepare(topic=topics.L3_AGENT,
+                                        server=host,
+                                        version='1.4')
+            cctxt.cast(context, 'routers_delta_updated', deltas=agent_deltas)
+
     def add_arp_entry(self, context, router_id, arp_table, operation=None):
         self._agent_notification_arp(context, 'add_arp_entry', router_id,
                                      operation, arp_table)
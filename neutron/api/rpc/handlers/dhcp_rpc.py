@@ -71,10 +71,11 @@ class DhcpRpcCallback(object):
     #     1.6 - Removed get_active_networks. It's not used by reference
     #           DHCP agent since Havana, so similar rationale for not bumping
     #           the major version as above applies here too.
+    #     1.7 - Added get_active_network_ids and get_networks_info.
 
     target = oslo_messaging.Target(
         namespace=n_const.RPC_NAMESPACE_DHCP_PLUGIN,
-        version='1.6')
+        version='1.7')
 
     def _get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active networks."""
@@ -136,6 +137,52 @@ class DhcpRpcCallback(object):
         host = kwargs.get('host')
         LOG.debug('get_active_networks_info from %s', host)
         networks = self._get_active_networks(context, **kwargs)
+        return self._get_networks_info(context, networks, host)
+
+    def get_active_network_ids(self, context, **kwargs):
+        """Returns the ids of the active networks of a DHCP agent.
+
+        The networks with ports waiting for DHCP to be provisioned, DOWN
+        ports which are not owned by the network, come first for the agent
+        to configure them first when it synchronizes its state.
+        """
+        host = kwargs.get('host')
+        LOG.debug('get_active_network_ids from %s', host)
+        network_ids = [network['id'] for network in
+                       self._get_active_networks(context, **kwargs)]
+        if not network_ids:
+            return network_ids
+        plugin = manager.NeutronManager.get_plugin()
+        ports = plugin.get_ports(
+            context,
+            filters={'network_id': network_ids,
+                     'status': [constants.PORT_STATUS_DOWN]},
+            fields=['network_id', 'device_owner'])
+        pending_network_ids = set(
+            port['network_id'] for port in ports
+            if not (port['device_owner'] or '').startswith(
+                constants.DEVICE_OWNER_NETWORK_PREFIX))
+        return sorted(network_ids,
+                      key=lambda network_id: (
+                          network_id not in pending_network_ids))
+
+    def get_networks_info(self, context, **kwargs):
+        """Returns the networks/subnets/ports of the given networks.
+
+        Networks which could not be found, because they were deleted
+        concurrently, are not returned.
+        """
+        host = kwargs.get('host')
+        network_ids = kwargs.get('network_ids')
+        LOG.debug('get_networks_info for %(count)d networks from %(host)s',
+                  {'count': len(network_ids), 'host': host})
+        plugin = manager.NeutronManager.get_plugin()
+        networks = plugin.get_networks(context,
+                                       filters={'id': network_ids})
+        return self._get_networks_info(context, networks, host)
+
+    def _get_networks_info(self, context, networks, host):
+        """Add the subnets and ports of all the networks at once."""
         plugin = manager.NeutronManager.get_plugin()
         filters = {'network_id': [network['id'] for network in networks]}
         ports = plugin.get_ports(context, filters=filters)
@@ -275,7 +322,6 @@ class DhcpRpcCallback(object):
 
     @db_api.retry_db_errors
     def dhcp_ready_on_ports(self, context, port_ids):
-        for port_id in port_ids:
-            provisioning_blocks.provisioning_complete(
-                context, port_id, resources.PORT,
-                provisioning_blocks.DHCP_ENTITY)
+        provisioning_blocks.bulk_provisioning_complete(
+            context, port_ids, resources.PORT,
+            provisioning_blocks.DHCP_ENTITY)
@@ -47,7 +47,8 @@ class L3RpcCallback(object):
     # 1.7 Added method delete_agent_gateway_port for DVR Routers
     # 1.8 Added address scope information
     # 1.9 Added get_router_ids
-    target = oslo_messaging.Target(version='1.9')
+    # 1.10 Added get_ports_by_subnets for DVR
+    target = oslo_messaging.Target(version='1.10')
 
     @property
     def plugin(self):
@@ -249,6 +250,23 @@ class L3RpcCallback(object):
         filters = {'fixed_ips': {'subnet_id': [subnet_id]}}
         return self.plugin.get_ports(context, filters=filters)
 
+    def get_ports_by_subnets(self, context, **kwargs):
+        """DVR: RPC called by dvr-agent to get the ports of many subnets.
+
+        :returns: dict mapping each requested subnet id to its ports
+        """
+        subnet_ids = kwargs.get('subnet_ids') or []
+        LOG.debug("DVR: subnet_ids: %s", subnet_ids)
+        filters = {'fixed_ips': {'subnet_id': subnet_ids}}
+        ports_by_subnet = {subnet_id: [] for subnet_id in subnet_ids}
+        for port in self.plugin.get_ports(context, filters=filters):
+            port_subnet_ids = set(fixed_ip['subnet_id']
+                                  for fixed_ip in port['fixed_ips'])
+            for subnet_id in port_subnet_ids:
+                if subnet_id in ports_by_subnet:
+                    ports_by_subnet[subnet_id].append(port)
+        return ports_by_subnet
+
     @db_api.retry_db_errors
     def get_agent_gateway_port(self, context, **kwargs):
         """Get Agent Gateway port for FIP.
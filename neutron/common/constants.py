@@ -34,6 +34,10 @@ METERING_LABEL_KEY = '_metering_labels'
 FLOATINGIP_AGENT_INTF_KEY = '_floatingip_agent_interfaces'
 SNAT_ROUTER_INTF_KEY = '_snat_router_interfaces'
 
+# Types of the deltas sent to the L3 agents with routers_delta_updated
+ROUTER_DELTA_FLOATINGIP_ADDED = 'floatingip_added'
+ROUTER_DELTA_FLOATINGIP_REMOVED = 'floatingip_removed'
+
 HA_NETWORK_NAME = 'HA network tenant %s'
 HA_SUBNET_NAME = 'HA subnet tenant %s'
 HA_PORT_NAME = 'HA port tenant %s'
@@ -58,7 +58,25 @@ DHCP_AGENT_OPTS = [
     cfg.IntOpt('num_sync_threads', default=4,
                help=_('Number of threads to use during sync process. '
                       'Should not exceed connection pool size configured on '
-                      'server.'))
+                      'server.')),
+    cfg.IntOpt('sync_networks_chunk_size', default=100, min=1,
+               help=_('Number of networks whose subnets and ports are '
+                      'fetched with a single RPC call during the sync '
+                      'process. The networks of a chunk are configured '
+                      'while the next chunk is fetched.')),
+    cfg.FloatOpt('reload_allocations_delay', default=0,
+                 help=_("Number of seconds to wait for other port "
+                        "notifications on a network before reloading the "
+                        "allocations of its DHCP server. The notifications "
+                        "received meanwhile are coalesced into a single "
+                        "reload. When set to 0, the allocations are reloaded "
+                        "on every port notification.")),
+    cfg.FloatOpt('reload_allocations_max_delay', default=5,
+                 help=_("Maximum number of seconds between a port "
+                        "notification and the reload of the allocations of "
+                        "the DHCP server of its network, when "
+                        "reload_allocations_delay is set. It bounds the delay "
+                        "while port notifications keep coming.")),
 ]
 
 DHCP_OPTS = [
@@ -101,6 +119,22 @@ DNSMASQ_OPTS = [
         help=_('Limit number of leases to prevent a denial-of-service.')),
     cfg.BoolOpt('dhcp_broadcast_reply', default=False,
                 help=_("Use broadcast in DHCP replies.")),
+    cfg.IntOpt('dnsmasq_shared_max_networks', default=64, min=1,
+               help=_("Maximum number of networks served by each dnsmasq "
+                      "process of the "
+                      "neutron.agent.linux.dhcp.SharedDnsmasq driver. The "
+                      "networks served by a dnsmasq process belong to the "
+                      "same project and are neither shared nor external, "
+                      "since each of them can resolve the host names of the "
+                      "others. They share a namespace, so "
+                      "their subnets must not overlap and no default route "
+                      "is set in the namespace. Networks needing an "
+                      "isolated metadata proxy are always served by a "
+                      "dnsmasq process of their own, and so are networks "
+                      "whose subnets don't include all the "
+                      "dnsmasq_dns_servers, or all networks if "
+                      "dnsmasq_local_resolv is enabled without "
+                      "dnsmasq_dns_servers.")),
 ]
 
 
@@ -96,6 +96,26 @@ OPTS = [
                help=_('Iptables mangle mark used to mark ingress from '
                       'external network. This mark will be masked with '
                       '0xffff so that only the lower 16 bits will be used.')),
+    cfg.BoolOpt('persist_router_digests', default=False,
+                help=_("Store a digest of the last router configuration "
+                       "applied by the agent under state_path. After an "
+                       "agent restart, legacy routers whose configuration "
+                       "did not change and whose devices are all plugged "
+                       "keep the addresses, routes and iptables rules they "
+                       "have instead of being processed, until they are "
+                       "next updated. Routers with IPv6 subnets or floating "
+                       "IPs which are not active are always processed.")),
+    cfg.IntOpt('namespace_cleanup_workers', default=4, min=1,
+               help=_("Number of stale namespaces which are cleaned up "
+                      "concurrently in the background after the agent "
+                      "restarted.")),
+    cfg.BoolOpt('enable_router_metrics', default=False,
+                help=_("Collect router processing statistics: time spent "
+                       "in each phase of the processing of every router, "
+                       "time spent by router updates in the processing "
+                       "queue and number of router resyncs. They are served "
+                       "as JSON documents over HTTP on the l3-agent-metrics "
+                       "unix domain socket under state_path.")),
 ]
 
 OPTS += config.EXT_NET_BRIDGE_OPTS
@@ -36,7 +36,16 @@ security_group_opts = [
         default=True,
         help=_('Use ipset to speed-up the iptables based security groups. '
                'Enabling ipset support requires that ipset is installed on L2 '
-               'agent node.'))
+               'agent node.')),
+    cfg.BoolOpt(
+        'shared_sg_chains',
+        default=False,
+        help=_('Use one iptables chain per security group and direction, '
+               'shared by all the ports of the security group, instead of '
+               'copying the security group rules into every port chain. '
+               'This reduces the size of the iptables tables on hosts with '
+               'many ports in the same security groups. Only used by the '
+               'iptables based firewall drivers.'))
 ]
 
 
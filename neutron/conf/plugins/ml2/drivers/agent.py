@@ -22,6 +22,18 @@ agent_opts = [
     cfg.IntOpt('polling_interval', default=2,
                help=_("The number of seconds the agent will wait between "
                       "polling for local device changes.")),
+    cfg.BoolOpt('monitor_link_events', default=False,
+                help=_("Detect local device changes from the kernel link "
+                       "notifications ('ip monitor link') and only scan the "
+                       "local devices when a notification is received, "
+                       "instead of scanning them on every polling "
+                       "interval.")),
+    cfg.IntOpt('link_monitor_resync_interval', default=60,
+               help=_("The number of seconds between full scans of the local "
+                      "devices when monitor_link_events is enabled, as a "
+                      "safety net for missed notifications. If value is set "
+                      "to 0, the devices are only scanned on "
+                      "notifications.")),
     cfg.IntOpt('quitting_rpc_timeout', default=10,
                help=_("Set new timeout in seconds for new rpc calls after "
                       "agent receives SIGTERM. If value is set to 0, rpc "
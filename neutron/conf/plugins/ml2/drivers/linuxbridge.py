@@ -58,6 +58,12 @@ vxlan_opts = [
                        "fully compatible with the allowed-address-pairs "
                        "extension.")
                 ),
+    cfg.BoolOpt('batch_fdb_updates', default=False,
+                help=_("Apply the FDB and neighbor entries received from the "
+                       "l2population mechanism driver per network in a "
+                       "single 'bridge -batch' call instead of one command "
+                       "per entry. Entries already present on the VXLAN "
+                       "device are not programmed again.")),
 ]
 
 bridge_opts = [
@@ -21,6 +21,7 @@ from neutron_lib.api import validators
 from neutron_lib import constants as lib_constants
 from neutron_lib.db import model_base
 from neutron_lib import exceptions as n_exc
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
 from oslo_utils import uuidutils
@@ -54,6 +55,15 @@ from neutron.plugins.common import utils as p_utils
 
 LOG = logging.getLogger(__name__)
 
+L3_DB_OPTS = [
+    cfg.BoolOpt('router_delta_updates', default=False,
+                help=_("Notify L3 agents of floating IP association changes "
+                       "on centralized routers with revisioned deltas "
+                       "instead of asking them to resync the whole router. "
+                       "Only enable this once all L3 agents support the "
+                       "routers_delta_updated RPC.")),
+]
+cfg.CONF.register_opts(L3_DB_OPTS)
 
 DEVICE_OWNER_HA_REPLICATED_INT = lib_constants.DEVICE_OWNER_HA_REPLICATED_INT
 DEVICE_OWNER_ROUTER_INTF = lib_constants.DEVICE_OWNER_ROUTER_INTF
@@ -1461,6 +1471,9 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
 
     def _make_router_dict_with_gw_port(self, router, fields):
         result = self._make_router_dict(router, fields)
+        # NOTE: the agent uses the revision to tell whether a router delta
+        # applies on top of the router it last synced
+        result['revision_number'] = router.revision_number
         if router.get('gw_port'):
             result['gw_port'] = self._core_plugin._make_port_dict(
                 router['gw_port'], None)
@@ -1509,7 +1522,8 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
         d['fixed_ip_address_scope'] = scope_id
         return d
 
-    def _get_sync_floating_ips(self, context, router_ids):
+    def _get_sync_floating_ips(self, context, router_ids,
+                               floatingip_ids=None):
         """Query floating_ips that relate to list of router_ids with scope.
 
         This is different than the regular get_floatingips in that it finds the
@@ -1518,6 +1532,9 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
 
         There are a few redirections to go through to discover the address
         scope from the floating ip.
+
+        @param floatingip_ids: optionally restrict the query to these
+                               floating ips.
         """
         if not router_ids:
             return []
@@ -1535,6 +1552,8 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
 
         # Filter out on router_ids
         query = query.filter(FloatingIP.router_id.in_(router_ids))
+        if floatingip_ids:
+            query = query.filter(FloatingIP.id.in_(floatingip_ids))
 
         return [self._make_floatingip_dict_with_scope(*row)
                 for row in self._unique_floatingip_iterator(query)]
@@ -1551,6 +1570,10 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
             RouterPort.port_type.in_(device_owners)
         )
 
+        # NOTE: the ports, their fixed ips and bindings are joined eagerly
+        # by the relationships, in this single query. The port dicts are
+        # still built by the core plugin though, as the binding fields come
+        # from its extensions and l3_rpc rebinds the ports from them.
         interfaces = [self._core_plugin._make_port_dict(rp.port, None)
                       for rp in qry]
         return interfaces
@@ -1569,34 +1592,63 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
             yield port
 
     def _get_subnets_by_network_list(self, context, network_ids):
+        """Query the subnets of the networks the router ports are on.
+
+        Only the columns the l3 agents need are queried, the subnets are not
+        built by the core plugin as their extensions (and shared flag) are of
+        no use to the agents. The dns nameservers of all the subnets are
+        fetched with a single additional query.
+        """
         if not network_ids:
             return {}
 
-        query = context.session.query(models_v2.Subnet,
+        query = context.session.query(models_v2.Subnet.id,
+                                      models_v2.Subnet.cidr,
+                                      models_v2.Subnet.gateway_ip,
+                                      models_v2.Subnet.network_id,
+                                      models_v2.Subnet.ipv6_ra_mode,
+                                      models_v2.Subnet.subnetpool_id,
                                       models_v2.SubnetPool.address_scope_id)
         query = query.outerjoin(
             models_v2.SubnetPool,
             models_v2.Subnet.subnetpool_id == models_v2.SubnetPool.id)
         query = query.filter(models_v2.Subnet.network_id.in_(network_ids))
 
-        fields = ['id', 'cidr', 'gateway_ip', 'dns_nameservers',
-                  'network_id', 'ipv6_ra_mode', 'subnetpool_id']
-
-        def make_subnet_dict_with_scope(row):
-            subnet_db, address_scope_id = row
-            subnet = self._core_plugin._make_subnet_dict(
-                subnet_db, fields, context=context)
-            subnet['address_scope_id'] = address_scope_id
-            return subnet
-
         subnets_by_network = dict((id, []) for id in network_ids)
-        for subnet in (make_subnet_dict_with_scope(row) for row in query):
+        subnets_by_id = {}
+        for row in query:
+            subnet = {'id': row.id,
+                      'cidr': row.cidr,
+                      'gateway_ip': row.gateway_ip,
+                      'dns_nameservers': [],
+                      'network_id': row.network_id,
+                      'ipv6_ra_mode': row.ipv6_ra_mode,
+                      'subnetpool_id': row.subnetpool_id,
+                      'address_scope_id': row.address_scope_id}
             subnets_by_network[subnet['network_id']].append(subnet)
+            subnets_by_id[subnet['id']] = subnet
+        if not subnets_by_id:
+            return subnets_by_network
+
+        dns_query = context.session.query(models_v2.DNSNameServer.subnet_id,
+                                          models_v2.DNSNameServer.address)
+        dns_query = dns_query.filter(
+            models_v2.DNSNameServer.subnet_id.in_(list(subnets_by_id)))
+        dns_query = dns_query.order_by(models_v2.DNSNameServer.order)
+        for subnet_id, address in dns_query:
+            subnets_by_id[subnet_id]['dns_nameservers'].append(address)
         return subnets_by_network
 
     def _get_mtus_by_network_list(self, context, network_ids):
+        """Query the MTUs of the networks the router ports are on.
+
+        The MTU is computed by the core plugin, core plugins which can do it
+        without building the networks implement get_networks_mtu().
+        """
         if not network_ids:
             return {}
+        if hasattr(self._core_plugin, 'get_networks_mtu'):
+            return self._core_plugin.get_networks_mtu(context, network_ids)
         filters = {'network_id': network_ids}
         fields = ['id', 'mtu']
         networks = self._core_plugin.get_networks(context, filters=filters,
@@ -1610,13 +1662,31 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
 
         These ports already have fixed_ips populated.
         """
-        network_ids = [p['network_id']
-                       for p in self._each_port_having_fixed_ips(ports)]
+        network_ids = list(set(
+            p['network_id'] for p in self._each_port_having_fixed_ips(ports)))
 
         mtus_by_network = self._get_mtus_by_network_list(context, network_ids)
         subnets_by_network = self._get_subnets_by_network_list(
             context, network_ids)
 
+        # The subnets of a network are shared by all the ports on it, so
+        # their cidrs are parsed once per subnet rather than once per port.
+        subnet_infos_by_network = {}
+        for network_id, subnets in subnets_by_network.items():
+            subnet_infos = []
+            for subnet in subnets:
+                cidr = netaddr.IPNetwork(subnet['cidr'])
+                subnet_info = {'id': subnet['id'],
+                               'cidr': subnet['cidr'],
+                               'gateway_ip': subnet['gateway_ip'],
+                               'dns_nameservers': subnet['dns_nameservers'],
+                               'ipv6_ra_mode': subnet['ipv6_ra_mode'],
+                               'subnetpool_id': subnet['subnetpool_id']}
+                subnet_infos.append((subnet_info, cidr.version,
+                                     cidr.prefixlen,
+                                     subnet['address_scope_id']))
+            subnet_infos_by_network[network_id] = subnet_infos
+
         for port in self._each_port_having_fixed_ips(ports):
 
             port['subnets'] = []
@@ -1624,28 +1694,27 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
             port['address_scopes'] = {lib_constants.IP_VERSION_4: None,
                                       lib_constants.IP_VERSION_6: None}
 
+            # Only the first fixed ip of a port on a subnet gets its prefix
+            # length populated
+            fixed_ips_by_subnet = {}
+            for fixed_ip in port['fixed_ips']:
+                fixed_ips_by_subnet.setdefault(fixed_ip['subnet_id'],
+                                               fixed_ip)
+
             scopes = {}
-            for subnet in subnets_by_network[port['network_id']]:
-                scope = subnet['address_scope_id']
-                cidr = netaddr.IPNetwork(subnet['cidr'])
-                scopes[cidr.version] = scope
+            for subnet_info, ip_version, prefixlen, scope in (
+                    subnet_infos_by_network[port['network_id']]):
+                scopes[ip_version] = scope
 
                 # If this subnet is used by the port (has a matching entry
                 # in the port's fixed_ips), then add this subnet to the
                 # port's subnets list, and populate the fixed_ips entry
                 # entry with the subnet's prefix length.
-                subnet_info = {'id': subnet['id'],
-                               'cidr': subnet['cidr'],
-                               'gateway_ip': subnet['gateway_ip'],
-                               'dns_nameservers': subnet['dns_nameservers'],
-                               'ipv6_ra_mode': subnet['ipv6_ra_mode'],
-                               'subnetpool_id': subnet['subnetpool_id']}
-                for fixed_ip in port['fixed_ips']:
-                    if fixed_ip['subnet_id'] == subnet['id']:
-                        port['subnets'].append(subnet_info)
-                        prefixlen = cidr.prefixlen
-                        fixed_ip['prefixlen'] = prefixlen
-                        break
+                subnet_info = dict(subnet_info)
+                fixed_ip = fixed_ips_by_subnet.get(subnet_info['id'])
+                if fixed_ip:
+                    port['subnets'].append(subnet_info)
+                    fixed_ip['prefixlen'] = prefixlen
                 else:
                     # This subnet is not used by the port.
                     port['extra_subnets'].append(subnet_info)
@@ -1694,6 +1763,33 @@ class L3_NAT_dbonly_mixin(l3.RouterPluginBase,
         self._process_interfaces(routers_dict, interfaces)
         return list(routers_dict.values())
 
+    @db_api.retry_if_session_inactive()
+    def _get_floatingip_router_delta(self, context, router_id,
+                                     floatingip_id):
+        """Build the delta a floating ip change makes to a router.
+
+        The router revision is bumped in the same transaction the floating
+        ip is read in, so the delta carries the router state it applies to.
+        An agent which does not hold the previous revision resyncs the whole
+        router instead of applying the delta.
+        """
+        with context.session.begin(subtransactions=True):
+            router = self._get_router(context.elevated(), router_id)
+            router.bump_revision()
+            context.session.flush()
+            floating_ips = self._get_sync_floating_ips(
+                context, [router_id], floatingip_ids=[floatingip_id])
+            delta = {'router_id': router_id,
+                     'revision_number': router.revision_number}
+        if floating_ips:
+            delta['type'] = n_const.ROUTER_DELTA_FLOATINGIP_ADDED
+            delta['floatingip'] = floating_ips[0]
+        else:
+            # disassociated, moved to another router or deleted
+            delta['type'] = n_const.ROUTER_DELTA_FLOATINGIP_REMOVED
+            delta['floatingip'] = {'id': floatingip_id}
+        return delta
+
 
 class L3RpcNotifierMixin(object):
     """Mixin class to add rpc notifier attribute to db_base_plugin_v2."""
@@ -1794,12 +1890,39 @@ class L3_NAT_db_mixin(L3_NAT_dbonly_mixin, L3RpcNotifierMixin):
             context, router_interface_info, 'remove')
         return router_interface_info
 
+    def notify_floatingip_routers_updated(self, context, router_ids,
+                                          floatingip_id, operation=None):
+        """Notify routers of a change to one of their floating ips.
+
+        The routers must not be distributed, DVR routers are notified on
+        the hosts of the floating ip ports instead.
+        """
+        router_ids = [router_id for router_id in router_ids if router_id]
+        if not router_ids:
+            return
+        if not cfg.CONF.router_delta_updates:
+            super(L3_NAT_db_mixin, self).notify_routers_updated(
+                context, router_ids, operation, {})
+            return
+        deltas = []
+        for router_id in router_ids:
+            try:
+                deltas.append(self._get_floatingip_router_delta(
+                    context, router_id, floatingip_id))
+            except l3.RouterNotFound:
+                # the router deletion is notified on its own
+                LOG.debug("Router %s was not found. Skipping floating ip "
+                          "delta.", router_id)
+        if deltas:
+            self.l3_rpc_notifier.routers_delta_updated(context, deltas)
+
     def create_floatingip(self, context, floatingip,
             initial_status=lib_constants.FLOATINGIP_STATUS_ACTIVE):
         floatingip_dict = super(L3_NAT_db_mixin, self).create_floatingip(
             context, floatingip, initial_status)
         router_id = floatingip_dict['router_id']
-        self.notify_router_updated(context, router_id, 'create_floatingip')
+        self.notify_floatingip_routers_updated(
+            context, [router_id], floatingip_dict['id'], 'create_floatingip')
         return floatingip_dict
 
     def update_floatingip(self, context, id, floatingip):
@@ -1807,14 +1930,14 @@ class L3_NAT_db_mixin(L3_NAT_dbonly_mixin, L3RpcNotifierMixin):
             context, id, floatingip)
         router_ids = self._floatingips_to_router_ids(
             [old_floatingip, floatingip])
-        super(L3_NAT_db_mixin, self).notify_routers_updated(
-            context, router_ids, 'update_floatingip', {})
+        self.notify_floatingip_routers_updated(
+            context, router_ids, id, 'update_floatingip')
         return floatingip
 
     def delete_floatingip(self, context, id):
         floating_ip = self._delete_floatingip(context, id)
-        self.notify_router_updated(context, floating_ip['router_id'],
-                                   'delete_floatingip')
+        self.notify_floatingip_routers_updated(
+            context, [floating_ip['router_id']], id, 'delete_floatingip')
 
     def disassociate_floatingips(self, context, port_id, do_notify=True):
         """Disassociate all floating IPs linked to specific port.
@@ -1001,7 +1001,8 @@ class L3_NAT_with_dvr_db_mixin(l3_db.L3_NAT_db_mixin,
                 self.l3_rpc_notifier.routers_updated_on_host(
                     context, [router_id], dest_host)
         else:
-            self.notify_router_updated(context, router_id)
+            self.notify_floatingip_routers_updated(
+                context, [router_id], floating_ip['id'])
 
     def update_floatingip(self, context, id, floatingip):
         old_floatingip, floatingip = self._update_floatingip(
@@ -25,10 +25,15 @@ from neutron.db import standard_attr
 
 LOG = logging.getLogger(__name__)
 PROVISIONING_COMPLETE = 'provisioning_complete'
+# emitted once for all the objects whose provisioning was completed together,
+# in addition to PROVISIONING_COMPLETE for each of them
+BULK_PROVISIONING_COMPLETE = 'bulk_provisioning_complete'
 # identifiers for the various entities that participate in provisioning
 DHCP_ENTITY = 'DHCP'
 L2_AGENT_ENTITY = 'L2'
 _RESOURCE_TO_MODEL_MAP = {resources.PORT: models_v2.Port}
+# maximum number of objects looked up with a single query by the bulk methods
+_BULK_QUERY_SIZE = 500
 
 
 class ProvisioningBlock(model_base.BASEV2):
@@ -150,6 +155,73 @@ def provisioning_complete(context, object_id, object_type, entity):
         registry.notify(object_type, PROVISIONING_COMPLETE,
                         'neutron.db.provisioning_blocks',
                         context=context, object_id=object_id)
+        registry.notify(object_type, BULK_PROVISIONING_COMPLETE,
+                        'neutron.db.provisioning_blocks',
+                        context=context, object_ids=[object_id])
+
+
+def bulk_provisioning_complete(context, object_ids, object_type, entity):
+    """Mark that the provisioning for many objects has been completed.
+
+    Behaves like provisioning_complete called for each object, but the
+    provisioning blocks of the entity are removed from all the objects in a
+    single transaction, and the objects are looked up with a few queries
+    instead of a handful of queries per object. Once the blocks are removed,
+    a callback is triggered for each object with no remaining provisioning
+    components, then a single BULK_PROVISIONING_COMPLETE callback for all of
+    them.
+
+    :param context: neutron api request context
+    :param object_ids: IDs of the objects that have been provisioned
+    :param object_type: callback resource type of the objects
+    :param entity: The entity that has provisioned the objects
+    """
+    # this can't be called in a transaction to avoid REPEATABLE READ
+    # tricking us into thinking there are remaining provisioning components
+    if context.session.is_active:
+        raise RuntimeError(_LE("Must not be called in a transaction"))
+    model = _get_model(object_type)
+    standard_attr_ids = {}
+    for chunk in _chunks(list(object_ids)):
+        standard_attr_ids.update(
+            context.session.query(model.id, model.standard_attr_id).
+            enable_eagerloads(False).filter(model.id.in_(chunk)))
+    if not standard_attr_ids:
+        return
+    with context.session.begin(subtransactions=True):
+        for chunk in _chunks(list(standard_attr_ids.values())):
+            context.session.query(ProvisioningBlock).filter(
+                ProvisioningBlock.standard_attr_id.in_(chunk),
+                ProvisioningBlock.entity == entity).delete(
+                    synchronize_session=False)
+    # now with that committed, check which objects have records left
+    blocked = set()
+    for chunk in _chunks(list(standard_attr_ids.values())):
+        blocked.update(
+            record.standard_attr_id for record in
+            context.session.query(ProvisioningBlock.standard_attr_id).filter(
+                ProvisioningBlock.standard_attr_id.in_(chunk)))
+    completed = [object_id for object_id in object_ids
+                 if object_id in standard_attr_ids and
+                 standard_attr_ids[object_id] not in blocked]
+    LOG.debug("Provisioning by entity %(entity)s complete for %(count)d "
+              "%(otype)s objects, %(blocked)d are still blocked.",
+              {'entity': entity, 'count': len(completed),
+               'otype': object_type, 'blocked': len(blocked)})
+    if not completed:
+        return
+    for object_id in completed:
+        registry.notify(object_type, PROVISIONING_COMPLETE,
+                        'neutron.db.provisioning_blocks',
+                        context=context, object_id=object_id)
+    registry.notify(object_type, BULK_PROVISIONING_COMPLETE,
+                    'neutron.db.provisioning_blocks',
+                    context=context, object_ids=completed)
+
+
+def _chunks(items):
+    for i in range(0, len(items), _BULK_QUERY_SIZE):
+        yield items[i:i + _BULK_QUERY_SIZE]
 
 
 def is_object_blocked(context, object_id, object_type):
@@ -168,13 +240,37 @@ def is_object_blocked(context, object_id, object_type):
                 standard_attr_id=standard_attr_id).count())
 
 
-def _get_standard_attr_id(context, object_id, object_type):
+def get_blocked_object_ids(context, object_ids, object_type):
+    """Return the IDs of the objects which have a provisioning block.
+
+    :param context: neutron api request context
+    :param object_ids: IDs of the objects to check
+    :param object_type: callback resource type of the objects
+    """
+    model = _get_model(object_type)
+    blocked = set()
+    for chunk in _chunks(list(object_ids)):
+        blocked.update(
+            object_id for object_id, in
+            context.session.query(model.id).enable_eagerloads(False).join(
+                ProvisioningBlock,
+                ProvisioningBlock.standard_attr_id == model.standard_attr_id).
+            filter(model.id.in_(chunk)).distinct())
+    return blocked
+
+
+def _get_model(object_type):
     model = _RESOURCE_TO_MODEL_MAP.get(object_type)
     if not model:
         raise RuntimeError(_LE("Could not find model for %s. If you are "
                                "adding provisioning blocks for a new resource "
                                "you must call add_model_for_resource during "
                                "initialization for your type.") % object_type)
+    return model
+
+
+def _get_standard_attr_id(context, object_id, object_type):
+    model = _get_model(object_type)
     obj = (context.session.query(model).enable_eagerloads(False).
            filter_by(id=object_id).first())
     if not obj:
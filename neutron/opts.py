@@ -45,6 +45,7 @@ import neutron.db.agentschedulers_db
 import neutron.db.dvr_mac_db
 import neutron.db.extraroute_db
 import neutron.db.l3_agentschedulers_db
+import neutron.db.l3_db
 import neutron.db.l3_dvr_db
 import neutron.db.l3_gwmode_db
 import neutron.db.l3_hamode_db
@@ -84,6 +85,7 @@ def list_agent_opts():
         ('agent',
          itertools.chain(
              neutron.agent.common.config.ROOT_HELPER_OPTS,
+             neutron.agent.common.config.COMMAND_ACCOUNTING_OPTS,
              neutron.agent.common.config.AGENT_STATE_OPTS,
              neutron.agent.common.config.IPTABLES_OPTS,
              neutron.agent.common.config.PROCESS_MONITOR_OPTS,
@@ -117,6 +119,7 @@ def list_db_opts():
          itertools.chain(
              neutron.db.agents_db.AGENT_OPTS,
              neutron.db.extraroute_db.extra_route_opts,
+             neutron.db.l3_db.L3_DB_OPTS,
              neutron.db.l3_gwmode_db.OPTS,
              neutron.db.agentschedulers_db.AGENTS_SCHEDULER_OPTS,
              neutron.db.dvr_mac_db.dvr_mac_address_opts,
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from debtcollector import moves
 from neutron_lib import constants as n_const
 from oslo_db import exception as db_exc
@@ -124,6 +126,22 @@ def get_binding_levels(session, port_id, host):
         return result
 
 
+def get_binding_levels_by_port(session, port_ids):
+    """Return the binding levels of many ports, ordered by level.
+
+    The levels are grouped by (port_id, host).
+    """
+    result = collections.defaultdict(list)
+    for i in range(0, len(port_ids), MAX_PORTS_PER_QUERY):
+        query = (session.query(models.PortBindingLevel).
+                 filter(models.PortBindingLevel.port_id.in_(
+                     port_ids[i:i + MAX_PORTS_PER_QUERY])).
+                 order_by(models.PortBindingLevel.level))
+        for level in query:
+            result[(level.port_id, level.host)].append(level)
+    return result
+
+
 def clear_binding_levels(session, port_id, host):
     if host:
         (session.query(models.PortBindingLevel).
@@ -183,6 +201,17 @@ def get_port(session, port_id):
             return
 
 
+def get_ports(session, port_ids):
+    """Get the records of many ports for update within transaction."""
+
+    ports = []
+    with session.begin(subtransactions=True):
+        for i in range(0, len(port_ids), MAX_PORTS_PER_QUERY):
+            ports.extend(session.query(models_v2.Port).filter(
+                models_v2.Port.id.in_(port_ids[i:i + MAX_PORTS_PER_QUERY])))
+    return ports
+
+
 def get_port_from_device_mac(context, device_mac):
     LOG.debug("get_port_from_device_mac() called for mac %s", device_mac)
     qry = context.session.query(models_v2.Port).filter_by(
@@ -29,6 +29,7 @@ from osprofiler import profiler
 
 from neutron._i18n import _LE, _LI
 from neutron.agent.l2 import l2_agent_extensions_manager as ext_manager
+from neutron.agent.linux import polling
 from neutron.agent import rpc as agent_rpc
 from neutron.agent import securitygroups_rpc as sg_rpc
 from neutron.api.rpc.callbacks import resources
@@ -364,11 +365,25 @@ class CommonAgentLoop(service.Service):
                 if previous_timestamps.get(device) and
                 timestamp != previous_timestamps.get(device)}
 
-    def scan_devices(self, previous, sync):
+    def scan_devices(self, previous, sync, polling_required=True):
+        """Compute the device changes since the previous iteration.
+
+        If polling_required is False, the local devices are assumed to be
+        unchanged since the previous scan and only the devices updated on
+        the server side are reported.
+        """
         device_info = {}
 
         updated_devices = self.rpc_callbacks.get_and_clear_updated_devices()
 
+        if previous is not None and not polling_required and not sync:
+            device_info['current'] = previous['current']
+            device_info['timestamps'] = previous['timestamps']
+            device_info['added'] = set()
+            device_info['removed'] = set()
+            device_info['updated'] = updated_devices & previous['current']
+            return device_info
+
         current_devices = self.mgr.get_all_devices()
         device_info['current'] = current_devices
 
@@ -426,6 +441,12 @@ class CommonAgentLoop(service.Service):
 
     def daemon_loop(self):
         LOG.info(_LI("%s Agent RPC Daemon Started!"), self.agent_type)
+        with polling.get_link_polling_manager(
+                cfg.CONF.AGENT.monitor_link_events,
+                cfg.CONF.AGENT.link_monitor_resync_interval) as pm:
+            self.rpc_loop(polling_manager=pm)
+
+    def rpc_loop(self, polling_manager):
         device_info = None
         sync = True
 
@@ -440,7 +461,11 @@ class CommonAgentLoop(service.Service):
                 LOG.info(_LI("%s Agent out of sync with plugin!"),
                          self.agent_type)
 
-            device_info = self.scan_devices(previous=device_info, sync=sync)
+            polling_required = polling_manager.is_polling_required
+            device_info = self.scan_devices(previous=device_info, sync=sync,
+                                            polling_required=polling_required)
+            if polling_required or sync:
+                polling_manager.polling_completed()
             sync = False
 
             if (self._device_info_has_changes(device_info)
@@ -20,6 +20,7 @@
 # Neutron OpenVSwitch Plugin.
 
 import sys
+import time
 
 import netaddr
 from neutron_lib import constants
@@ -712,6 +713,83 @@ class LinuxBridgeManager(amb.CommonAgentManagerBase):
                 bridge_lib.FdbInterface.delete(mac, interface, agent_ip,
                                                check_exit_code=False)
 
+    def _get_fdb_bridge_entries(self, interface):
+        entries = set()
+        output = bridge_lib.FdbInterface.show(interface,
+                                              check_exit_code=False)
+        for line in (output or '').splitlines():
+            fields = line.split()
+            if not fields:
+                continue
+            ip_dst = None
+            if 'dst' in fields[1:-1]:
+                ip_dst = fields[fields.index('dst') + 1]
+            entries.add((fields[0], ip_dst))
+        return entries
+
+    def _get_fdb_ip_entries(self, interface):
+        entries = set()
+        output = utils.execute(['ip', 'neigh', 'show', 'dev', interface],
+                               run_as_root=True, check_exit_code=False)
+        for line in (output or '').splitlines():
+            fields = line.split()
+            if 'lladdr' in fields[1:-1]:
+                entries.add((fields[fields.index('lladdr') + 1], fields[0]))
+        return entries
+
+    def add_fdb_entries_batch(self, agent_ports, interface):
+        """Add the FDB entries of several agents on one VXLAN device.
+
+        Entries already known by the kernel are skipped, the missing FDB
+        entries are applied with a single bridge command.
+
+        :param agent_ports: dict of agent_ip -> list of (mac, ip) tuples.
+        :returns: the number of FDB and neighbor entries programmed.
+        """
+        fdb_entries = self._get_fdb_bridge_entries(interface)
+        fdb_macs = set(mac for mac, ip_dst in fdb_entries)
+        ip_entries = (self._get_fdb_ip_entries(interface)
+                      if cfg.CONF.VXLAN.arp_responder else set())
+        ops = []
+        count = 0
+        for agent_ip, ports in agent_ports.items():
+            for mac, ip in ports:
+                if mac != constants.FLOODING_ENTRY[0]:
+                    if cfg.CONF.VXLAN.arp_responder and (
+                            (mac, ip) not in ip_entries):
+                        self.add_fdb_ip_entry(mac, ip, interface)
+                        count += 1
+                    if (mac, agent_ip) not in fdb_entries:
+                        ops.append(('replace', mac, interface, agent_ip))
+                elif (self.vxlan_mode == lconst.VXLAN_UCAST and
+                        (mac, agent_ip) not in fdb_entries):
+                    op = 'append' if mac in fdb_macs else 'add'
+                    ops.append((op, mac, interface, agent_ip))
+                    fdb_macs.add(mac)
+                fdb_entries.add((mac, agent_ip))
+        bridge_lib.FdbInterface.batch(ops, check_exit_code=False)
+        return count + len(ops)
+
+    def remove_fdb_entries_batch(self, agent_ports, interface):
+        """Remove the FDB entries of several agents on one VXLAN device.
+
+        :param agent_ports: dict of agent_ip -> list of (mac, ip) tuples.
+        :returns: the number of FDB and neighbor entries removed.
+        """
+        ops = []
+        count = 0
+        for agent_ip, ports in agent_ports.items():
+            for mac, ip in ports:
+                if mac != constants.FLOODING_ENTRY[0]:
+                    if cfg.CONF.VXLAN.arp_responder:
+                        self.remove_fdb_ip_entry(mac, ip, interface)
+                        count += 1
+                    ops.append(('delete', mac, interface, agent_ip))
+                elif self.vxlan_mode == lconst.VXLAN_UCAST:
+                    ops.append(('delete', mac, interface, agent_ip))
+        bridge_lib.FdbInterface.batch(ops, check_exit_code=False)
+        return count + len(ops)
+
     def get_agent_id(self):
         if self.bridge_mappings:
             mac = utils.get_interface_mac(
@@ -834,6 +912,11 @@ class LinuxBridgeRpcCallbacks(
                 segment.segmentation_id)
 
             agent_ports = values.get('ports')
+            if cfg.CONF.VXLAN.batch_fdb_updates:
+                self._fdb_batch(network_id, interface, agent_ports,
+                                self.agent.mgr.add_fdb_entries_batch)
+                continue
+
             for agent_ip, ports in agent_ports.items():
                 if agent_ip == self.agent.mgr.local_ip:
                     continue
@@ -856,6 +939,11 @@ class LinuxBridgeRpcCallbacks(
                 segment.segmentation_id)
 
             agent_ports = values.get('ports')
+            if cfg.CONF.VXLAN.batch_fdb_updates:
+                self._fdb_batch(network_id, interface, agent_ports,
+                                self.agent.mgr.remove_fdb_entries_batch)
+                continue
+
             for agent_ip, ports in agent_ports.items():
                 if agent_ip == self.agent.mgr.local_ip:
                     continue
@@ -864,6 +952,19 @@ class LinuxBridgeRpcCallbacks(
                                                   ports,
                                                   interface)
 
+    def _fdb_batch(self, network_id, interface, agent_ports, apply_entries):
+        start = time.time()
+        agent_ports = {agent_ip: ports
+                       for agent_ip, ports in agent_ports.items()
+                       if agent_ip != self.agent.mgr.local_ip}
+        count = apply_entries(agent_ports, interface)
+        LOG.debug("FDB entries of network %(network_id)s on %(interface)s "
+                  "converged in %(elapsed).3fs, %(count)d entries "
+                  "programmed for %(agents)d agents",
+                  {'network_id': network_id, 'interface': interface,
+                   'elapsed': time.time() - start, 'count': count,
+                   'agents': len(agent_ports)})
+
     def _fdb_chg_ip(self, context, fdb_entries):
         LOG.debug("update chg_ip received")
         for network_id, agent_ports in fdb_entries.items():
@@ -63,7 +63,7 @@ class PciOsWrapper(object):
         return vf_list
 
     @classmethod
-    def is_assigned_vf(cls, dev_name, vf_index):
+    def is_assigned_vf(cls, dev_name, vf_index, get_macvtap_ifnames=None):
         """Check if VF is assigned.
 
         Checks if a given vf index of a given device name is assigned
@@ -73,6 +73,10 @@ class PciOsWrapper(object):
             Macvtap VF: macvtap@<vf interface> interface exists in ip link show
         @param dev_name: pf network device name
         @param vf_index: vf index
+        @param get_macvtap_ifnames: optional callable returning the set of
+                                    vf interfaces with a macvtap interface,
+                                    used instead of running ip link show
+                                    for each interface
         """
         path = cls.PCI_PATH % (dev_name, vf_index)
 
@@ -86,7 +90,10 @@ class PciOsWrapper(object):
         # for macvtap interface. Therefore we workaround it
         # by parsing ip link show and checking if macvtap interface exists
         for ifname in ifname_list:
-            if pci_lib.PciDeviceIPWrapper.is_macvtap_assigned(ifname):
+            if get_macvtap_ifnames is not None:
+                if ifname in get_macvtap_ifnames():
+                    return True
+            elif pci_lib.PciDeviceIPWrapper.is_macvtap_assigned(ifname):
                 return True
         return False
 
@@ -98,6 +105,8 @@ class EmbSwitch(object):
     connected to  same physical network
     Each physical network is mapped to PF network device interface,
     meaning all its VF, excluding the devices in exclude_device list.
+    The VF details are read once and cached until clear_vf_cache() is
+    called, typically once per agent loop iteration.
     @ivar pci_slot_map: dictionary for mapping each pci slot to vf index
     @ivar pci_dev_wrapper: pci device wrapper
     """
@@ -113,9 +122,21 @@ class EmbSwitch(object):
         self.dev_name = dev_name
         self.pci_slot_map = {}
         self.pci_dev_wrapper = pci_lib.PciDeviceIPWrapper(dev_name)
+        self._macvtap_ifnames = None
 
         self._load_devices(exclude_devices)
 
+    def clear_vf_cache(self):
+        """Drop the cached VF and macvtap details."""
+        self._macvtap_ifnames = None
+        self.pci_dev_wrapper.clear_vf_cache()
+
+    def _get_macvtap_ifnames(self):
+        if self._macvtap_ifnames is None:
+            self._macvtap_ifnames = (
+                pci_lib.PciDeviceIPWrapper.get_macvtap_assigned_interfaces())
+        return self._macvtap_ifnames
+
     def _load_devices(self, exclude_devices):
         """Load devices from driver and filter if needed.
 
@@ -139,7 +160,8 @@ class EmbSwitch(object):
         vf_to_pci_slot_mapping = {}
         assigned_devices_info = []
         for pci_slot, vf_index in self.pci_slot_map.items():
-            if not PciOsWrapper.is_assigned_vf(self.dev_name, vf_index):
+            if not PciOsWrapper.is_assigned_vf(self.dev_name, vf_index,
+                                               self._get_macvtap_ifnames):
                 continue
             vf_to_pci_slot_mapping[vf_index] = pci_slot
         if vf_to_pci_slot_mapping:
@@ -230,7 +252,8 @@ class EmbSwitch(object):
         vf_index = self.pci_slot_map.get(pci_slot)
         mac = None
         if vf_index is not None:
-            if PciOsWrapper.is_assigned_vf(self.dev_name, vf_index):
+            if PciOsWrapper.is_assigned_vf(self.dev_name, vf_index,
+                                           self._get_macvtap_ifnames):
                 macs = self.pci_dev_wrapper.get_assigned_macs([vf_index])
                 mac = macs.get(vf_index)
         return mac
@@ -247,6 +270,12 @@ class ESwitchManager(object):
             cls.pci_slot_map = {}
         return cls._instance
 
+    def clear_vf_cache(self):
+        """Drop the cached VF details of all embedded switches."""
+        for eswitch_list in self.emb_switches_map.values():
+            for embedded_switch in eswitch_list:
+                embedded_switch.clear_vf_cache()
+
     def device_exists(self, device_mac, pci_slot):
         """Verify if device exists.
 
@@ -33,12 +33,16 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
     VF_PATTERN = r"^vf\s+(?P<vf_index>\d+)\s+"
     MAC_PATTERN = r"MAC\s+(?P<mac>[a-fA-F0-9:]+),"
     STATE_PATTERN = r"\s+link-state\s+(?P<state>\w+)"
+    SPOOFCHK_PATTERN = r"spoof checking\s+(?P<spoofchk>\w+)"
+    RATE_PATTERN = r"(?P<rate_type>max_tx_rate|min_tx_rate)\s+(?P<rate>\d+)"
     ANY_PATTERN = ".*,"
     MACVTAP_PATTERN = r".*macvtap[0-9]+@(?P<vf_interface>[a-zA-Z0-9_]+):"
 
     VF_LINE_FORMAT = VF_PATTERN + MAC_PATTERN + ANY_PATTERN + STATE_PATTERN
     VF_DETAILS_REG_EX = re.compile(VF_LINE_FORMAT)
     MACVTAP_REG_EX = re.compile(MACVTAP_PATTERN)
+    SPOOFCHK_REG_EX = re.compile(SPOOFCHK_PATTERN)
+    RATE_REG_EX = re.compile(RATE_PATTERN)
 
     IP_LINK_OP_NOT_SUPPORTED = 'RTNETLINK answers: Operation not supported'
 
@@ -49,6 +53,47 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
     def __init__(self, dev_name):
         super(PciDeviceIPWrapper, self).__init__()
         self.dev_name = dev_name
+        self._vf_details = None
+
+    def clear_vf_cache(self):
+        """Drop the cached VF snapshot
+
+        The next query runs ip link show on the PF again.
+        """
+        self._vf_details = None
+
+    def _get_vf_details(self):
+        """Get the details of all VFs of the PF
+
+        The output of ip link show is parsed once and cached until
+        clear_vf_cache() is called.
+        @return: dict mapping of vf index to vf details
+        """
+        if self._vf_details is None:
+            try:
+                out = self._as_root([], "link", ("show", self.dev_name))
+            except Exception as e:
+                LOG.exception(_LE("Failed executing ip command"))
+                raise exc.IpCommandDeviceError(dev_name=self.dev_name,
+                                               reason=e)
+            vf_details = {}
+            for line in out.split("\n"):
+                line = line.strip()
+                if line.startswith("vf"):
+                    details = self._parse_vf_link_show(line)
+                    if details:
+                        vf_details[details["vf"]] = details
+            self._vf_details = vf_details
+        return self._vf_details
+
+    def _is_cached_feature(self, vf_index, feature, value):
+        if self._vf_details is None:
+            return False
+        return self._vf_details.get(vf_index, {}).get(feature) == value
+
+    def _cache_feature(self, vf_index, feature, value):
+        if self._vf_details is not None and vf_index in self._vf_details:
+            self._vf_details[vf_index][feature] = value
 
     def _set_feature(self, vf_index, feature, value):
         """Sets vf feature
@@ -66,6 +111,7 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
             self._as_root([], "link", ("set", self.dev_name, "vf",
                                        str(vf_index), feature, value))
         except Exception as e:
+            self.clear_vf_cache()
             if self.IP_LINK_OP_NOT_SUPPORTED in str(e):
                 raise exc.IpCommandOperationNotSupportedError(
                     dev_name=self.dev_name)
@@ -79,21 +125,14 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
         @param vf_list: list of vf indexes
         @return: dict mapping of vf to mac
         """
-        try:
-            out = self._as_root([], "link", ("show", self.dev_name))
-        except Exception as e:
-            LOG.exception(_LE("Failed executing ip command"))
-            raise exc.IpCommandDeviceError(dev_name=self.dev_name,
-                                           reason=e)
+        vf_details = self._get_vf_details()
         vf_to_mac_mapping = {}
-        vf_lines = self._get_vf_link_show(vf_list, out)
-        if vf_lines:
-            for vf_line in vf_lines:
-                vf_details = self._parse_vf_link_show(vf_line)
-                if vf_details:
-                    vf_num = vf_details.get('vf')
-                    vf_mac = vf_details.get("MAC")
-                    vf_to_mac_mapping[vf_num] = vf_mac
+        for vf_index in vf_list:
+            if vf_index in vf_details:
+                vf_to_mac_mapping[vf_index] = vf_details[vf_index]["MAC"]
+        if not vf_to_mac_mapping:
+            LOG.warning(_LW("Cannot find vfs %(vfs)s in device %(dev_name)s"),
+                        {'vfs': vf_list, 'dev_name': self.dev_name})
         return vf_to_mac_mapping
 
     def get_vf_state(self, vf_index):
@@ -102,21 +141,13 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
         @param vf_index: vf index
         @todo: Handle "auto" state
         """
-        try:
-            out = self._as_root([], "link", ("show", self.dev_name))
-        except Exception as e:
-            LOG.exception(_LE("Failed executing ip command"))
-            raise exc.IpCommandDeviceError(dev_name=self.dev_name,
-                                           reason=e)
-        vf_lines = self._get_vf_link_show([vf_index], out)
-        if vf_lines:
-            vf_details = self._parse_vf_link_show(vf_lines[0])
-            if vf_details:
-                state = vf_details.get("link-state",
-                                       self.LinkState.DISABLE)
-            if state != self.LinkState.DISABLE:
-                return True
-        return False
+        vf_details = self._get_vf_details().get(vf_index)
+        if vf_details is None:
+            LOG.warning(_LW("Cannot find vfs %(vfs)s in device %(dev_name)s"),
+                        {'vfs': [vf_index], 'dev_name': self.dev_name})
+            return False
+        state = vf_details.get("link-state", self.LinkState.DISABLE)
+        return state != self.LinkState.DISABLE
 
     def set_vf_state(self, vf_index, state):
         """sets vf state.
@@ -126,7 +157,10 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
         """
         status_str = self.LinkState.ENABLE if state else \
             self.LinkState.DISABLE
+        if self._is_cached_feature(vf_index, "link-state", status_str):
+            return
         self._set_feature(vf_index, "state", status_str)
+        self._cache_feature(vf_index, "link-state", status_str)
 
     def set_vf_spoofcheck(self, vf_index, enabled):
         """sets vf spoofcheck
@@ -136,7 +170,10 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
                         False to disable
         """
         setting = "on" if enabled else "off"
+        if self._is_cached_feature(vf_index, "spoofchk", setting):
+            return
         self._set_feature(vf_index, "spoofchk", setting)
+        self._cache_feature(vf_index, "spoofchk", setting)
 
     def set_vf_rate(self, vf_index, rate_type, rate_value):
         """sets vf rate.
@@ -145,28 +182,12 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
         @param rate_type: vf rate type ('rate', 'min_tx_rate')
         @param rate_value: vf rate in Mbps
         """
+        # NOTE: ip link show reports the 'rate' setting as max_tx_rate
+        cached_type = "max_tx_rate" if rate_type == "rate" else rate_type
+        if self._is_cached_feature(vf_index, cached_type, rate_value):
+            return
         self._set_feature(vf_index, rate_type, str(rate_value))
-
-    def _get_vf_link_show(self, vf_list, link_show_out):
-        """Get link show output for VFs
-
-        get vf link show command output filtered by given vf list
-        @param vf_list: list of vf indexes
-        @param link_show_out: link show command output
-        @return: list of output rows regarding given vf_list
-        """
-        vf_lines = []
-        for line in link_show_out.split("\n"):
-            line = line.strip()
-            if line.startswith("vf"):
-                details = line.split()
-                index = int(details[1])
-                if index in vf_list:
-                    vf_lines.append(line)
-        if not vf_lines:
-            LOG.warning(_LW("Cannot find vfs %(vfs)s in device %(dev_name)s"),
-                        {'vfs': vf_list, 'dev_name': self.dev_name})
-        return vf_lines
+        self._cache_feature(vf_index, cached_type, rate_value)
 
     def _parse_vf_link_show(self, vf_line):
         """Parses vf link show command output line.
@@ -179,12 +200,38 @@ class PciDeviceIPWrapper(ip_lib.IPWrapper):
             vf_details["vf"] = int(pattern_match.group("vf_index"))
             vf_details["MAC"] = pattern_match.group("mac")
             vf_details["link-state"] = pattern_match.group("state")
+            spoofchk_match = self.SPOOFCHK_REG_EX.search(vf_line)
+            if spoofchk_match:
+                vf_details["spoofchk"] = spoofchk_match.group("spoofchk")
+            for rate_match in self.RATE_REG_EX.finditer(vf_line):
+                vf_details[rate_match.group("rate_type")] = int(
+                    rate_match.group("rate"))
         else:
             LOG.warning(_LW("failed to parse vf link show line %(line)s: "
                             "for %(device)s"),
                         {'line': vf_line, 'device': self.dev_name})
         return vf_details
 
+    @classmethod
+    def get_macvtap_assigned_interfaces(cls):
+        """Get the vf interfaces which have a macvtap interface assigned
+
+        Same as is_macvtap_assigned but for all interfaces at once.
+        @return: set of vf interface names
+        """
+        try:
+            out = cls._execute([], "link", ("show", ), run_as_root=True)
+        except Exception as e:
+            LOG.error(_LE("Failed executing ip command: %s"), e)
+            raise exc.IpCommandError(reason=e)
+
+        ifnames = set()
+        for line in out.splitlines():
+            pattern_match = cls.MACVTAP_REG_EX.match(line)
+            if pattern_match:
+                ifnames.add(pattern_match.group('vf_interface'))
+        return ifnames
+
     @classmethod
     def is_macvtap_assigned(cls, ifname):
         """Check if vf has macvtap interface assigned
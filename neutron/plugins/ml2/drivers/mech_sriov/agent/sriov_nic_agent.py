@@ -377,6 +377,9 @@ class SriovNicSwitchAgent(object):
             updated_devices_copy = self.updated_devices
             self.updated_devices = set()
             try:
+                # Read the VF details once per iteration instead of once
+                # per VF query.
+                self.eswitch_mgr.clear_vf_cache()
                 device_info = self.scan_devices(devices, updated_devices_copy)
                 if self._device_info_has_changes(device_info):
                     LOG.debug("Agent loop found changes! %s", device_info)
@@ -161,8 +161,8 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         self.type_manager.initialize()
         self.extension_manager.initialize()
         self.mechanism_manager.initialize()
-        registry.subscribe(self._port_provisioned, resources.PORT,
-                           provisioning_blocks.PROVISIONING_COMPLETE)
+        registry.subscribe(self._ports_provisioned, resources.PORT,
+                           provisioning_blocks.BULK_PROVISIONING_COMPLETE)
         registry.subscribe(self._handle_segment_change, resources.SEGMENT,
                            events.PRECOMMIT_CREATE)
         registry.subscribe(self._handle_segment_change, resources.SEGMENT,
@@ -208,9 +208,94 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
                         driver=extension_driver, service_plugin=service_plugin
                     )
 
-    def _port_provisioned(self, rtype, event, trigger, context, object_id,
-                          **kwargs):
-        port_id = object_id
+    def _ports_provisioned(self, rtype, event, trigger, context, object_ids,
+                           **kwargs):
+        """Set the status of the provisioned ports to ACTIVE.
+
+        The ports are looked up and their status is updated in a single
+        transaction for all of them, the mechanism drivers and the
+        subscribers of port updates are then notified for each port.
+        """
+        session = context.session
+        mech_contexts = []
+        try:
+            with session.begin(subtransactions=True):
+                ports = self._get_ports_to_activate(context, object_ids)
+                networks = {
+                    network['id']: network for network in self.get_networks(
+                        context, filters={'id': list(set(
+                            port.network_id for port in ports))})}
+                levels = db.get_binding_levels_by_port(
+                    session, [port.id for port in ports])
+                for port in ports:
+                    original_port = self._make_port_dict(port)
+                    port.status = const.PORT_STATUS_ACTIVE
+                    updated_port = self._make_port_dict(port)
+                    binding = port.port_binding
+                    mech_context = driver_context.PortContext(
+                        self, context, updated_port,
+                        networks[port.network_id], binding,
+                        levels.get((port.id, binding.host), []),
+                        original_port=original_port)
+                    self.mechanism_manager.update_port_precommit(
+                        mech_context)
+                    mech_contexts.append(mech_context)
+        except Exception:
+            # a port failing to be updated must not prevent the others from
+            # being updated
+            LOG.warning(_LW("Unable to update the status of %d provisioned "
+                            "ports at once, updating them one by one."),
+                        len(object_ids), exc_info=True)
+            for port_id in object_ids:
+                self._port_provisioned(context, port_id)
+            return
+
+        for mech_context in mech_contexts:
+            try:
+                self.mechanism_manager.update_port_postcommit(mech_context)
+            except ml2_exc.MechanismDriverError:
+                LOG.exception(_LE("update_port_postcommit failed for port "
+                                  "%s"), mech_context.current['id'])
+                continue
+            # NOTE(kevinbenton): the update_device_up kwarg was carried over
+            # from the RPC handler that used to call update_port_status
+            registry.notify(resources.PORT, events.AFTER_UPDATE, self,
+                            context=context, port=mech_context.current,
+                            original_port=mech_context.original,
+                            update_device_up=True)
+
+    def _get_ports_to_activate(self, context, port_ids):
+        """Return the provisioned ports whose status must become ACTIVE."""
+        ports = []
+        for port in db.get_ports(context.session, port_ids):
+            if not port.port_binding:
+                LOG.debug("Port %s was deleted so its status cannot be "
+                          "updated.", port.id)
+            elif port.port_binding.vif_type in (
+                    portbindings.VIF_TYPE_BINDING_FAILED,
+                    portbindings.VIF_TYPE_UNBOUND):
+                # NOTE(kevinbenton): we hit here when a port is created
+                # without a host ID and the dhcp agent notifies that its
+                # wiring is done
+                LOG.debug("Port %s cannot update to ACTIVE because it "
+                          "is not bound.", port.id)
+            elif (port.status != const.PORT_STATUS_ACTIVE and
+                  port.device_owner != const.DEVICE_OWNER_DVR_INTERFACE):
+                # the status of distributed ports is set per host by their
+                # agents
+                ports.append(port)
+        # the ports are bound, but we have to check for new provisioning
+        # blocks one last time to detect the case where we were triggered by
+        # an unbound port and the port became bound with new provisioning
+        # blocks before the ports were looked up above
+        blocked = provisioning_blocks.get_blocked_object_ids(
+            context, [port.id for port in ports], resources.PORT)
+        for port_id in blocked:
+            LOG.debug("Port %s had new provisioning blocks added so it "
+                      "will not transition to active.", port_id)
+        return [port for port in ports if port.id not in blocked]
+
+    def _port_provisioned(self, context, port_id):
         port = db.get_port(context.session, port_id)
         if not port or not port.port_binding:
             LOG.debug("Port %s was deleted so its status cannot be updated.",
@@ -218,21 +303,14 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             return
         if port.port_binding.vif_type in (portbindings.VIF_TYPE_BINDING_FAILED,
                                           portbindings.VIF_TYPE_UNBOUND):
-            # NOTE(kevinbenton): we hit here when a port is created without
-            # a host ID and the dhcp agent notifies that its wiring is done
             LOG.debug("Port %s cannot update to ACTIVE because it "
                       "is not bound.", port_id)
             return
-        else:
-            # port is bound, but we have to check for new provisioning blocks
-            # one last time to detect the case where we were triggered by an
-            # unbound port and the port became bound with new provisioning
-            # blocks before 'get_port' was called above
-            if provisioning_blocks.is_object_blocked(context, port_id,
-                                                     resources.PORT):
-                LOG.debug("Port %s had new provisioning blocks added so it "
-                          "will not transition to active.", port_id)
-                return
+        if provisioning_blocks.is_object_blocked(context, port_id,
+                                                 resources.PORT):
+            LOG.debug("Port %s had new provisioning blocks added so it "
+                      "will not transition to active.", port_id)
+            return
         self.update_port_status(context, port_id, const.PORT_STATUS_ACTIVE)
 
     @property
@@ -858,6 +936,16 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
 
         return [self._fields(net, fields) for net in nets]
 
+    def get_networks_mtu(self, context, network_ids):
+        """Return the MTU of the networks, indexed by network id.
+
+        The MTU only depends on the segments of a network, which are loaded
+        with a single query, so the networks are not built.
+        """
+        nets = [{'id': network_id} for network_id in network_ids]
+        self.type_manager.extend_networks_dict_provider(context, nets)
+        return dict((net['id'], self._get_network_mtu(net)) for net in nets)
+
     def _delete_ports(self, context, port_ids):
         for port_id in port_ids:
             try:
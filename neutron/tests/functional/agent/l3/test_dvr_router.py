@@ -655,7 +655,10 @@ class TestDvrRouter(framework.L3AgentTestFramework):
             'mac_address': 'fa:3e:aa:bb:cc:dd',
             'device_owner': DEVICE_OWNER_COMPUTE
         }
-        self.agent.plugin_rpc.get_ports_by_subnet.return_value = [port_data]
+        subnet_id = l3_test_common.get_subnet_id(
+            router_info['_interfaces'][0])
+        self.agent.plugin_rpc.get_ports_by_subnets.return_value = {
+            subnet_id: [port_data]}
         router1 = self.manage_router(self.agent, router_info)
         internal_device = router1.get_internal_device_name(
             router_info['_interfaces'][0]['id'])
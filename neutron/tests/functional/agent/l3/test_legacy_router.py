@@ -182,6 +182,7 @@ class L3AgentTestCase(framework.L3AgentTestFramework):
         with mock.patch.object(namespace_manager.NamespaceManager, 'list_all',
                                return_value=ns_names_to_retrieve):
             self.agent.periodic_sync_routers_task(self.agent.context)
+        self.agent.namespaces_manager.wait()
 
         # Mock the plugin RPC API so a known external network id is returned
         # when the router updates are processed by the agent
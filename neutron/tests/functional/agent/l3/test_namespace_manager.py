@@ -30,6 +30,7 @@ class NamespaceManagerTestFramework(base.BaseSudoTestCase):
     def setUp(self):
         super(NamespaceManagerTestFramework, self).setUp()
         self.agent_conf = mock.MagicMock()
+        self.agent_conf.namespace_cleanup_workers = 1
         self.metadata_driver_mock = mock.Mock()
         self.namespace_manager = namespace_manager.NamespaceManager(
             self.agent_conf, driver=None,
@@ -78,6 +79,7 @@ class NamespaceManagerTestCase(NamespaceManagerTestFramework):
                 for ns_name in to_keep:
                     id_to_keep = ns_manager.get_prefix_and_id(ns_name)[1]
                     ns_manager.keep_router(id_to_keep)
+            ns_manager.wait()
 
         for ns_name in to_keep:
             self.assertTrue(self._namespace_exists(ns_name))
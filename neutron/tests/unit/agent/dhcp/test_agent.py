@@ -341,11 +341,12 @@ class TestDhcpAgent(base.BaseTestCase):
             expected_sync=False)
 
     def _test_sync_state_helper(self, known_net_ids, active_net_ids):
-        active_networks = set(mock.Mock(id=netid) for netid in active_net_ids)
-
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
-            mock_plugin.get_active_networks_info.return_value = active_networks
+            mock_plugin.get_active_network_ids.return_value = active_net_ids
+            mock_plugin.get_networks_info.side_effect = (
+                lambda net_ids: [mock.Mock(id=netid, ports=[])
+                                 for netid in net_ids])
             plug.return_value = mock_plugin
 
             dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
@@ -381,10 +382,116 @@ class TestDhcpAgent(base.BaseTestCase):
             self._test_sync_state_helper(known_net_ids, active_net_ids)
             w.assert_called_once_with()
 
+    def _test_sync_state_networks(self, known_net_ids, active_net_ids,
+                                  only_nets=None):
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_network_ids.return_value = active_net_ids
+            mock_plugin.get_networks_info.side_effect = (
+                lambda net_ids: [mock.Mock(id=netid, ports=[])
+                                 for netid in net_ids])
+            plug.return_value = mock_plugin
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            with mock.patch.multiple(
+                    dhcp, cache=mock.DEFAULT, disable_dhcp_helper=mock.DEFAULT,
+                    safe_configure_dhcp_for_network=mock.DEFAULT) as mocks:
+                mocks['cache'].get_network_ids.return_value = known_net_ids
+                mocks['cache'].get_port_ids.return_value = []
+                dhcp.sync_state(only_nets)
+            configure = mocks['safe_configure_dhcp_for_network']
+            configured = [c[0][0].id for c in configure.call_args_list]
+            return mock_plugin, configured
+
+    def test_sync_state_fetches_networks_in_chunks(self):
+        cfg.CONF.set_override('sync_networks_chunk_size', 2)
+        net_ids = ['1', '2', '3', '4', '5']
+        mock_plugin, configured = self._test_sync_state_networks([], net_ids)
+        mock_plugin.get_networks_info.assert_has_calls([
+            mock.call(['1', '2']), mock.call(['3', '4']), mock.call(['5'])])
+        self.assertEqual(net_ids, configured)
+        self.assertFalse(mock_plugin.get_active_networks_info.called)
+
+    def test_sync_state_fetches_only_synced_networks(self):
+        mock_plugin, configured = self._test_sync_state_networks(
+            ['1', '2', '3'], ['1', '2', '3', '4'], only_nets=['2'])
+        mock_plugin.get_networks_info.assert_called_once_with(['2', '4'])
+        self.assertEqual(['2', '4'], configured)
+
+    def test_sync_state_configures_networks_in_server_order(self):
+        cfg.CONF.set_override('sync_networks_chunk_size', 2)
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            # the networks with pending ports are returned first
+            mock_plugin.get_active_network_ids.return_value = ['3', '1', '2']
+            mock_plugin.get_networks_info.side_effect = (
+                lambda net_ids: [mock.Mock(id=netid, ports=[])
+                                 for netid in reversed(net_ids)])
+            plug.return_value = mock_plugin
+            agent = dhcp_agent.DhcpAgent(HOSTNAME)
+            with mock.patch.multiple(
+                    agent, cache=mock.DEFAULT,
+                    safe_configure_dhcp_for_network=mock.DEFAULT) as mocks:
+                mocks['cache'].get_network_ids.return_value = []
+                mocks['cache'].get_port_ids.return_value = []
+                agent.sync_state()
+            configure = mocks['safe_configure_dhcp_for_network']
+            self.assertEqual(['3', '1', '2'],
+                             [c[0][0].id for c in configure.call_args_list])
+        self.assertIsNotNone(agent.last_sync_duration)
+
+    def test_sync_state_server_without_chunks_pending_networks_first(self):
+        pending_port = dhcp.DictModel(
+            dict(status=const.PORT_STATUS_DOWN, device_owner='compute:nova'))
+        dhcp_port = dhcp.DictModel(
+            dict(status=const.PORT_STATUS_DOWN,
+                 device_owner=const.DEVICE_OWNER_DHCP))
+        active_port = dhcp.DictModel(
+            dict(status=const.PORT_STATUS_ACTIVE, device_owner=None))
+        ports = {'1': [active_port], '2': [dhcp_port],
+                 '3': [active_port, pending_port]}
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_network_ids.side_effect = (
+                oslo_messaging.RemoteError(exc_type='NoSuchMethod'))
+            mock_plugin.get_active_networks_info.return_value = [
+                mock.Mock(id=netid, ports=ports[netid])
+                for netid in ('1', '2', '3')]
+            plug.return_value = mock_plugin
+            agent = dhcp_agent.DhcpAgent(HOSTNAME)
+            with mock.patch.multiple(
+                    agent, cache=mock.DEFAULT,
+                    safe_configure_dhcp_for_network=mock.DEFAULT) as mocks:
+                mocks['cache'].get_network_ids.return_value = []
+                mocks['cache'].get_port_ids.return_value = []
+                agent.sync_state()
+            configure = mocks['safe_configure_dhcp_for_network']
+            self.assertEqual(['3', '1', '2'],
+                             [c[0][0].id for c in configure.call_args_list])
+
+    def test_sync_state_server_without_chunks(self):
+        with mock.patch(DHCP_PLUGIN) as plug:
+            mock_plugin = mock.Mock()
+            mock_plugin.get_active_network_ids.side_effect = (
+                oslo_messaging.RemoteError(exc_type='UnsupportedVersion'))
+            mock_plugin.get_active_networks_info.return_value = [
+                mock.Mock(id='a', ports=[]), mock.Mock(id='b', ports=[])]
+            plug.return_value = mock_plugin
+            dhcp = dhcp_agent.DhcpAgent(HOSTNAME)
+            with mock.patch.multiple(
+                    dhcp, cache=mock.DEFAULT, disable_dhcp_helper=mock.DEFAULT,
+                    safe_configure_dhcp_for_network=mock.DEFAULT) as mocks:
+                mocks['cache'].get_network_ids.return_value = ['a']
+                mocks['cache'].get_port_ids.return_value = []
+                dhcp.sync_state()
+            mocks['safe_configure_dhcp_for_network'].assert_has_calls(
+                [mock.call(network) for network in
+                 mock_plugin.get_active_networks_info.return_value])
+            self.assertFalse(mock_plugin.get_networks_info.called)
+
     def test_sync_state_for_all_networks_plugin_error(self):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
-            mock_plugin.get_active_networks_info.side_effect = Exception
+            mock_plugin.get_active_network_ids.side_effect = Exception
             plug.return_value = mock_plugin
 
             with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
@@ -400,7 +507,7 @@ class TestDhcpAgent(base.BaseTestCase):
         with mock.patch(DHCP_PLUGIN) as plug:
             mock_plugin = mock.Mock()
             exc = Exception()
-            mock_plugin.get_active_networks_info.side_effect = exc
+            mock_plugin.get_active_network_ids.side_effect = exc
             plug.return_value = mock_plugin
 
             with mock.patch.object(dhcp_agent.LOG, 'exception') as log:
@@ -1086,6 +1193,78 @@ class TestDhcpAgentEventHandler(base.BaseTestCase):
         self.cache.assert_has_calls([mock.call.get_port_by_id('unknown')])
         self.assertEqual(self.call_driver.call_count, 0)
 
+    def _setup_delayed_reloads(self, delay=1, max_delay=5):
+        cfg.CONF.set_override('reload_allocations_delay', delay)
+        cfg.CONF.set_override('reload_allocations_max_delay', max_delay)
+        self.cache.get_network_by_id.return_value = fake_network
+        spawn_n = mock.patch.object(dhcp_agent.eventlet, 'spawn_n').start()
+        return spawn_n
+
+    def test_port_notifications_coalesced_reload(self):
+        spawn_n = self._setup_delayed_reloads()
+        self.cache.get_port_by_id.return_value = fake_port2
+        with mock.patch.object(dhcp_agent.time, 'time', return_value=100):
+            self.dhcp.port_update_end(None, dict(port=fake_port2))
+            self.dhcp.port_update_end(None, dict(port=fake_port2))
+            self.dhcp.port_delete_end(None, dict(port_id=fake_port2.id))
+        spawn_n.assert_called_once_with(
+            self.dhcp._delayed_reload_allocations, fake_network.id)
+        self.assertFalse(self.call_driver.called)
+        self.assertFalse(self.dhcp.dhcp_ready_ports)
+
+        with mock.patch.object(dhcp_agent.time, 'time', return_value=101):
+            self.dhcp._delayed_reload_allocations(fake_network.id)
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+        self.assertEqual(set([fake_port2.id]), self.dhcp.dhcp_ready_ports)
+        self.assertEqual(2, self.dhcp.reloads_saved)
+        self.assertEqual({}, self.dhcp._pending_reloads)
+
+    def test_delayed_reload_waits_for_quiet_network(self):
+        self._setup_delayed_reloads(delay=2, max_delay=10)
+        with mock.patch.object(dhcp_agent.time, 'time', return_value=100):
+            self.dhcp.reload_allocations(fake_network)
+        pending = self.dhcp._pending_reloads[fake_network.id]
+
+        def notify(seconds):
+            # Another port notification is received while waiting
+            if pending.notifications < 2:
+                with mock.patch.object(dhcp_agent.time, 'time',
+                                       return_value=101):
+                    pending.notified()
+
+        with mock.patch.object(dhcp_agent.time, 'time',
+                               side_effect=[100, 102, 103]), \
+                mock.patch.object(dhcp_agent.eventlet, 'sleep',
+                                  side_effect=notify) as sleep:
+            self.dhcp._delayed_reload_allocations(fake_network.id)
+        sleep.assert_has_calls([mock.call(2), mock.call(1)])
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+        self.assertEqual(1, self.dhcp.reloads_saved)
+
+    def test_delayed_reload_bounded_by_max_delay(self):
+        self._setup_delayed_reloads(delay=2, max_delay=3)
+        with mock.patch.object(dhcp_agent.time, 'time', return_value=100):
+            self.dhcp.reload_allocations(fake_network)
+        with mock.patch.object(dhcp_agent.time, 'time', return_value=102):
+            self.dhcp.reload_allocations(fake_network)
+        with mock.patch.object(dhcp_agent.time, 'time',
+                               side_effect=[102, 103]), \
+                mock.patch.object(dhcp_agent.eventlet, 'sleep') as sleep:
+            self.dhcp._delayed_reload_allocations(fake_network.id)
+        sleep.assert_called_once_with(1)
+        self.call_driver.assert_called_once_with('reload_allocations',
+                                                 fake_network)
+
+    def test_delayed_reload_network_removed(self):
+        self._setup_delayed_reloads()
+        self.dhcp.reload_allocations(fake_network, fake_port2.id)
+        self.cache.get_network_by_id.return_value = None
+        self.dhcp._reload_pending_allocations(fake_network.id)
+        self.assertFalse(self.call_driver.called)
+        self.assertEqual({}, self.dhcp._pending_reloads)
+
 
 class TestDhcpPluginApiProxy(base.BaseTestCase):
     def _test_dhcp_api(self, method, **kwargs):
@@ -1110,6 +1289,13 @@ class TestDhcpPluginApiProxy(base.BaseTestCase):
     def test_get_active_networks_info(self):
         self._test_dhcp_api('get_active_networks_info', version='1.1')
 
+    def test_get_active_network_ids(self):
+        self._test_dhcp_api('get_active_network_ids', version='1.7')
+
+    def test_get_networks_info(self):
+        self._test_dhcp_api('get_networks_info', network_ids=['a'],
+                            version='1.7')
+
     def test_get_network_info(self):
         self._test_dhcp_api('get_network_info', network_id='fake_id',
                             return_value=None)
@@ -1263,6 +1449,65 @@ class TestNetworkCache(base.BaseTestCase):
         nc.put(fake_network)
         self.assertEqual(nc.get_port_by_id(fake_port1.id), fake_port1)
 
+    def _get_ports_network(self, num_ports):
+        ports = []
+        for i in range(num_ports):
+            fixed_ip = dict(subnet_id=fake_subnet1.id,
+                            ip_address='10.0.0.%d' % i)
+            ports.append(dhcp.DictModel(dict(
+                id='port-%d' % i,
+                network_id=FAKE_NETWORK_UUID,
+                tenant_id=fake_network.tenant_id,
+                device_owner='compute:nova',
+                mac_address='aa:bb:cc:dd:ee:%02x' % i,
+                fixed_ips=[fixed_ip])))
+        return dhcp.NetModel(dict(id=FAKE_NETWORK_UUID,
+                                  tenant_id=fake_network.tenant_id,
+                                  subnets=[fake_subnet1],
+                                  ports=ports))
+
+    def test_remove_port_keeps_index(self):
+        network = self._get_ports_network(4)
+        nc = dhcp_agent.NetworkCache()
+        nc.put(network)
+        nc.remove_port(nc.get_port_by_id('port-1'))
+        nc.remove_port(nc.get_port_by_id('port-3'))
+        nc.put_port(dhcp.DictModel(dict(id='port-4',
+                                        network_id=FAKE_NETWORK_UUID)))
+
+        self.assertEqual(['port-0', 'port-2', 'port-4'],
+                         sorted(port.id for port in network.ports))
+        for port_id in ('port-0', 'port-2', 'port-4'):
+            self.assertEqual(port_id, nc.get_port_by_id(port_id).id)
+        self.assertIsNone(nc.get_port_by_id('port-1'))
+        self.assertEqual(3, len(nc.port_index))
+
+    def test_remove_port_other_version(self):
+        network = self._get_ports_network(2)
+        nc = dhcp_agent.NetworkCache()
+        nc.put(network)
+        other = copy.deepcopy(network.ports[0])
+        other.mac_address = 'aa:bb:cc:dd:ee:ff'
+        nc.remove_port(other)
+        self.assertEqual(2, len(network.ports))
+        self.assertIn(other.id, nc.port_lookup)
+
+    def test_ports_share_values(self):
+        network = self._get_ports_network(2)
+        for port in network.ports:
+            # values of ports received separately are distinct objects
+            port.network_id = ''.join(FAKE_NETWORK_UUID)
+            port.tenant_id = ''.join(network.tenant_id)
+            port.device_owner = ''.join('compute:nova')
+            port.fixed_ips[0].subnet_id = ''.join(fake_subnet1.id)
+        nc = dhcp_agent.NetworkCache()
+        nc.put(network)
+        port1, port2 = network.ports
+        self.assertIs(network.id, port1.network_id)
+        self.assertIs(network.tenant_id, port2.tenant_id)
+        self.assertIs(port1.device_owner, port2.device_owner)
+        self.assertIs(fake_subnet1.id, port2.fixed_ips[0].subnet_id)
+
 
 class FakePort1(object):
     def __init__(self):
@@ -38,6 +38,7 @@ from neutron.agent.l3 import ha
 from neutron.agent.l3 import legacy_router
 from neutron.agent.l3 import link_local_allocator as lla
 from neutron.agent.l3 import namespaces
+from neutron.agent.l3 import router_digest
 from neutron.agent.l3 import router_info as l3router
 from neutron.agent.l3 import router_processing_queue
 from neutron.agent.linux import dibbler
@@ -208,8 +209,87 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent.router_info[router.id] = router_info
         agent._update_metadata_proxy = mock.Mock()
         agent.enqueue_state_change(router.id, 'master')
+        agent.wait_state_changes()
         self.assertFalse(agent._update_metadata_proxy.call_count)
 
+    def test_enqueue_state_change_groups_transitions(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.router_info['r1'] = mock.MagicMock()
+        agent._update_radvd_daemon = mock.Mock()
+        agent.state_change_notifier = mock.Mock()
+        with mock.patch.object(ha.time, 'time', side_effect=[1.0, 2.0]):
+            agent.enqueue_state_change('r1', 'backup')
+            agent.enqueue_state_change('r1', 'master')
+            agent.wait_state_changes()
+            agent.enqueue_state_change('r1', 'backup')
+            agent.enqueue_state_change('r1', 'master')
+            agent.wait_state_changes()
+        # Transitions queued before the router is handled are grouped, only
+        # the latest one is applied.
+        agent._update_radvd_daemon.assert_has_calls(
+            [mock.call(agent.router_info['r1'], 'master')] * 2)
+        self.assertEqual(2, agent._update_radvd_daemon.call_count)
+        agent.state_change_notifier.queue_event.assert_has_calls(
+            [mock.call(('r1', 'master'))] * 2)
+        # The failover time is measured from the first notification which
+        # was not reported to the server yet.
+        self.assertEqual({'r1': 1.0}, agent._state_change_times)
+        self.assertFalse(agent._pending_state_changes)
+        self.assertFalse(agent._routers_changing_state)
+
+    def test_enqueue_state_change_routers_handled_concurrently(self):
+        self.conf.set_override('ha_state_change_workers', 2)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.state_change_notifier = mock.Mock()
+        handling = set()
+        concurrency = []
+
+        def update_radvd_daemon(ri, state):
+            handling.add(ri)
+            concurrency.append(len(handling))
+            eventlet.sleep(0)
+            handling.discard(ri)
+
+        agent._update_radvd_daemon = update_radvd_daemon
+        for router_id in ('r1', 'r2', 'r3', 'r4'):
+            agent.router_info[router_id] = mock.MagicMock()
+            agent.enqueue_state_change(router_id, 'master')
+        agent.wait_state_changes()
+        self.assertEqual(2, max(concurrency))
+        self.assertEqual(4, agent.state_change_notifier.queue_event.call_count)
+
+    def test_enqueue_state_change_failure_still_notifies(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.router_info['r1'] = mock.MagicMock()
+        agent._update_radvd_daemon = mock.Mock(side_effect=RuntimeError)
+        agent.state_change_notifier = mock.Mock()
+        agent.enqueue_state_change('r1', 'master')
+        agent.wait_state_changes()
+        agent.state_change_notifier.queue_event.assert_called_once_with(
+            ('r1', 'master'))
+
+    def test_enqueue_state_change_router_removed_before_handled(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent.router_info['r1'] = mock.MagicMock()
+        agent.state_change_notifier = mock.Mock()
+        agent.enqueue_state_change('r1', 'master')
+        del agent.router_info['r1']
+        agent.wait_state_changes()
+        self.assertFalse(agent.state_change_notifier.queue_event.called)
+
+    def test_notify_server_logs_failover_times(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._state_change_times = {'r1': 10.0, 'r2': 12.0}
+        with mock.patch.object(ha.time, 'time', return_value=20.0),\
+                mock.patch.object(ha.LOG, 'info') as log_info:
+            agent.notify_server([('r1', 'master'), ('r2', 'backup')])
+        self.plugin_api.update_ha_routers_states.assert_called_once_with(
+            agent.context, {'r1': 'active', 'r2': 'standby'})
+        self.assertEqual({}, agent._state_change_times)
+        values = log_info.call_args[0][1]
+        self.assertEqual(1, values['count'])
+        self.assertEqual(10.0, values['max'])
+
     def test_periodic_sync_routers_task_raise_exception(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         self.plugin_api.get_router_ids.return_value = ['fake_id']
@@ -270,8 +350,11 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         self.mock_ip.get_namespaces.return_value = namespace_list
         driver = metadata_driver.MetadataDriver
         with mock.patch.object(
-                driver, 'destroy_monitored_metadata_proxy') as destroy_proxy:
+                driver, 'destroy_monitored_metadata_proxy') as destroy_proxy, \
+                mock.patch.object(eventlet, 'spawn',
+                                  eventlet.greenthread.spawn):
             agent.periodic_sync_routers_task(agent.context)
+            agent.namespaces_manager.wait()
 
             expected_calls = [mock.call(mock.ANY, r_id, agent.conf)
                               for r_id in stale_router_ids]
@@ -1895,6 +1978,16 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent.routers_updated(None, [FAKE_ID])
         self.assertEqual(1, agent._queue.add.call_count)
 
+    def test_routers_delta_updated(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._queue = mock.Mock()
+        delta = {'router_id': FAKE_ID, 'revision_number': 2}
+        agent.routers_delta_updated(None, [delta])
+        update = agent._queue.add.call_args[0][0]
+        self.assertEqual(FAKE_ID, update.id)
+        self.assertEqual(router_processing_queue.DELTA_ROUTER, update.action)
+        self.assertEqual(delta, update.delta)
+
     def test_removed_from_agent(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         agent._queue = mock.Mock()
@@ -1969,6 +2062,46 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
                 else:
                     self.assertFalse(destroy_proxy.call_count)
 
+    def _test_process_added_router_digest(self, unchanged, adopted=True):
+        self.conf.set_override('persist_router_digests', True)
+        router = {'id': _uuid(),
+                  'external_gateway_info': {},
+                  'routes': [],
+                  'distributed': False}
+        with mock.patch.object(router_digest, 'RouterDigestCache') as cache:
+            agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        digests = cache.return_value
+        digests.is_unchanged.return_value = unchanged
+
+        with mock.patch.object(legacy_router.LegacyRouter, 'process',
+                               autospec=True) as process,\
+                mock.patch.object(legacy_router.LegacyRouter, 'adopt',
+                                  autospec=True,
+                                  return_value=adopted) as adopt:
+            agent._process_added_router(router)
+
+        cache.assert_called_once_with(self.conf.state_path)
+        ri = agent.router_info[router['id']]
+        self.assertEqual(unchanged, adopt.called)
+        if unchanged and adopted:
+            self.assertFalse(process.called)
+            self.assertFalse(digests.update.called)
+        else:
+            process.assert_called_once_with(ri, agent)
+            digests.update.assert_called_once_with(router)
+
+        agent._router_removed(router['id'])
+        digests.remove.assert_called_once_with(router['id'])
+
+    def test_process_added_router_unchanged_digest(self):
+        self._test_process_added_router_digest(unchanged=True)
+
+    def test_process_added_router_unchanged_digest_not_adopted(self):
+        self._test_process_added_router_digest(unchanged=True, adopted=False)
+
+    def test_process_added_router_new_digest(self):
+        self._test_process_added_router_digest(unchanged=False)
+
     def test_enable_metadata_proxy(self):
         self._configure_metadata_proxy()
 
@@ -2023,6 +2156,39 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         agent._process_router_update()
         self.assertTrue(agent.plugin_rpc.get_routers.called)
 
+    def test_process_routers_update_records_metrics(self):
+        self.conf.set_override('enable_router_metrics', True)
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        ri = mock.Mock(router_id=42)
+        ri.phase_timer.timings = {'routes': 0.5}
+
+        def process_router(router):
+            agent._process_router_info(ri, mock.Mock())
+            raise RuntimeError()
+
+        agent._process_router_if_compatible = mock.Mock(
+            side_effect=process_router)
+        update = router_processing_queue.RouterUpdate(
+            42,
+            router_processing_queue.PRIORITY_SYNC_ROUTERS_TASK,
+            router={'id': 42},
+            timestamp=timeutils.utcnow())
+        agent._queue.add(update)
+        agent._process_router_update()
+
+        ri.phase_timer.reset.assert_called_once_with()
+        stats = agent.router_metrics.get_router_stats(42)
+        self.assertEqual(1, stats['processing']['count'])
+        self.assertEqual({'routes': 0.5}, stats['last_phases'])
+        self.assertEqual(1, stats['resyncs'])
+        metrics = agent.router_metrics.get_stats(agent._queue.get_depths())
+        self.assertEqual(
+            1, metrics['queue']['wait'][
+                router_processing_queue.PRIORITY_SYNC_ROUTERS_TASK]['count'])
+        self.assertEqual(
+            {router_processing_queue.PRIORITY_SYNC_ROUTERS_TASK: 1},
+            metrics['queue']['depth'])
+
     def test_process_routers_update_rpc_timeout_on_get_ext_net(self):
         self._test_process_routers_update_rpc_timeout(ext_net_call=True,
                                                       ext_net_call_failed=True)
@@ -2059,6 +2225,101 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
     def test_process_routers_update_router_deleted_error(self):
         self._test_process_routers_update_router_deleted(True)
 
+    def _prepare_router_delta(self, revision_number, delta_type=None):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        fip_kept = {'id': _uuid(), 'floating_ip_address': '15.1.2.3'}
+        fip = {'id': _uuid(), 'floating_ip_address': '15.1.2.4'}
+        router = {'id': FAKE_ID, 'revision_number': 5,
+                  lib_constants.FLOATINGIP_KEY: [fip_kept, fip]}
+        ri = mock.Mock(router=router, router_id=FAKE_ID, adopted=False)
+        ri.get_floating_ips.return_value = router[
+            lib_constants.FLOATINGIP_KEY]
+        agent.router_info[FAKE_ID] = ri
+        delta = {'router_id': FAKE_ID,
+                 'revision_number': revision_number,
+                 'type': (delta_type or
+                          n_const.ROUTER_DELTA_FLOATINGIP_REMOVED),
+                 'floatingip': {'id': fip['id']}}
+        return agent, ri, fip_kept, delta
+
+    def test_apply_router_delta(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(6)
+        self.assertTrue(agent._apply_router_delta(delta))
+        self.assertEqual(6, ri.router['revision_number'])
+        self.assertEqual([fip_kept],
+                         ri.router[lib_constants.FLOATINGIP_KEY])
+        ri.process_floating_ips.assert_called_once_with(agent)
+        self.assertFalse(ri.process.called)
+
+    def test_apply_router_delta_adopted_router(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(6)
+        ri.adopted = True
+        self.assertFalse(agent._apply_router_delta(delta))
+        self.assertFalse(ri.process_floating_ips.called)
+
+    def test_apply_router_delta_floatingip_added(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(
+            6, n_const.ROUTER_DELTA_FLOATINGIP_ADDED)
+        delta['floatingip']['floating_ip_address'] = '15.1.2.5'
+        self.assertTrue(agent._apply_router_delta(delta))
+        self.assertEqual([fip_kept, delta['floatingip']],
+                         ri.router[lib_constants.FLOATINGIP_KEY])
+        ri.process_floating_ips.assert_called_once_with(agent)
+
+    def test_apply_router_delta_already_processed(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(5)
+        self.assertTrue(agent._apply_router_delta(delta))
+        self.assertEqual(5, ri.router['revision_number'])
+        self.assertFalse(ri.process_floating_ips.called)
+
+    def test_apply_router_delta_missed_revision(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(7)
+        self.assertFalse(agent._apply_router_delta(delta))
+        self.assertEqual(5, ri.router['revision_number'])
+        self.assertFalse(ri.process_floating_ips.called)
+
+    def test_apply_router_delta_distributed_router(self):
+        agent, ri, fip_kept, delta = self._prepare_router_delta(6)
+        ri.router['distributed'] = True
+        self.assertFalse(agent._apply_router_delta(delta))
+        self.assertFalse(ri.process_floating_ips.called)
+
+    def test_apply_router_delta_unknown_router(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.assertFalse(agent._apply_router_delta(
+            {'router_id': FAKE_ID, 'revision_number': 1}))
+
+    def _test_process_routers_update_delta(self, applied):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        agent._queue = mock.Mock()
+        agent._apply_router_delta = mock.Mock(return_value=applied)
+        agent._process_router_if_compatible = mock.Mock()
+        router = {'id': FAKE_ID}
+        self.plugin_api.get_routers.return_value = [router]
+        update = router_processing_queue.RouterUpdate(
+            FAKE_ID, router_processing_queue.PRIORITY_RPC,
+            action=router_processing_queue.DELTA_ROUTER, delta=mock.Mock())
+        router_processor = mock.Mock()
+        agent._queue.each_update_to_next_router.side_effect = [
+            [(router_processor, update)]]
+        agent._process_router_update()
+        agent._apply_router_delta.assert_called_once_with(update.delta)
+        if applied:
+            self.assertFalse(self.plugin_api.get_routers.called)
+            self.assertFalse(agent._process_router_if_compatible.called)
+            self.assertFalse(router_processor.fetched_and_processed.called)
+        else:
+            self.plugin_api.get_routers.assert_called_once_with(
+                agent.context, [FAKE_ID])
+            agent._process_router_if_compatible.assert_called_once_with(
+                router)
+
+    def test_process_routers_update_delta_applied(self):
+        self._test_process_routers_update_delta(True)
+
+    def test_process_routers_update_delta_falls_back_to_full_sync(self):
+        self._test_process_routers_update_delta(False)
+
     def test_process_router_if_compatible_with_no_ext_net_in_conf(self):
         self.conf.set_override('external_network_bridge', 'br-ex')
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
@@ -2183,9 +2444,12 @@ class TestBasicRouterOperations(BasicRouterOperationsFramework):
         pm = self.external_process.return_value
         pm.reset_mock()
 
-        with agent.namespaces_manager as ns_manager:
-            for r in router_list:
-                ns_manager.keep_router(r['id'])
+        # eventlet.spawn is mocked
+        with mock.patch.object(eventlet, 'spawn', eventlet.greenthread.spawn):
+            with agent.namespaces_manager as ns_manager:
+                for r in router_list:
+                    ns_manager.keep_router(r['id'])
+            agent.namespaces_manager.wait()
         qrouters = [n for n in stale_namespace_list
                     if n.startswith(namespaces.NS_PREFIX)]
         self.assertEqual(len(qrouters), mock_router_ns.call_count)
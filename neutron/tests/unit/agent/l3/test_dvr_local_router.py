@@ -17,6 +17,7 @@ import netaddr
 from neutron_lib import constants as lib_constants
 from oslo_config import cfg
 from oslo_log import log
+import oslo_messaging
 from oslo_utils import uuidutils
 
 from neutron.agent.common import config as agent_config
@@ -400,6 +401,83 @@ class TestDvrRouterOperations(base.BaseTestCase):
         ri._set_subnet_arp_info(subnet_id)
         self.mock_ip_dev.neigh.add.never_called()
 
+    def _create_router_for_arp_tests(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        router = l3_test_common.prepare_router_data(num_internal_ports=2)
+        router['distributed'] = True
+        ri = dvr_router.DvrLocalRouter(
+            agent, HOSTNAME, router['id'], router, **self.ri_kwargs)
+        ports = ri.router.get(lib_constants.INTERFACE_KEY, [])
+        subnet_id = l3_test_common.get_subnet_id(ports[0])
+        test_ports = [{'mac_address': '00:11:22:33:44:%02x' % i,
+                       'device_owner': lib_constants.DEVICE_OWNER_DHCP,
+                       'fixed_ips': [{'ip_address': '1.2.3.%d' % i,
+                                      'prefixlen': 24,
+                                      'subnet_id': subnet_id}]}
+                      for i in range(1, 4)]
+        return ri, subnet_id, test_ports
+
+    def test__set_subnet_arp_info_skips_existing_entries(self):
+        ri, subnet_id, test_ports = self._create_router_for_arp_tests()
+        self.plugin_api.get_ports_by_subnet.return_value = test_ports
+        self.mock_ip_dev.neigh.show.return_value = (
+            '1.2.3.1 lladdr 00:11:22:33:44:01 PERMANENT\n'
+            '1.2.3.2 lladdr 00:11:22:33:44:99 PERMANENT\n'
+            '1.2.3.3 lladdr 00:11:22:33:44:03 REACHABLE\n')
+
+        ri._set_subnet_arp_info(subnet_id)
+
+        self.mock_ip_dev.neigh.show.assert_called_once_with(4)
+        self.assertEqual(1, self.mock_ip_dev.exists.call_count)
+        self.mock_ip_dev.neigh.add.assert_has_calls(
+            [mock.call('1.2.3.2', '00:11:22:33:44:02'),
+             mock.call('1.2.3.3', '00:11:22:33:44:03')])
+        self.assertEqual(2, self.mock_ip_dev.neigh.add.call_count)
+
+    def test__set_subnet_arp_info_no_device_caches_entries(self):
+        ri, subnet_id, test_ports = self._create_router_for_arp_tests()
+        self.plugin_api.get_ports_by_subnet.return_value = test_ports
+        self.mock_ip_dev.exists.return_value = False
+
+        ri._set_subnet_arp_info(subnet_id)
+
+        self.assertFalse(self.mock_ip_dev.neigh.add.called)
+        self.assertEqual(3, len(ri._pending_arp_set))
+
+    def test__process_internal_ports_fetches_subnet_ports_once(self):
+        ri, subnet_id, test_ports = self._create_router_for_arp_tests()
+        ports = ri.router.get(lib_constants.INTERFACE_KEY, [])
+        subnet_ids = [l3_test_common.get_subnet_id(p) for p in ports]
+        self.plugin_api.get_ports_by_subnets.return_value = {
+            subnet_ids[0]: test_ports, subnet_ids[1]: []}
+
+        with mock.patch.object(ri, '_set_subnet_arp_info',
+                               wraps=ri._set_subnet_arp_info) as set_arp:
+            ri._process_internal_ports(mock.Mock())
+
+        self.assertEqual(2, set_arp.call_count)
+        self.plugin_api.get_ports_by_subnets.assert_called_once_with(
+            mock.ANY, mock.ANY)
+        self.assertEqual(
+            sorted(subnet_ids),
+            sorted(self.plugin_api.get_ports_by_subnets.call_args[0][1]))
+        self.assertFalse(self.plugin_api.get_ports_by_subnet.called)
+        self.assertEqual({}, ri._subnet_ports)
+
+        # No new ports, no RPC
+        ri._process_internal_ports(mock.Mock())
+        self.assertEqual(1, self.plugin_api.get_ports_by_subnets.call_count)
+
+    def test_get_ports_by_subnets_fallback(self):
+        agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
+        self.plugin_api.get_ports_by_subnets.side_effect = (
+            oslo_messaging.RemoteError('UnsupportedVersion'))
+        self.plugin_api.get_ports_by_subnet.return_value = ['port']
+
+        self.assertEqual({'subnet1': ['port'], 'subnet2': ['port']},
+                         agent.get_ports_by_subnets(['subnet1', 'subnet2']))
+        self.assertEqual(2, self.plugin_api.get_ports_by_subnet.call_count)
+
     def test_add_arp_entry(self):
         agent = l3_agent.L3NATAgent(HOSTNAME, self.conf)
         router = l3_test_common.prepare_router_data(num_internal_ports=2)
@@ -45,6 +45,16 @@ class TestBasicRouterOperations(base.BaseTestCase):
         ri._get_cidrs_from_keepalived = mock.MagicMock(return_value=addresses)
         self.assertEqual(set(addresses), ri.get_router_cidrs(device))
 
+    @mock.patch('neutron.agent.l3.router_info.RouterInfo.'
+                'process_floating_ips')
+    def test_process_floating_ips_reloads_keepalived(self, process_fips):
+        ri = self._create_router()
+        ri.ha_port = {'status': 'ACTIVE'}
+        ri.enable_keepalived = mock.Mock()
+        ri.process_floating_ips(mock.sentinel.agent)
+        process_fips.assert_called_once_with(mock.sentinel.agent)
+        ri.enable_keepalived.assert_called_once_with()
+
     def test__add_default_gw_virtual_route(self):
         ri = self._create_router()
         mock_instance = mock.Mock()
@@ -15,6 +15,7 @@
 import mock
 
 from neutron.agent.l3 import item_allocator as ia
+from neutron.agent.l3 import link_local_allocator as lla
 from neutron.tests import base
 
 
@@ -26,6 +27,15 @@ class TestObject(object):
     def __str__(self):
         return str(self._value)
 
+    def __eq__(self, other):
+        return str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(str(self))
+
 
 class TestItemAllocator(base.BaseTestCase):
     def setUp(self):
@@ -33,14 +43,14 @@ class TestItemAllocator(base.BaseTestCase):
 
     def test__init__(self):
         test_pool = set(TestObject(s) for s in range(32768, 40000))
-        with mock.patch.object(ia.ItemAllocator, '_write') as write:
+        with mock.patch.object(ia.ItemAllocator, '_append') as append:
             a = ia.ItemAllocator('/file', TestObject, test_pool)
             test_object = a.allocate('test')
 
         self.assertIn('test', a.allocations)
         self.assertIn(test_object, a.allocations.values())
         self.assertNotIn(test_object, a.pool)
-        self.assertTrue(write.called)
+        self.assertTrue(append.called)
 
     def test__init__readfile(self):
         test_pool = set(TestObject(s) for s in range(32768, 40000))
@@ -69,20 +79,20 @@ class TestItemAllocator(base.BaseTestCase):
     def test_allocate(self):
         test_pool = set([TestObject(33000), TestObject(33001)])
         a = ia.ItemAllocator('/file', TestObject, test_pool)
-        with mock.patch.object(ia.ItemAllocator, '_write') as write:
+        with mock.patch.object(ia.ItemAllocator, '_append') as append:
             test_object = a.allocate('test')
 
         self.assertIn('test', a.allocations)
         self.assertIn(test_object, a.allocations.values())
         self.assertNotIn(test_object, a.pool)
-        self.assertTrue(write.called)
+        append.assert_called_once_with(['test,%s\n' % test_object])
 
     def test_allocate_repeated_call_with_same_key(self):
         test_pool = set([TestObject(33000), TestObject(33001),
                          TestObject(33002), TestObject(33003),
                          TestObject(33004), TestObject(33005)])
         a = ia.ItemAllocator('/file', TestObject, test_pool)
-        with mock.patch.object(ia.ItemAllocator, '_write'):
+        with mock.patch.object(ia.ItemAllocator, '_append'):
             test_object = a.allocate('test')
             test_object1 = a.allocate('test')
             test_object2 = a.allocate('test')
@@ -115,22 +125,111 @@ class TestItemAllocator(base.BaseTestCase):
             read.return_value = ["deadbeef,33000\n"]
             a = ia.ItemAllocator('/file', TestObject, test_pool)
 
-        with mock.patch.object(ia.ItemAllocator, '_write') as write:
+        with mock.patch.object(ia.ItemAllocator, '_write') as write,\
+                mock.patch.object(ia.ItemAllocator, '_append') as append:
             allocation = a.allocate('abcdef12')
 
         self.assertNotIn('deadbeef', a.allocations)
         self.assertNotIn(allocation, a.pool)
-        self.assertTrue(write.called)
+        write.assert_called_once_with(['abcdef12,33000\n'])
+        self.assertFalse(append.called)
 
     def test_release(self):
         test_pool = set([TestObject(33000), TestObject(33001)])
-        with mock.patch.object(ia.ItemAllocator, '_write') as write:
+        with mock.patch.object(ia.ItemAllocator, '_append') as append:
             a = ia.ItemAllocator('/file', TestObject, test_pool)
             allocation = a.allocate('deadbeef')
-            write.reset_mock()
+            append.reset_mock()
             a.release('deadbeef')
 
         self.assertNotIn('deadbeef', a.allocations)
         self.assertIn(allocation, a.pool)
         self.assertEqual({}, a.allocations)
-        write.assert_called_once_with([])
+        append.assert_called_once_with(['deadbeef,\n'])
+
+    def test__init__readfile_released(self):
+        test_pool = set(TestObject(s) for s in range(32768, 40000))
+        with mock.patch.object(ia.ItemAllocator, '_read') as read,\
+                mock.patch.object(ia.ItemAllocator, '_write') as write:
+            read.return_value = ["da873ca2,10\n",
+                                 "42c9daf7,11\n",
+                                 "da873ca2,\n",
+                                 "42c9daf7,12\n"]
+            a = ia.ItemAllocator('/file', TestObject, test_pool)
+
+        self.assertNotIn('da873ca2', a.remembered)
+        self.assertEqual('12', a.remembered['42c9daf7']._value)
+        self.assertFalse(write.called)
+
+    def test_compaction(self):
+        test_pool = set(TestObject(s) for s in range(32768, 40000))
+        with mock.patch.object(ia.ItemAllocator, '_append') as append,\
+                mock.patch.object(ia.ItemAllocator, '_write') as write:
+            a = ia.ItemAllocator('/file', TestObject, test_pool)
+            for i in range(ia.COMPACTION_MIN_RECORDS // 2):
+                a.allocate('key%d' % i)
+                a.release('key%d' % i)
+            self.assertFalse(write.called)
+            self.assertEqual(ia.COMPACTION_MIN_RECORDS, append.call_count)
+
+            allocation = a.allocate('test')
+
+        write.assert_called_once_with(['test,%s\n' % allocation])
+        self.assertEqual(ia.COMPACTION_MIN_RECORDS, append.call_count)
+
+    def test_state_file(self):
+        state_file = self.get_temp_file_path('state')
+        test_pool = set(TestObject(s) for s in range(32768, 32772))
+        a = ia.ItemAllocator(state_file, TestObject, test_pool)
+        allocation = a.allocate('test')
+        a.allocate('test1')
+        a.release('test1')
+
+        test_pool = set(TestObject(s) for s in range(32768, 32772))
+        a = ia.ItemAllocator(state_file, TestObject, test_pool)
+        self.assertEqual(['test'], list(a.remembered))
+        self.assertEqual(str(allocation), str(a.remembered['test']))
+
+    def test__init__readfile_torn_record(self):
+        test_pool = set(TestObject(s) for s in range(32768, 40000))
+        with mock.patch.object(ia.ItemAllocator, '_read') as read,\
+                mock.patch.object(ia.ItemAllocator, '_write') as write:
+            # "42c9daf7,12\n" truncated by a crash
+            read.return_value = ["da873ca2,10\n", "42c9daf7,1"]
+            a = ia.ItemAllocator('/file', TestObject, test_pool)
+
+        self.assertEqual(['da873ca2'], list(a.remembered))
+        write.assert_called_once_with(['da873ca2,10\n'])
+
+    def test__init__readfile_invalid_address(self):
+        test_pool = set([lla.LinkLocalAddressPair('169.254.31.28/31')])
+        with mock.patch.object(ia.ItemAllocator, '_read') as read,\
+                mock.patch.object(ia.ItemAllocator, '_write') as write:
+            read.return_value = ["da873ca2,169.254.106.10/31\n",
+                                 "42c9daf7,169.254.106.11\n",
+                                 "d4b5e7a0,169.254.\n"]
+            a = ia.ItemAllocator('/file', lla.LinkLocalAddressPair,
+                                 test_pool)
+
+        self.assertEqual(['da873ca2'], list(a.remembered))
+        self.assertTrue(write.called)
+
+    def test_append_after_torn_record(self):
+        state_file = self.get_temp_file_path('state')
+        test_pool = set(TestObject(s) for s in range(32768, 32772))
+        a = ia.ItemAllocator(state_file, TestObject, test_pool)
+        allocation = a.allocate('test')
+        # a record truncated by another writer, which would be read as
+        # "test1,3" if the next record was appended after it
+        with open(state_file, 'a') as f:
+            f.write('test1,3')
+        allocation2 = a.allocate('test2')
+
+        with open(state_file) as f:
+            lines = f.readlines()
+        self.assertEqual(sorted(['test,%s\n' % allocation,
+                                 'test2,%s\n' % allocation2]),
+                         sorted(lines))
+        test_pool = set(TestObject(s) for s in range(32768, 32772))
+        a = ia.ItemAllocator(state_file, TestObject, test_pool)
+        self.assertEqual(['test', 'test2'], sorted(a.remembered))
@@ -86,6 +86,41 @@ class TestBasicRouterOperations(BasicRouterTestCaseFramework):
             [mock.call(cidr_pri), mock.call(cidr_sec),
              mock.call(cidr_v6), mock.call(cidr_v6_sec)])
 
+    def _test_adopt(self, devices=None, ipv6=False,
+                    fip_status=lib_constants.FLOATINGIP_STATUS_ACTIVE):
+        port = {'id': _uuid(),
+                'subnets': [{'cidr': '2001:db8::/64' if ipv6
+                             else '10.0.0.0/24'}]}
+        gw_port = {'id': _uuid()}
+        router = {'id': _uuid(),
+                  'gw_port': gw_port,
+                  lib_constants.INTERFACE_KEY: [port],
+                  lib_constants.FLOATINGIP_KEY: [{'status': fip_status}]}
+        ri = self._create_router(router)
+        ri.driver.DEV_NAME_LEN = 14
+        if devices is None:
+            devices = [ri.get_internal_device_name(port['id']),
+                       ri.get_external_device_name(gw_port['id'])]
+        with mock.patch.object(ri, '_get_existing_devices',
+                               return_value=devices):
+            adopted = ri.adopt()
+        self.assertEqual(adopted, ri.adopted)
+        self.assertEqual(adopted, ri.iptables_manager.iptables_apply_deferred)
+        return adopted
+
+    def test_adopt(self):
+        self.assertTrue(self._test_adopt())
+
+    def test_adopt_missing_device(self):
+        self.assertFalse(self._test_adopt(devices=[]))
+
+    def test_adopt_ipv6_subnet(self):
+        self.assertFalse(self._test_adopt(ipv6=True))
+
+    def test_adopt_floating_ip_not_active(self):
+        self.assertFalse(self._test_adopt(
+            fip_status=lib_constants.FLOATINGIP_STATUS_DOWN))
+
 
 @mock.patch.object(ip_lib, 'send_ip_addr_adv_notif')
 class TestAddFloatingIpWithMockGarp(BasicRouterTestCaseFramework):
@@ -112,3 +112,70 @@ class TestNamespaceManager(NamespaceManagerTestCaseFramework):
                         mock.call(dvr_snat_ns.SNAT_NS_PREFIX, router_id)]
             mock_cleanup.assert_has_calls(expected, any_order=True)
             self.assertEqual(2, mock_cleanup.call_count)
+
+    def _test_stale_namespaces_cleanup(self, ns_names, ids_to_keep):
+        self.agent_conf.namespace_cleanup_workers = 2
+        with mock.patch.object(self.ns_manager, 'list_all',
+                               return_value=set(ns_names)), \
+                mock.patch.object(self.ns_manager, '_cleanup') as cleanup:
+            with self.ns_manager as ns_manager:
+                for router_id in ids_to_keep:
+                    ns_manager.keep_router(router_id)
+            self.ns_manager.wait()
+        return cleanup
+
+    def test_stale_namespaces_cleanup(self):
+        router_id = _uuid()
+        stale_router_id = _uuid()
+        ns_names = [namespaces.NS_PREFIX + router_id,
+                    namespaces.NS_PREFIX + stale_router_id,
+                    dvr_snat_ns.SNAT_NS_PREFIX + stale_router_id]
+
+        cleanup = self._test_stale_namespaces_cleanup(ns_names, [router_id])
+
+        expected = [mock.call(namespaces.NS_PREFIX, stale_router_id),
+                    mock.call(dvr_snat_ns.SNAT_NS_PREFIX, stale_router_id)]
+        cleanup.assert_has_calls(expected, any_order=True)
+        self.assertEqual(2, cleanup.call_count)
+        self.assertFalse(self.ns_manager._clean_stale)
+
+    def test_stale_namespaces_cleanup_continues_on_error(self):
+        ns_names = [namespaces.NS_PREFIX + _uuid() for _ in range(3)]
+        with mock.patch.object(namespace_manager.LOG,
+                               'exception') as log_exception:
+            self.ns_manager._cleanup = mock.Mock(side_effect=[
+                None, Exception(), None])
+            cleanup = self.ns_manager._cleanup
+            self.agent_conf.namespace_cleanup_workers = 1
+            with mock.patch.object(self.ns_manager, 'list_all',
+                                   return_value=set(ns_names)):
+                with self.ns_manager:
+                    pass
+                self.ns_manager.wait()
+        self.assertEqual(3, cleanup.call_count)
+        self.assertEqual(1, log_exception.call_count)
+
+    def test_stale_namespaces_cleanup_skips_kept_router(self):
+        router_id = _uuid()
+        self.agent_conf.namespace_cleanup_workers = 1
+        with mock.patch.object(self.ns_manager, 'list_all',
+                               return_value={namespaces.NS_PREFIX +
+                                             router_id}), \
+                mock.patch.object(self.ns_manager, '_cleanup') as cleanup:
+            with self.ns_manager:
+                pass
+            # The router is scheduled again before the cleanup ran
+            self.ns_manager.keep_router(router_id)
+            self.ns_manager.wait()
+        self.assertFalse(cleanup.called)
+
+    def test_stale_namespaces_cleanup_only_once(self):
+        stale_ns_name = namespaces.NS_PREFIX + _uuid()
+        cleanup = self._test_stale_namespaces_cleanup([stale_ns_name], [])
+        self.assertEqual(1, cleanup.call_count)
+
+        with mock.patch.object(self.ns_manager, 'list_all') as list_all:
+            with self.ns_manager:
+                pass
+        self.assertFalse(list_all.called)
+        self.assertIsNone(self.ns_manager._cleanup_thread)
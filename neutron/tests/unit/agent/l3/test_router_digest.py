@@ -0,0 +1,83 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+from oslo_utils import uuidutils
+
+from neutron.agent.l3 import router_digest
+from neutron.tests import base
+
+
+_uuid = uuidutils.generate_uuid
+
+
+class TestRouterDigestCache(base.BaseTestCase):
+    def setUp(self):
+        super(TestRouterDigestCache, self).setUp()
+        self.state_path = self.get_default_temp_dir().path
+        self.router = {'id': _uuid(),
+                       'status': 'ACTIVE',
+                       'revision_number': 3,
+                       'routes': [],
+                       '_interfaces': [{'id': _uuid(),
+                                        'status': 'DOWN',
+                                        'fixed_ips': [
+                                            {'ip_address': '10.0.0.1'}]}]}
+
+    def test_get_digest_ignores_volatile_keys(self):
+        digest = router_digest.get_digest(self.router)
+        self.router['status'] = 'ERROR'
+        self.router['revision_number'] = 4
+        self.router['_interfaces'][0]['status'] = 'ACTIVE'
+        self.assertEqual(digest, router_digest.get_digest(self.router))
+
+    def test_get_digest_config_change(self):
+        digest = router_digest.get_digest(self.router)
+        self.router['_interfaces'][0]['fixed_ips'][0]['ip_address'] = (
+            '10.0.0.2')
+        self.assertNotEqual(digest, router_digest.get_digest(self.router))
+
+    def test_is_unchanged_after_restart(self):
+        router_digest.RouterDigestCache(self.state_path).update(self.router)
+
+        cache = router_digest.RouterDigestCache(self.state_path)
+        self.assertTrue(cache.is_unchanged(self.router))
+        self.router['routes'] = [{'destination': '8.8.8.0/24',
+                                  'nexthop': '10.0.0.254'}]
+        self.assertFalse(cache.is_unchanged(self.router))
+
+    def test_is_unchanged_unknown_router(self):
+        cache = router_digest.RouterDigestCache(self.state_path)
+        self.assertFalse(cache.is_unchanged(self.router))
+
+    def test_remove(self):
+        cache = router_digest.RouterDigestCache(self.state_path)
+        cache.update(self.router)
+        cache.remove(self.router['id'])
+        # removing an unknown router is a no-op
+        cache.remove(self.router['id'])
+
+        self.assertFalse(cache.is_unchanged(self.router))
+        self.assertEqual([], os.listdir(cache.directory))
+
+    def test_remove_stale(self):
+        cache = router_digest.RouterDigestCache(self.state_path)
+        other_router = dict(self.router, id=_uuid())
+        cache.update(self.router)
+        cache.update(other_router)
+
+        cache.remove_stale([self.router['id']])
+
+        self.assertEqual([self.router['id']], os.listdir(cache.directory))
+        self.assertTrue(cache.is_unchanged(self.router))
+        self.assertFalse(cache.is_unchanged(other_router))
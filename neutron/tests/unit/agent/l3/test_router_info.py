@@ -183,6 +183,23 @@ class TestRouterInfo(base.BaseTestCase):
             p_i_p.assert_called_once_with(mock.ANY)
             p_e_o_d.assert_called_once_with(mock.ANY)
 
+    def test_adopt(self):
+        ri = router_info.RouterInfo(_uuid(), {}, **self.ri_kwargs)
+        self.assertFalse(ri.adopt())
+        self.assertFalse(ri.adopted)
+
+    def test_process_adopted_router(self):
+        ri = router_info.RouterInfo(_uuid(), {}, **self.ri_kwargs)
+        ri.router = {'id': ri.router_id, 'routes': []}
+        ri.adopted = True
+        ri.iptables_manager.defer_apply_on()
+        with mock.patch.object(ri, '_process_internal_ports'),\
+                mock.patch.object(ri, 'process_external'),\
+                mock.patch.object(ri, 'process_address_scope'):
+            ri.process(mock.Mock())
+        self.assertFalse(ri.adopted)
+        self.assertFalse(ri.iptables_manager.iptables_apply_deferred)
+
 
 class BasicRouterTestCaseFramework(base.BaseTestCase):
     def _create_router(self, router=None, **kwargs):
@@ -220,31 +237,63 @@ class TestBasicRouterOperations(BasicRouterTestCaseFramework):
 
         ri.process_floating_ip_nat_rules()
 
-        # Be sure that the rules are cleared first and apply is called last
-        self.assertEqual(mock.call.clear_rules_by_tag('floating_ip'),
-                         ipv4_nat.mock_calls[0])
+        # Be sure that apply is called last
         self.assertEqual(mock.call.apply(), ri.iptables_manager.mock_calls[-1])
 
-        # Be sure that add_rule is called somewhere in the middle
         ipv4_nat.add_rule.assert_called_once_with(mock.sentinel.chain,
                                                   mock.sentinel.rule,
                                                   tag='floating_ip')
+        self.assertFalse(ipv4_nat.remove_rule.called)
+        self.assertEqual({(mock.sentinel.chain, mock.sentinel.rule)},
+                         ri.fip_nat_rules)
 
     def test_process_floating_ip_nat_rules_removed(self):
         ri = self._create_router()
         ri.get_floating_ips = mock.Mock(return_value=[])
         ri.iptables_manager = mock.MagicMock()
+        ri.fip_nat_rules = {(mock.sentinel.chain, mock.sentinel.rule)}
         ipv4_nat = ri.iptables_manager.ipv4['nat']
 
         ri.process_floating_ip_nat_rules()
 
-        # Be sure that the rules are cleared first and apply is called last
-        self.assertEqual(mock.call.clear_rules_by_tag('floating_ip'),
-                         ipv4_nat.mock_calls[0])
+        # Be sure that apply is called last
         self.assertEqual(mock.call.apply(), ri.iptables_manager.mock_calls[-1])
 
-        # Be sure that add_rule is called somewhere in the middle
+        ipv4_nat.remove_rule.assert_called_once_with(mock.sentinel.chain,
+                                                     mock.sentinel.rule)
         self.assertFalse(ipv4_nat.add_rule.called)
+        self.assertEqual(set(), ri.fip_nat_rules)
+
+    def test_process_floating_ip_nat_rules_changed_fips_only(self):
+        ri = self._create_router()
+        ri.iptables_manager = mock.MagicMock()
+        ipv4_nat = ri.iptables_manager.ipv4['nat']
+        fips = [{'fixed_ip_address': '10.0.0.%d' % i,
+                 'floating_ip_address': '172.24.4.%d' % i}
+                for i in range(1, 4)]
+        ri.get_floating_ips = mock.Mock(return_value=fips)
+        ri.process_floating_ip_nat_rules()
+        self.assertEqual(9, ipv4_nat.add_rule.call_count)
+        ipv4_nat.reset_mock()
+
+        # Move the first floating IP, remove the second one and add a new one
+        fips[0] = {'fixed_ip_address': '10.0.0.11',
+                   'floating_ip_address': '172.24.4.1'}
+        del fips[1]
+        fips.append({'fixed_ip_address': '10.0.0.4',
+                     'floating_ip_address': '172.24.4.4'})
+        ri.process_floating_ip_nat_rules()
+
+        removed = set(ri.floating_forward_rules('172.24.4.1', '10.0.0.1') +
+                      ri.floating_forward_rules('172.24.4.2', '10.0.0.2'))
+        added = (ri.floating_forward_rules('172.24.4.1', '10.0.0.11') +
+                 ri.floating_forward_rules('172.24.4.4', '10.0.0.4'))
+        self.assertEqual(removed, set(c[0] for c in
+                                      ipv4_nat.remove_rule.call_args_list))
+        ipv4_nat.add_rule.assert_has_calls(
+            [mock.call(chain, rule, tag='floating_ip')
+             for chain, rule in added])
+        self.assertEqual(6, ipv4_nat.add_rule.call_count)
 
     def test_process_floating_ip_address_scope_rules_diff_scopes(self):
         ri = self._create_router()
@@ -354,6 +403,43 @@ class TestBasicRouterOperations(BasicRouterTestCaseFramework):
         ri.process_floating_ip_addresses.assert_called_once_with(
             mock.sentinel.interface_name)
 
+    def _test_process_floating_ips(self, error=False):
+        fip = {'id': _uuid(), 'floating_ip_address': '15.1.2.3',
+               'fixed_ip_address': '192.168.0.1'}
+        ri = self._create_router({'id': _uuid(),
+                                  'gw_port': {'id': _uuid()},
+                                  lib_constants.FLOATINGIP_KEY: [fip]})
+        ri.iptables_manager = mock.MagicMock()
+        ri.process_snat_dnat_for_fip = mock.Mock()
+        ri.process_floating_ip_address_scope_rules = mock.Mock()
+        ri._process_external_gateway = mock.Mock()
+        ri.get_external_device_interface_name = mock.Mock(
+            return_value=mock.sentinel.interface_name)
+        ri.update_fip_statuses = mock.Mock()
+        statuses = {fip['id']: lib_constants.FLOATINGIP_STATUS_ACTIVE}
+        ri.configure_fip_addresses = mock.Mock(return_value=statuses)
+        if error:
+            ri.configure_fip_addresses.side_effect = (
+                n_exc.FloatingIpSetupException('fake'))
+            statuses = {fip['id']: lib_constants.FLOATINGIP_STATUS_ERROR}
+
+        ri.process_floating_ips(mock.sentinel.agent)
+
+        self.assertFalse(ri._process_external_gateway.called)
+        ri.configure_fip_addresses.assert_called_once_with(
+            mock.sentinel.interface_name)
+        ri.process_snat_dnat_for_fip.assert_called_once_with()
+        ri.process_floating_ip_address_scope_rules.assert_called_once_with()
+        ri.update_fip_statuses.assert_called_once_with(
+            mock.sentinel.agent, statuses)
+        self.assertEqual({'15.1.2.3': '192.168.0.1'}, ri.fip_map)
+
+    def test_process_floating_ips(self):
+        self._test_process_floating_ips()
+
+    def test_process_floating_ips_error(self):
+        self._test_process_floating_ips(error=True)
+
     def test_get_router_cidrs_returns_cidrs(self):
         ri = self._create_router()
         addresses = ['15.1.2.2/24', '15.1.2.3/32']
@@ -0,0 +1,128 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_serialization import jsonutils
+import webob
+
+from neutron.agent.l3 import router_metrics
+from neutron.tests import base
+
+
+class TestPhaseTimer(base.BaseTestCase):
+    def test_nested_phases_are_exclusive(self):
+        timer = router_metrics.PhaseTimer()
+        with mock.patch.object(router_metrics.timeutils,
+                               'StopWatch') as stop_watch:
+            outer = mock.Mock()
+            outer.elapsed.return_value = 10.0
+            inner = mock.Mock()
+            inner.elapsed.return_value = 3.0
+            stop_watch.return_value.start.side_effect = [outer, inner, inner]
+            with timer.phase('outer'):
+                with timer.phase('inner'):
+                    pass
+                with timer.phase('inner'):
+                    pass
+        self.assertEqual({'outer': 4.0, 'inner': 6.0}, timer.timings)
+
+    def test_reset(self):
+        timer = router_metrics.PhaseTimer()
+        with timer.phase('phase'):
+            pass
+        self.assertIn('phase', timer.timings)
+        timer.reset()
+        self.assertEqual({}, timer.timings)
+
+
+class TestRouterMetrics(base.BaseTestCase):
+    def setUp(self):
+        super(TestRouterMetrics, self).setUp()
+        self.metrics = router_metrics.RouterMetrics()
+        self.metrics.record_processing('r1', 2.0, {'internal_ports': 1.5,
+                                                   'routes': 0.5})
+        self.metrics.record_processing('r1', 1.0, {'internal_ports': 1.0})
+        self.metrics.record_processing('r2', 4.0, {'floating_ips': 4.0})
+        self.metrics.record_processing('r3', 3.0, {})
+        self.metrics.record_queue_wait(0, 0.5)
+        self.metrics.record_queue_wait(0, 1.5)
+        self.metrics.record_resync('r2')
+
+    def test_get_stats(self):
+        stats = self.metrics.get_stats({0: 3})
+        self.assertEqual(3, stats['routers'])
+        self.assertEqual(4, stats['processing']['count'])
+        self.assertEqual(4.0, stats['processing']['max'])
+        self.assertEqual(2.5, stats['phases']['internal_ports']['total'])
+        self.assertEqual({0: 3}, stats['queue']['depth'])
+        self.assertEqual(1.0, stats['queue']['wait'][0]['average'])
+        self.assertEqual(1, stats['resyncs'])
+
+    def test_get_router_stats(self):
+        stats = self.metrics.get_router_stats('r1')
+        self.assertEqual(2, stats['processing']['count'])
+        self.assertEqual(1.0, stats['processing']['last'])
+        self.assertEqual({'internal_ports': 1.0}, stats['last_phases'])
+        self.assertIsNone(self.metrics.get_router_stats('r4'))
+
+    def test_get_slowest_routers(self):
+        slowest = self.metrics.get_slowest_routers(2)
+        self.assertEqual(['r2', 'r3'], [r['router_id'] for r in slowest])
+        self.assertEqual(1, slowest[0]['resyncs'])
+
+    def test_remove_router(self):
+        self.metrics.remove_router('r2')
+        self.metrics.remove_router('r4')
+        self.assertEqual(['r3', 'r1'],
+                         [r['router_id']
+                          for r in self.metrics.get_slowest_routers()])
+
+
+class TestRouterMetricsHandler(base.BaseTestCase):
+    def setUp(self):
+        super(TestRouterMetricsHandler, self).setUp()
+        self.metrics = router_metrics.RouterMetrics()
+        self.metrics.record_processing('r1', 2.0, {'routes': 2.0})
+        self.metrics.record_processing('r2', 1.0, {'routes': 1.0})
+        self.queue = mock.Mock()
+        self.queue.get_depths.return_value = {1: 5}
+        self.handler = router_metrics.RouterMetricsHandler(self.metrics,
+                                                           self.queue)
+
+    def _get(self, path):
+        return webob.Request.blank(path).get_response(self.handler)
+
+    def test_stats(self):
+        response = self._get('/')
+        self.assertEqual(200, response.status_int)
+        stats = jsonutils.loads(response.body)
+        self.assertEqual(2, stats['routers'])
+        self.assertEqual({'1': 5}, stats['queue']['depth'])
+
+    def test_slow_routers(self):
+        response = self._get('/slow-routers?limit=1')
+        self.assertEqual(['r1'], [r['router_id']
+                                  for r in jsonutils.loads(response.body)])
+
+    def test_slow_routers_invalid_limit(self):
+        self.assertEqual(400, self._get('/slow-routers?limit=x').status_int)
+
+    def test_router_stats(self):
+        response = self._get('/routers/r2')
+        self.assertEqual(1.0, jsonutils.loads(
+            response.body)['processing']['last'])
+        self.assertEqual(404, self._get('/routers/r3').status_int)
+
+    def test_not_found(self):
+        self.assertEqual(404, self._get('/unknown').status_int)
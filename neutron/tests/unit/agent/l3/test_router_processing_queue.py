@@ -101,3 +101,24 @@ class TestExclusiveRouterProcessor(base.BaseTestCase):
             raise Exception("Only the master should process a router")
 
         self.assertEqual(2, len([i for i in master.updates()]))
+
+
+class TestRouterProcessingQueue(base.BaseTestCase):
+    def test_get_depths(self):
+        router_id, router_id_2 = _uuid(), _uuid()
+        queue = l3_queue.RouterProcessingQueue()
+        queue.add(l3_queue.RouterUpdate(router_id, l3_queue.PRIORITY_RPC))
+        queue.add(l3_queue.RouterUpdate(
+            router_id_2, l3_queue.PRIORITY_SYNC_ROUTERS_TASK))
+        queue.add(l3_queue.RouterUpdate(
+            router_id, l3_queue.PRIORITY_SYNC_ROUTERS_TASK))
+        self.assertEqual({l3_queue.PRIORITY_RPC: 1,
+                          l3_queue.PRIORITY_SYNC_ROUTERS_TASK: 2},
+                         queue.get_depths())
+
+        updates = [update for rp, update
+                   in queue.each_update_to_next_router()]
+        self.assertEqual([router_id], [update.id for update in updates])
+        self.assertIsNotNone(updates[0].enqueued_at)
+        self.assertEqual({l3_queue.PRIORITY_SYNC_ROUTERS_TASK: 2},
+                         queue.get_depths())
@@ -108,3 +108,29 @@ class BridgeLibTest(base.BaseTestCase):
         with mock.patch('os.listdir', side_effect=[interfaces, OSError()]):
             self.assertEqual(interfaces, br.get_interfaces())
             self.assertEqual([], br.get_interfaces())
+
+
+class FdbInterfaceTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(FdbInterfaceTest, self).setUp()
+        self.execute = mock.patch.object(bridge_lib.utils, 'execute').start()
+
+    def test_batch(self):
+        bridge_lib.FdbInterface.batch(
+            [('add', '00:00:00:00:00:00', 'vxlan-1', '10.0.0.2'),
+             ('replace', 'fa:16:3e:00:00:01', 'vxlan-1', '10.0.0.2'),
+             ('delete', 'fa:16:3e:00:00:02', 'vxlan-1', None)],
+            check_exit_code=False)
+        self.execute.assert_called_once_with(
+            ['bridge', '-force', '-batch', '-'],
+            process_input='fdb add 00:00:00:00:00:00 dev vxlan-1 '
+                          'dst 10.0.0.2\n'
+                          'fdb replace fa:16:3e:00:00:01 dev vxlan-1 '
+                          'dst 10.0.0.2\n'
+                          'fdb delete fa:16:3e:00:00:02 dev vxlan-1\n',
+            run_as_root=True, check_exit_code=False)
+
+    def test_batch_no_entries(self):
+        bridge_lib.FdbInterface.batch([])
+        self.assertFalse(self.execute.called)
@@ -0,0 +1,95 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.agent.linux import command_accounting
+from neutron.tests import base
+
+
+class TestGetBinary(base.BaseTestCase):
+    def test_get_binary(self):
+        self.assertEqual('iptables-save',
+                         command_accounting.get_binary(
+                             ['/sbin/iptables-save', '-c']))
+
+    def test_get_binary_in_namespace(self):
+        self.assertEqual('dnsmasq',
+                         command_accounting.get_binary(
+                             ['ip', 'netns', 'exec', 'qdhcp-1', 'env',
+                              'A=1', 'B=2', 'dnsmasq', '--no-hosts']))
+
+    def test_get_binary_empty(self):
+        self.assertEqual('unknown', command_accounting.get_binary([]))
+
+
+class TestCommandAccounting(base.BaseTestCase):
+    def setUp(self):
+        super(TestCommandAccounting, self).setUp()
+        self.accounting = command_accounting.CommandAccounting()
+
+    def test_record(self):
+        self.accounting.record(['ip', 'addr'], 1.0, None, 'out', False,
+                               call_site='site1')
+        self.accounting.record(['ip', 'link'], 3.0, 'in', '', True,
+                               call_site='site2')
+        self.accounting.record(['iptables-save'], 0.5, None, 'rules', False,
+                               call_site='site2')
+        stats = self.accounting.get_stats()
+        self.assertEqual(['ip', 'iptables-save'], list(stats['binaries']))
+        self.assertEqual({'count': 2, 'failures': 1, 'failure_rate': 0.5,
+                          'total_time': 4.0, 'average_time': 2.0,
+                          'max_time': 3.0, 'stdin_bytes': 2,
+                          'stdout_bytes': 3}, stats['binaries']['ip'])
+        self.assertEqual(['site2', 'site1'], list(stats['call_sites']))
+        self.assertEqual(2, stats['call_sites']['site2']['count'])
+
+    def test_record_text_sizes_in_bytes(self):
+        self.accounting.record(['cat'], 1.0, u'\xe9', u'\xe9t\xe9', False,
+                               call_site='site')
+        stats = self.accounting.get_stats()['binaries']['cat']
+        self.assertEqual((2, 5), (stats['stdin_bytes'],
+                                  stats['stdout_bytes']))
+
+    def test_get_stats_limit(self):
+        for i in range(3):
+            self.accounting.record(['cmd%d' % i], i, None, None, False)
+        self.assertEqual(['cmd2', 'cmd1'],
+                         list(self.accounting.get_stats(2)['binaries']))
+
+    def test_call_site(self):
+        self.accounting.record(['ls'], 1.0, None, None, False)
+        call_site, = self.accounting.call_sites
+        self.assertTrue(call_site.startswith('%s:test_call_site:' % __name__))
+
+    def test_dump(self):
+        self.accounting.record(['ls'], 1.0, None, None, False,
+                               call_site='site')
+        with mock.patch.object(command_accounting.LOG, 'info') as info:
+            self.accounting.dump()
+        self.assertIn('  ls: 1 executions, 0 failed, 1.000s total',
+                      info.call_args[0][1])
+
+    def test_start(self):
+        register_section = mock.patch.object(
+            command_accounting.gmr.TextGuruMeditation,
+            'register_section').start()
+        loop = mock.patch.object(command_accounting.loopingcall,
+                                 'FixedIntervalLoopingCall').start()
+        self.accounting.start(60)
+        register_section.assert_called_once_with(
+            'Command Accounting', self.accounting._get_report_model)
+        loop.assert_called_once_with(self.accounting.dump)
+        loop.return_value.start.assert_called_once_with(interval=60,
+                                                        initial_delay=60)
@@ -15,14 +15,17 @@
 
 import os
 
+import eventlet
 import mock
 import netaddr
 from neutron_lib import constants
 from oslo_config import cfg
+from oslo_utils import uuidutils
 
 from neutron.agent.common import config
 from neutron.agent.linux import dhcp
 from neutron.agent.linux import external_process
+from neutron.agent.linux import ip_lib
 from neutron.common import constants as n_const
 from neutron.common import utils
 from neutron.conf.agent import dhcp as dhcp_config
@@ -855,6 +858,7 @@ class TestBase(TestConfBase):
 
         self.makedirs = mock.patch('os.makedirs').start()
         self.rmtree = mock.patch('shutil.rmtree').start()
+        mock.patch.dict(dhcp.Dnsmasq._host_tables, clear=True).start()
 
         self.external_process = mock.patch(
             'neutron.agent.linux.external_process.ProcessManager').start()
@@ -1895,6 +1899,99 @@ class TestDnsmasq(TestBase):
         self.assertEqual(expected, leases)
         mock_open.assert_called_once_with(filename)
 
+    def _get_dict_port(self, port):
+        return dhcp.DictModel({
+            'id': port.id,
+            'mac_address': port.mac_address,
+            'device_owner': port.device_owner,
+            'device_id': port.device_id,
+            'fixed_ips': [{'ip_address': ip.ip_address,
+                           'subnet_id': ip.subnet_id}
+                          for ip in port.fixed_ips],
+            'extra_dhcp_opts': []})
+
+    def _get_dict_ports_network(self):
+        self.conf.set_override('enable_isolated_metadata', False)
+        network = FakeV4Network()
+        network.ports = [self._get_dict_port(FakePort1()),
+                         self._get_dict_port(FakePort2())]
+        return network
+
+    def test_output_config_files_renders_changed_ports(self):
+        network = self._get_dict_ports_network()
+        dm = self._get_dnsmasq(network)
+        with mock.patch.object(dm, '_make_host_entry',
+                               wraps=dm._make_host_entry) as make_entry:
+            dm._output_config_files()
+            self.assertEqual(2, make_entry.call_count)
+            make_entry.reset_mock()
+
+            dm = self._get_dnsmasq(network)
+            dm._make_host_entry = make_entry
+            network.ports[1].fixed_ips[0].ip_address = '192.168.0.4'
+            dm._output_config_files()
+        make_entry.assert_called_once_with(network.ports[1], mock.ANY,
+                                           mock.ANY, mock.ANY)
+        self.safe.assert_any_call(
+            '/dhcp/%s/host' % network.id,
+            '00:00:80:aa:bb:cc,host-192-168-0-2.openstacklocal,192.168.0.2\n'
+            '00:00:f3:aa:bb:cc,host-192-168-0-4.openstacklocal,'
+            '192.168.0.4\n')
+
+    def test_port_fingerprint(self):
+        port = self._get_dict_port(FakePort1())
+        fingerprint = dhcp.get_port_fingerprint(port)
+        self.assertEqual(fingerprint, dhcp.get_port_fingerprint(
+            self._get_dict_port(FakePort1())))
+        port.device_id = 'other-device'
+        self.assertEqual(fingerprint, dhcp.get_port_fingerprint(port))
+        port.extra_dhcp_opts = [dhcp.DictModel({'opt_name': 'tftp-server',
+                                                'opt_value': '10.0.0.1',
+                                                'ip_version': 4})]
+        self.assertNotEqual(fingerprint, dhcp.get_port_fingerprint(port))
+
+    def test_host_table_keeps_no_port(self):
+        network = self._get_dict_ports_network()
+        self._get_dnsmasq(network)._output_config_files()
+        entries = dhcp.Dnsmasq._host_tables[network.id].entries
+        self.assertEqual(
+            dhcp.get_port_fingerprint(network.ports[0]),
+            entries[network.ports[0].id].fingerprint)
+        self.assertEqual((), entries[network.ports[0].id].dhcp_ips)
+
+    def test_output_config_files_unchanged_not_written(self):
+        network = self._get_dict_ports_network()
+        self._get_dnsmasq(network)._output_config_files()
+        self.assertEqual(3, self.safe.call_count)
+        self.safe.reset_mock()
+        with mock.patch('os.path.exists', return_value=True):
+            self._get_dnsmasq(network)._output_config_files()
+        self.assertFalse(self.safe.called)
+
+    def test_release_unused_leases_from_host_table(self):
+        network = self._get_dict_ports_network()
+        self._get_dnsmasq(network)._output_config_files()
+        del network.ports[1]
+        dnsmasq = self._get_dnsmasq(network)
+        dnsmasq._read_hosts_file_leases = mock.Mock()
+        dnsmasq._read_v6_leases_file_leases = mock.Mock()
+        dnsmasq._release_lease = mock.Mock()
+
+        dnsmasq._release_unused_leases()
+
+        dnsmasq._release_lease.assert_called_once_with(
+            '00:00:f3:aa:bb:cc', '192.168.0.3', None)
+        self.assertFalse(dnsmasq._read_hosts_file_leases.called)
+        self.assertFalse(dnsmasq._read_v6_leases_file_leases.called)
+
+    def test_remove_config_files_drops_host_table(self):
+        network = self._get_dict_ports_network()
+        dnsmasq = self._get_dnsmasq(network)
+        dnsmasq._output_config_files()
+        self.assertIn(network.id, dhcp.Dnsmasq._host_tables)
+        dnsmasq._remove_config_files()
+        self.assertNotIn(network.id, dhcp.Dnsmasq._host_tables)
+
     def test_make_subnet_interface_ip_map(self):
         with mock.patch('neutron.agent.linux.ip_lib.IPDevice') as ip_dev:
             ip_dev.return_value.addr.list.return_value = [
@@ -2105,6 +2202,329 @@ class TestDnsmasq(TestBase):
         self._test__generate_opts_per_subnet_helper(config, True)
 
 
+class TestSharedDnsmasq(TestConfBase):
+    def setUp(self):
+        super(TestSharedDnsmasq, self).setUp()
+        self.conf.register_opt(cfg.BoolOpt('enable_isolated_metadata',
+                                           default=False))
+        self.conf.register_opt(cfg.BoolOpt('force_metadata',
+                                           default=False))
+        self.conf.register_opt(cfg.BoolOpt('enable_metadata_network',
+                                           default=False))
+        self.config_parse(self.conf)
+        self.conf.set_override('dhcp_confs',
+                               self.get_default_temp_dir().path)
+        self.device_manager_cls = dhcp.SharedDeviceManager
+        self.mock_mgr = mock.patch.object(dhcp, 'SharedDeviceManager').start()
+        self.mock_mgr.return_value.driver.bridged = True
+        self.mock_mgr.return_value.setup.side_effect = (
+            lambda network: 'ns-' + network.id[:8])
+        mock.patch('neutron.agent.common.utils.execute').start()
+        self.pm = mock.patch.object(external_process,
+                                    'ProcessManager').start().return_value
+        self.pm.active = False
+        self.pm.pid = None
+        mock.patch.object(dhcp.SharedDnsmasq, '_groups', None).start()
+        mock.patch.object(dhcp.SharedDnsmasq, '_network_groups', None).start()
+        mock.patch.object(dhcp.SharedDnsmasq, '_restarts', set()).start()
+        self.spawn_after = mock.patch.object(eventlet, 'spawn_after').start()
+        self.process_monitor = mock.Mock()
+
+    def _make_network(self, *cidrs, **kwargs):
+        network_id = uuidutils.generate_uuid()
+        subnets = [{'id': '%s-%d' % (network_id, i), 'cidr': cidr,
+                    'ip_version': 4, 'enable_dhcp': True,
+                    'gateway_ip': None, 'host_routes': [],
+                    'dns_nameservers': []}
+                   for i, cidr in enumerate(cidrs)]
+        return dhcp.NetModel({'id': network_id, 'subnets': subnets,
+                              'ports': [],
+                              'tenant_id': kwargs.get('tenant_id', 'tenant')})
+
+    def _get_driver(self, network):
+        return dhcp.SharedDnsmasq(self.conf, network, self.process_monitor)
+
+    def _enable(self, network):
+        driver = self._get_driver(network)
+        driver.enable()
+        return driver
+
+    def test_networks_share_group(self):
+        net1 = self._make_network('10.0.0.0/24')
+        net2 = self._make_network('10.0.1.0/24')
+        driver1 = self._enable(net1)
+        driver2 = self._enable(net2)
+        group = driver1.group
+        self.assertIs(group, driver2.group)
+        self.assertFalse(group.exclusive)
+        self.assertEqual('qdhcp-%s' % group.id, net1.namespace)
+        self.assertEqual(net1.namespace, net2.namespace)
+        cmd = driver2._build_cmdline_callback('pid')
+        self.assertIn('--dhcp-hostsdir=%s' % group.get_conf_file_name('host'),
+                      cmd)
+        self.assertIn('--bind-dynamic', cmd)
+        self.assertNotIn('--bind-interfaces', cmd)
+        for network in (net1, net2):
+            self.assertNotIn('--interface=ns-%s' % network.id[:8], cmd)
+            self.assertIn('--dhcp-range=set:%s-tag0,%s,static,86400s' %
+                          (network.id, network.subnets[0].cidr[:-3]), cmd)
+        self.assertIn('--dhcp-lease-max=512', cmd)
+        self.assertTrue(os.path.exists(driver2.get_conf_file_name('host')))
+        self.process_monitor.register.assert_called_with(
+            uuid=group.id, service_name=dhcp.DNSMASQ_SERVICE_NAME,
+            monitored_process=self.pm)
+
+    def test_overlapping_networks_in_different_groups(self):
+        driver1 = self._enable(self._make_network('10.0.0.0/24'))
+        driver2 = self._enable(self._make_network('10.0.0.0/16'))
+        self.assertIsNot(driver1.group, driver2.group)
+
+    def test_networks_of_other_projects_in_different_groups(self):
+        driver1 = self._enable(self._make_network('10.0.0.0/24'))
+        driver2 = self._enable(self._make_network('10.0.1.0/24',
+                                                  tenant_id='other'))
+        self.assertIsNot(driver1.group, driver2.group)
+        self.assertEqual('tenant', driver1.group.project_id)
+        self.assertEqual('other', driver2.group.project_id)
+
+    def test_group_max_networks(self):
+        self.conf.set_override('dnsmasq_shared_max_networks', 1)
+        driver1 = self._enable(self._make_network('10.0.0.0/24'))
+        driver2 = self._enable(self._make_network('10.0.1.0/24'))
+        self.assertIsNot(driver1.group, driver2.group)
+
+    def test_network_needing_metadata_has_exclusive_group(self):
+        self.conf.set_override('enable_isolated_metadata', True)
+        network = self._make_network('10.0.0.0/24')
+        with mock.patch.object(dhcp.SharedDnsmasq,
+                               '_make_subnet_interface_ip_map',
+                               return_value={network.subnets[0].id:
+                                             '10.0.0.2'}):
+            driver = self._enable(network)
+        self.assertTrue(driver.group.exclusive)
+        self.assertEqual(network.id, driver.group.id)
+        self.assertEqual('qdhcp-%s' % network.id, network.namespace)
+        cmd = driver._build_cmdline_callback('pid')
+        self.assertIn('--bind-interfaces', cmd)
+        self.assertIn('--interface=ns-%s' % network.id[:8], cmd)
+
+    def _test_network_of_other_projects_has_exclusive_group(self, key):
+        owner_driver = self._enable(self._make_network('10.0.0.0/24'))
+        network = self._make_network('10.0.1.0/24')
+        network[key] = True
+        driver = self._enable(network)
+        self.assertIsNot(owner_driver.group, driver.group)
+        self.assertTrue(driver.group.exclusive)
+        self.assertEqual(network.id, driver.group.id)
+
+    def test_shared_network_has_exclusive_group(self):
+        self._test_network_of_other_projects_has_exclusive_group('shared')
+
+    def test_external_network_has_exclusive_group(self):
+        self._test_network_of_other_projects_has_exclusive_group(
+            'router:external')
+
+    def test_network_becoming_shared_leaves_group(self):
+        network = self._make_network('10.0.1.0/24')
+        self._enable(self._make_network('10.0.0.0/24'))
+        driver = self._enable(network)
+        group = driver.group
+        network['shared'] = True
+        self.pm.active = True
+        driver.restart()
+        self.assertNotIn(network.id, group.networks)
+        self.assertTrue(driver.group.exclusive)
+
+    def test_network_without_bridged_port_has_exclusive_group(self):
+        self.mock_mgr.return_value.driver.bridged = False
+        driver = self._enable(self._make_network('10.0.0.0/24'))
+        self.assertTrue(driver.group.exclusive)
+
+    def test_network_forwarding_dns_off_link_has_exclusive_group(self):
+        self.conf.set_override('dnsmasq_dns_servers',
+                               ['10.0.0.53', '192.168.0.53'])
+        driver = self._enable(self._make_network('10.0.0.0/24'))
+        self.assertTrue(driver.group.exclusive)
+        self.assertEqual('qdhcp-%s' % driver.network.id,
+                         driver.network.namespace)
+
+    def test_network_forwarding_dns_on_link_shares_group(self):
+        self.conf.set_override('dnsmasq_dns_servers',
+                               ['10.0.0.53', '/example.org/10.0.1.53#5353'])
+        driver = self._enable(self._make_network('10.0.0.0/24',
+                                                 '10.0.1.0/24'))
+        self.assertFalse(driver.group.exclusive)
+
+    def test_network_forwarding_dns_to_host_resolvers_has_exclusive_group(
+            self):
+        self.conf.set_override('dnsmasq_local_resolv', True)
+        driver = self._enable(self._make_network('10.0.0.0/24'))
+        self.assertTrue(driver.group.exclusive)
+
+    def test_groups_loaded_from_disk(self):
+        network = self._make_network('10.0.0.0/24')
+        group_id = self._enable(network).group.id
+        dhcp.SharedDnsmasq._groups = None
+        driver = self._get_driver(self._make_network('10.0.0.0/24'))
+        self.assertIsNone(driver.group)
+        driver = self._get_driver(network)
+        self.assertEqual(group_id, driver.group.id)
+        self.assertEqual('tenant', driver.group.project_id)
+        self.assertEqual('ns-%s' % network.id[:8],
+                         driver.group.networks[network.id]['interface'])
+
+    def test_restart_moves_network_out_of_group_without_project(self):
+        network = self._make_network('10.0.0.0/24')
+        driver = self._enable(network)
+        group = driver.group
+        group.project_id = None
+        self.pm.active = True
+        driver.restart()
+        self.assertIsNot(group, driver.group)
+        self.assertEqual('tenant', driver.group.project_id)
+
+    def test_spawn_schedules_restart_of_process_of_group(self):
+        self._enable(self._make_network('10.0.0.0/24'))
+        self.pm.active = True
+        driver = self._enable(self._make_network('10.0.1.0/24'))
+        self._enable(self._make_network('10.0.2.0/24'))
+        # the process is signaled to read the hosts of the networks, and
+        # restarted once to serve their subnets
+        self.assertFalse(self.pm.disable.called)
+        self.pm.enable.assert_called_with(reload_cfg=True)
+        self.spawn_after.assert_called_once_with(
+            dhcp.SharedDnsmasq.RESTART_DELAY, driver._restart_group,
+            driver.group)
+        self.pm.reset_mock()
+        driver._restart_group(driver.group)
+        self.pm.disable.assert_called_once_with()
+        self.pm.enable.assert_called_once_with()
+        self.assertEqual(set(), dhcp.SharedDnsmasq._restarts)
+        # the process is only signaled if nothing changed
+        self.pm.reset_mock()
+        self.spawn_after.reset_mock()
+        driver.restart()
+        self.assertFalse(self.spawn_after.called)
+        self.pm.enable.assert_called_once_with(reload_cfg=True)
+
+    def test_new_interface_does_not_restart_process_of_group(self):
+        network = self._make_network('10.0.0.0/24')
+        driver = self._enable(network)
+        self.pm.active = True
+        self.mock_mgr.return_value.setup.side_effect = (
+            lambda network: 'ns-new')
+        driver.restart()
+        self.assertFalse(self.spawn_after.called)
+        self.assertFalse(self.pm.disable.called)
+        self.assertEqual('ns-new',
+                         driver.group.networks[network.id]['interface'])
+
+    def test_restart_group_skips_removed_group(self):
+        driver = self._enable(self._make_network('10.0.0.0/24'))
+        group = driver.group
+        dhcp.SharedDnsmasq._restarts.add(group.id)
+        driver.disable()
+        self.pm.reset_mock()
+        driver._restart_group(group)
+        self.assertFalse(self.pm.disable.called)
+        self.assertFalse(self.pm.enable.called)
+        self.assertEqual(set(), dhcp.SharedDnsmasq._restarts)
+
+    def test_restart_moves_network_to_other_group(self):
+        self._enable(self._make_network('10.0.0.0/24'))
+        network = self._make_network('10.1.0.0/24')
+        driver = self._enable(network)
+        group = driver.group
+        network.subnets[0].cidr = '10.0.0.0/16'
+        self.pm.active = True
+        driver = self._get_driver(network)
+        driver.restart()
+        self.assertIsNot(group, driver.group)
+        self.assertNotIn(network.id, group.networks)
+
+    @mock.patch.object(ip_lib, 'IPWrapper')
+    def test_restart_moves_network_keeping_dhcp_port(self, ip_wrapper):
+        plugin = mock.Mock()
+        with mock.patch('neutron.agent.common.utils.load_interface_driver'):
+            device_manager = self.device_manager_cls(self.conf, plugin)
+        device_manager.driver.bridged = True
+        device_manager.setup = self.mock_mgr.return_value.setup
+        self.mock_mgr.return_value = device_manager
+        self._enable(self._make_network('10.0.0.0/24'))
+        network = self._make_network('10.1.0.0/24')
+        driver = self._enable(network)
+        group = driver.group
+        old_namespace = network.namespace
+        network.subnets[0].cidr = '10.0.0.0/16'
+        self.pm.active = True
+        driver = self._get_driver(network)
+        driver.restart()
+
+        self.assertFalse(plugin.release_dhcp_port.called)
+        device_manager.driver.unplug.assert_called_once_with(
+            'ns-%s' % network.id[:8], namespace=old_namespace)
+        self.assertIsNot(group, driver.group)
+        self.assertEqual(driver.group.namespace, network.namespace)
+        # the namespace of the old group is still used by its other network
+        self.assertFalse(ip_wrapper.return_value.netns.delete.called)
+
+    @mock.patch.object(ip_lib, 'IPWrapper')
+    def test_restart_moves_last_network_of_group(self, ip_wrapper):
+        network = self._make_network('10.0.0.0/24')
+        driver = self._enable(network)
+        old_namespace = network.namespace
+        network['shared'] = True
+        self.pm.active = True
+        driver.restart()
+
+        self.assertFalse(self.mock_mgr.return_value.destroy.called)
+        self.mock_mgr.return_value.unplug.assert_called_once_with(
+            'ns-%s' % network.id[:8], network)
+        ip_wrapper.return_value.netns.delete.assert_called_once_with(
+            old_namespace)
+        self.assertEqual('qdhcp-%s' % network.id, network.namespace)
+
+    def test_disable(self):
+        driver1 = self._enable(self._make_network('10.0.0.0/24'))
+        driver2 = self._enable(self._make_network('10.0.1.0/24'))
+        group = driver1.group
+        self.pm.reset_mock()
+        self.pm.active = True
+        driver1.disable()
+        self.assertIsNone(driver1.group)
+        self.assertEqual([driver2.network.id], list(group.networks))
+        self.mock_mgr.return_value.destroy.assert_called_once_with(
+            driver1.network, 'ns-%s' % driver1.network.id[:8])
+        self.assertFalse(self.pm.disable.called)
+        self.pm.reload_cfg.assert_called_once_with()
+        self.assertNotIn(
+            '--dhcp-range=set:%s-tag0,10.0.0.0,static,86400s' %
+            driver1.network.id, driver2._build_cmdline_callback('pid'))
+
+        driver2.disable()
+        self.process_monitor.unregister.assert_called_once_with(
+            group.id, dhcp.DNSMASQ_SERVICE_NAME)
+        self.assertEqual({}, dhcp.SharedDnsmasq._groups)
+        self.assertFalse(os.path.exists(group.conf_dir))
+
+    def test_init_lease_file_keeps_other_networks_leases(self):
+        driver = self._enable(self._make_network('10.0.0.0/24'))
+        filename = driver.get_conf_file_name('leases')
+        with open(filename, 'w') as f:
+            f.write('duid 00:01\n'
+                    '0 00:00:00:00:00:01 10.0.1.2 * *\n'
+                    '0 00:00:00:00:00:02 10.0.0.2 * *\n')
+        with mock.patch.object(driver, '_get_init_leases',
+                               return_value='1 00:00:00:00:00:03 '
+                                            '10.0.0.2 * *\n'):
+            driver._output_init_lease_file()
+        with open(filename) as f:
+            self.assertEqual(['1 00:00:00:00:00:03 10.0.0.2 * *\n',
+                              'duid 00:01\n',
+                              '0 00:00:00:00:00:01 10.0.1.2 * *\n'],
+                             f.readlines())
+
+
 class TestDeviceManager(TestConfBase):
     def setUp(self):
         super(TestDeviceManager, self).setUp()
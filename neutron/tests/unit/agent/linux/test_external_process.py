@@ -73,6 +73,39 @@ class TestProcessMonitor(BaseTestProcessMonitor):
             self.pmonitor._check_child_processes()
             exit_handler.assert_called_once_with(TEST_UUID, None)
 
+    def test_respawn_counted(self):
+        pm = self.get_monitored_process(TEST_UUID, TEST_SERVICE)
+        pm.active = False
+        self.pmonitor._check_child_processes()
+        self.pmonitor._check_child_processes()
+        self.assertEqual(2, pm.enable.call_count)
+        self.assertEqual({TEST_SERVICE: 2},
+                         self.pmonitor.get_respawn_counts())
+
+    def test_check_child_processes_of_shard(self):
+        pms = [self.get_monitored_process('uuid%d' % i) for i in range(10)]
+        for pm in pms:
+            pm.active = False
+        for shard in range(3):
+            self.pmonitor._check_child_processes(shard, 3)
+            # each process is only checked with its shard
+            self.assertTrue(all(pm.enable.call_count <= 1 for pm in pms))
+        self.assertTrue(all(pm.enable.call_count == 1 for pm in pms))
+
+    def test_periodic_checking_thread_shards(self):
+        self.pmonitor._config.AGENT.check_child_processes_interval = 60
+        self.pmonitor._config.AGENT.check_child_processes_shards = 3
+        self.pmonitor._monitor_processes = True
+        with mock.patch('eventlet.sleep',
+                        side_effect=[None] * 4 + [RuntimeError]) as sleep:
+            self.assertRaises(RuntimeError,
+                              self.pmonitor._periodic_checking_thread)
+        sleep.assert_called_with(20.0)
+        check = self.pmonitor._check_child_processes
+        self.eventlent_spawn.assert_has_calls(
+            [mock.call(check, 0, 3), mock.call(check, 1, 3),
+             mock.call(check, 2, 3), mock.call(check, 0, 3)])
+
     def test_register(self):
         pm = self.get_monitored_process(TEST_UUID)
         self.assertEqual(len(self.pmonitor._monitored_processes), 1)
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
+
 import mock
 import netaddr
 from neutron_lib import exceptions
@@ -282,7 +284,22 @@ class TestIpWrapper(base.BaseTestCase):
         self.assertTrue(fake_str.split.called)
         self.assertEqual(retval, [ip_lib.IPDevice('lo', namespace='foo')])
 
-    def test_get_namespaces_non_root(self):
+    @mock.patch('os.listdir', return_value=['qrouter-foo', 'qdhcp-bar'])
+    def test_get_namespaces_from_run_dir(self, mocked_listdir):
+        retval = ip_lib.IPWrapper.get_namespaces()
+        self.assertEqual(['qrouter-foo', 'qdhcp-bar'], retval)
+        mocked_listdir.assert_called_once_with(ip_lib.NETNS_RUN_DIR)
+        self.assertFalse(self.execute.called)
+
+    @mock.patch('os.listdir',
+                side_effect=OSError(errno.ENOENT, 'No such file'))
+    def test_get_namespaces_no_run_dir(self, mocked_listdir):
+        self.assertEqual([], ip_lib.IPWrapper.get_namespaces())
+        self.assertFalse(self.execute.called)
+
+    @mock.patch('os.listdir',
+                side_effect=OSError(errno.EACCES, 'Permission denied'))
+    def test_get_namespaces_non_root(self, mocked_listdir):
         self.config(group='AGENT', use_helper_for_ns_read=False)
         self.execute.return_value = '\n'.join(NETNS_SAMPLE)
         retval = ip_lib.IPWrapper.get_namespaces()
@@ -294,7 +311,9 @@ class TestIpWrapper(base.BaseTestCase):
         self.execute.assert_called_once_with([], 'netns', ('list',),
                                              run_as_root=False)
 
-    def test_get_namespaces_iproute2_4_root(self):
+    @mock.patch('os.listdir',
+                side_effect=OSError(errno.EACCES, 'Permission denied'))
+    def test_get_namespaces_iproute2_4_root(self, mocked_listdir):
         self.config(group='AGENT', use_helper_for_ns_read=True)
         self.execute.return_value = '\n'.join(NETNS_SAMPLE_IPROUTE2_4)
         retval = ip_lib.IPWrapper.get_namespaces()
@@ -1333,6 +1352,24 @@ class TestArpPing(TestIPCmdBase):
         ip_wrapper.netns.execute.assert_any_call(arping_cmd,
                                                  check_exit_code=True)
 
+    @mock.patch.object(ip_lib, '_arping')
+    @mock.patch('eventlet.spawn_n')
+    def test_send_ipv4_addr_adv_notif_bounded(self, spawn_n, _arping):
+        spawn_n.side_effect = lambda f: f()
+        semaphore = mock.MagicMock()
+        config = mock.Mock(send_arp_for_ha=3)
+        with mock.patch.object(ip_lib, '_ARPING_SEMAPHORE', semaphore):
+            _arping.side_effect = (
+                lambda *args: self.assertTrue(semaphore.__enter__.called))
+            ip_lib.send_ip_addr_adv_notif(mock.sentinel.ns_name,
+                                          mock.sentinel.iface_name,
+                                          '20.0.0.1',
+                                          config)
+        _arping.assert_called_once_with(mock.sentinel.ns_name,
+                                        mock.sentinel.iface_name,
+                                        '20.0.0.1', 3)
+        self.assertTrue(semaphore.__exit__.called)
+
     @mock.patch('eventlet.spawn_n')
     def test_no_ipv6_addr_notif(self, spawn_n):
         ipv6_addr = 'fd00::1'
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 from neutron.agent.linux import ip_monitor
 from neutron.tests import base
 
@@ -34,3 +36,50 @@ class TestIPMonitorEvent(base.BaseTestCase):
         self.assertEqual('lo', event.interface)
         self.assertFalse(event.added)
         self.assertEqual('127.0.0.2/8', event.cidr)
+
+
+class TestIPLinkMonitorEvent(base.BaseTestCase):
+    def test_from_text_parses_added_line(self):
+        event = ip_monitor.IPLinkMonitorEvent.from_text(
+            '12: tap4a1e3c7d-1b: <BROADCAST,MULTICAST> mtu 1500 qdisc noop '
+            'state DOWN group default \    link/ether fe:16:3e:53:aa:01 '
+            'brd ff:ff:ff:ff:ff:ff')
+        self.assertEqual('tap4a1e3c7d-1b', event.interface)
+        self.assertTrue(event.added)
+
+    def test_from_text_parses_deleted_line(self):
+        event = ip_monitor.IPLinkMonitorEvent.from_text(
+            'Deleted 12: tap4a1e3c7d-1b: <BROADCAST,MULTICAST> mtu 1500 '
+            'qdisc noop state DOWN group default')
+        self.assertEqual('tap4a1e3c7d-1b', event.interface)
+        self.assertFalse(event.added)
+
+    def test_from_text_removes_interface_suffix(self):
+        event = ip_monitor.IPLinkMonitorEvent.from_text(
+            '7: veth1@veth0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500')
+        self.assertEqual('veth1', event.interface)
+
+
+class TestIPLinkMonitor(base.BaseTestCase):
+    def setUp(self):
+        super(TestIPLinkMonitor, self).setUp()
+        self.monitor = ip_monitor.IPLinkMonitor()
+
+    def test_has_updates(self):
+        with mock.patch.object(self.monitor, 'iter_stdout',
+                               return_value=iter(['7: tap1: <UP> mtu 1500'])):
+            self.assertTrue(self.monitor.has_updates)
+
+    def test_get_events_consumes_events(self):
+        with mock.patch.object(self.monitor, 'iter_stdout',
+                               return_value=iter(['7: tap1: <UP> mtu 1500'])):
+            events = self.monitor.get_events()
+        self.assertEqual(['tap1'], [e.interface for e in events])
+        with mock.patch.object(self.monitor, 'iter_stdout',
+                               return_value=iter([])):
+            self.assertFalse(self.monitor.has_updates)
+
+    def test_process_events_skips_unparsable_lines(self):
+        with mock.patch.object(self.monitor, 'iter_stdout',
+                               return_value=iter([''])):
+            self.assertFalse(self.monitor.has_updates)
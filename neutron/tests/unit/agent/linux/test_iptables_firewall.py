@@ -1881,14 +1881,66 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
             'IPv4': [FAKE_IP['IPv4']] + other_ips,
             'IPv6': [FAKE_IP['IPv6']]}}
 
-        port = self._fake_port()
         rule = self._fake_sg_rule_for_ethertype(_IPv4, FAKE_SGID)
         rules = self.firewall._expand_sg_rule_with_remote_ips(
-            rule, port, 'ingress')
+            rule, 'ingress')
         self.assertEqual(list(rules),
-                         [dict(list(rule.items()) +
-                               [('source_ip_prefix', '%s/32' % ip)])
-                          for ip in other_ips])
+                         [(dict(list(rule.items()) +
+                                [('source_ip_prefix', '%s/32' % ip)]), ip)
+                          for ip in [FAKE_IP['IPv4']] + other_ips])
+
+    def test_sg_rule_templates_shared_between_ports(self):
+        self.firewall.update_security_group_rules(
+            FAKE_SGID, [{'direction': 'ingress', 'ethertype': _IPv4,
+                         'protocol': 'tcp', 'port_range_min': 22,
+                         'port_range_max': 22}])
+        p1, p2 = self._fake_port(), self._fake_port()
+        p2['device'] = 'tapfake_dev2'
+        with mock.patch.object(
+                self.firewall, '_convert_sg_rule_to_iptables_args',
+                wraps=self.firewall._convert_sg_rule_to_iptables_args
+                ) as convert:
+            self.firewall._setup_chains_apply(dict(p1=p1, p2=p2), {})
+        self.assertEqual(1, convert.call_count)
+        self.assertEqual(
+            [('-p tcp -m tcp --dport 22 -j RETURN', None)],
+            self.firewall._sg_rule_templates[(FAKE_SGID, 'ingress', _IPv4)])
+        self.firewall.iptables.ipv4['filter'].add_rule.assert_has_calls(
+            [mock.call('ifake_dev', '-p tcp -m tcp --dport 22 -j RETURN',
+                       comment=None),
+             mock.call('ifake_dev2', '-p tcp -m tcp --dport 22 -j RETURN',
+                       comment=None)], any_order=True)
+
+    def test_sg_rule_templates_invalidated_on_rules_update(self):
+        rules = [{'direction': 'ingress', 'ethertype': _IPv4}]
+        self.firewall.update_security_group_rules(FAKE_SGID, rules)
+        self.firewall._get_sg_rule_templates(FAKE_SGID, 'ingress', _IPv4)
+        self.firewall.update_security_group_rules(FAKE_SGID, list(rules))
+        self.assertIn((FAKE_SGID, 'ingress', _IPv4),
+                      self.firewall._sg_rule_templates)
+        self.firewall.update_security_group_rules(FAKE_SGID, [])
+        self.assertEqual({}, self.firewall._sg_rule_templates)
+
+    def test_sg_rule_templates_invalidated_on_remote_members_update(self):
+        self.firewall.enable_ipset = False
+        self.firewall.update_security_group_rules(
+            FAKE_SGID, [self._fake_sg_rule_for_ethertype(_IPv4, OTHER_SGID)])
+        self.firewall.update_security_group_members(
+            OTHER_SGID, {_IPv4: [FAKE_IP['IPv4'], '10.0.0.2']})
+        port = self._fake_port()
+        port['security_groups'] = [FAKE_SGID]
+        # the port's own address is skipped when assembling its chain
+        self.assertEqual(
+            ['-s 10.0.0.2/32 -j RETURN'],
+            list(self.firewall._get_port_sg_rule_templates(
+                port, 'ingress', _IPv4)))
+        self.firewall.update_security_group_members(
+            OTHER_SGID, {_IPv4: ['10.0.0.3']})
+        self.assertEqual({}, self.firewall._sg_rule_templates)
+        self.assertEqual(
+            ['-s 10.0.0.3/32 -j RETURN'],
+            list(self.firewall._get_port_sg_rule_templates(
+                port, 'ingress', _IPv4)))
 
     def test_build_ipv4v6_mac_ip_list(self):
         mac_oth = 'ffff-ff0f-ffff'
@@ -1912,6 +1964,63 @@ class IptablesFirewallEnhancedIpsetTestCase(BaseIptablesFirewallTestCase):
         self.assertEqual(fake_ipv6_pair, mac_ipv6_pairs)
 
 
+class IptablesFirewallSharedSgChainsTestCase(BaseIptablesFirewallTestCase):
+    def setUp(self):
+        super(IptablesFirewallSharedSgChainsTestCase, self).setUp()
+        self.firewall.shared_sg_chains = True
+        self.firewall.update_security_group_rules(
+            FAKE_SGID, [{'direction': 'ingress', 'ethertype': _IPv4,
+                         'protocol': 'tcp', 'port_range_min': 22,
+                         'port_range_max': 22}])
+
+    def _fake_port(self, device='tapfake_dev'):
+        return {'device': device,
+                'mac_address': 'ff:ff:ff:ff:ff:ff',
+                'network_id': 'fake_net',
+                'fixed_ips': [FAKE_IP['IPv4']],
+                'security_groups': [FAKE_SGID]}
+
+    def test_sg_chain_shared_between_ports(self):
+        p1 = self._fake_port()
+        p2 = self._fake_port(device='tapfake_dev2')
+        self.firewall._setup_chains_apply(dict(p1=p1, p2=p2), {})
+        mark_rule = ('-p tcp -m tcp --dport 22 '
+                     '-j MARK --set-xmark 0x1000000/0x1000000')
+        self.v4filter_inst.add_chain.assert_has_calls(
+            [mock.call('gifake_sgid'), mock.call('gofake_sgid')])
+        sg_chain_rules = [
+            c for c in self.v4filter_inst.add_rule.mock_calls
+            if c[1][0] == 'gifake_sgid']
+        self.assertEqual([mock.call('gifake_sgid', mark_rule, comment=None)],
+                         sg_chain_rules)
+        for chain in ('ifake_dev', 'ifake_dev2'):
+            port_chain_rules = [
+                c[1][1] for c in self.v4filter_inst.add_rule.mock_calls
+                if c[1][0] == chain]
+            self.assertEqual(
+                ['-m state --state RELATED,ESTABLISHED -j RETURN',
+                 '-j MARK --set-xmark 0x0/0x1000000',
+                 '-j $gifake_sgid',
+                 '-m mark --mark 0x1000000/0x1000000 -j RETURN',
+                 '-m state --state INVALID -j DROP',
+                 '-j $sg-fallback'],
+                port_chain_rules)
+
+    def test_sg_chain_removed_with_ports(self):
+        port = self._fake_port()
+        self.firewall._remove_chains_apply(dict(p1=port), {})
+        self.v4filter_inst.remove_chain.assert_has_calls(
+            [mock.call('gifake_sgid'), mock.call('gofake_sgid')])
+        self.v6filter_inst.remove_chain.assert_has_calls(
+            [mock.call('gifake_sgid'), mock.call('gofake_sgid')])
+
+    def test_port_without_security_groups_skips_mark_rules(self):
+        port = self._fake_port()
+        port['security_groups'] = []
+        self.assertEqual(
+            [], self.firewall._get_port_sg_chain_jumps(port, 'ingress'))
+
+
 class OVSHybridIptablesFirewallTestCase(BaseIptablesFirewallTestCase):
 
     def setUp(self):
@@ -141,6 +141,16 @@ class IptablesTestCase(base.BaseTestCase):
             binary_name = iptables_manager.get_binary_name()
             self.assertEqual('python_-m_unitte', binary_name)
 
+    def test_clear_rules_by_tag(self):
+        table = iptables_manager.IptablesTable()
+        table.add_chain('chain')
+        table.add_rule('chain', '-d 10.0.0.1/32 -j ACCEPT', tag='tag1')
+        table.add_rule('chain', '-d 10.0.0.2/32 -j ACCEPT', tag='tag2')
+        table.add_rule('chain', '-d 10.0.0.3/32 -j ACCEPT', tag='tag1')
+        table.clear_rules_by_tag('tag1')
+        self.assertEqual(['-d 10.0.0.2/32 -j ACCEPT'],
+                         [rule.rule for rule in table.rules])
+
 
 class IptablesCommentsTestCase(base.BaseTestCase):
 
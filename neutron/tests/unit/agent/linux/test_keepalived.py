@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import mock
 from neutron_lib import constants as n_consts
 import testtools
 
@@ -324,6 +325,103 @@ class KeepalivedVipAddressTestCase(base.BaseTestCase):
         self.assertEqual(1, len(instance.vips))
 
 
+class KeepalivedVipSetTestCase(base.BaseTestCase):
+    def _get_vips(self):
+        vips = keepalived.KeepalivedVipSet()
+        for ip_address, interface_name in (('10.0.0.2/24', 'eth1'),
+                                           ('10.0.0.1/24', 'eth1'),
+                                           ('20.0.0.1/24', 'eth2')):
+            vips.add(keepalived.KeepalivedVipAddress(ip_address,
+                                                     interface_name))
+        return vips
+
+    def test_add_keeps_insertion_order(self):
+        vips = self._get_vips()
+        self.assertEqual(['10.0.0.2/24', '10.0.0.1/24', '20.0.0.1/24'],
+                         [vip.ip_address for vip in vips])
+        self.assertFalse(vips.add(
+            keepalived.KeepalivedVipAddress('10.0.0.2/24', 'eth3')))
+        self.assertEqual(3, len(vips))
+        self.assertIn(keepalived.KeepalivedVipAddress('20.0.0.1/24', 'eth3'),
+                      vips)
+
+    def test_discard(self):
+        vips = self._get_vips()
+        vips.discard('10.0.0.2/24')
+        vips.discard('30.0.0.1/24')
+        self.assertEqual(['10.0.0.1/24', '20.0.0.1/24'],
+                         [vip.ip_address for vip in vips])
+        self.assertEqual(['10.0.0.1/24'],
+                         [vip.ip_address
+                          for vip in vips.get_by_interface('eth1')])
+
+    def test_discard_by_interface(self):
+        vips = self._get_vips()
+        vips.discard_by_interface('eth1')
+        vips.discard_by_interface('eth3')
+        self.assertEqual(['20.0.0.1/24'], [vip.ip_address for vip in vips])
+        self.assertEqual([], vips.get_by_interface('eth1'))
+
+
+class KeepalivedManagerTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(KeepalivedManagerTestCase, self).setUp()
+        self.config = keepalived.KeepalivedConf()
+        instance = keepalived.KeepalivedInstance('MASTER', 'eth0', 1,
+                                                 ['169.254.192.0/18'])
+        instance.add_vip('192.168.1.1/24', 'eth1', None)
+        self.config.add_instance(instance)
+        self.process_monitor = mock.Mock()
+        self.manager = keepalived.KeepalivedManager(
+            'router1', self.config, self.process_monitor)
+        mock.patch.object(self.manager, 'get_full_config_file_path',
+                          return_value='/conf/keepalived.conf').start()
+        self.get_conf_on_disk = mock.patch.object(
+            self.manager, 'get_conf_on_disk', return_value=None).start()
+        self.replace_file = mock.patch(
+            'neutron.common.utils.replace_file').start()
+        self.process = mock.Mock(active=True)
+        mock.patch.object(self.manager, 'get_process',
+                          return_value=self.process).start()
+        mock.patch.object(self.manager, '_get_vrrp_process').start()
+
+    def test_spawn_reloads_only_changed_config(self):
+        self.manager.spawn()
+        self.manager.spawn()
+        self.replace_file.assert_called_once_with(
+            '/conf/keepalived.conf', self.config.get_config_str())
+        self.process.enable.assert_called_once_with(reload_cfg=True)
+        self.assertEqual(2, self.process_monitor.register.call_count)
+
+        self.config.get_instance(1).add_vip('192.168.1.2/24', 'eth1', None)
+        self.manager.spawn()
+        self.assertEqual(2, self.replace_file.call_count)
+        self.assertEqual(2, self.process.enable.call_count)
+
+    def test_spawn_unchanged_config_not_active(self):
+        self.manager.spawn()
+        self.process.active = False
+        self.manager.spawn()
+        self.replace_file.assert_called_once_with(
+            '/conf/keepalived.conf', self.config.get_config_str())
+        self.assertEqual(2, self.process.enable.call_count)
+
+    def test_spawn_config_on_disk_unchanged(self):
+        self.get_conf_on_disk.return_value = self.config.get_config_str()
+        self.manager.spawn()
+        self.assertFalse(self.replace_file.called)
+        self.assertFalse(self.process.enable.called)
+        self.process_monitor.register.assert_called_once_with(
+            uuid='router1', service_name=keepalived.KEEPALIVED_SERVICE_NAME,
+            monitored_process=self.process)
+
+    def test_disable_resets_config_hash(self):
+        self.manager.spawn()
+        self.manager.disable()
+        self.manager.spawn()
+        self.assertEqual(2, self.replace_file.call_count)
+
+
 class KeepalivedVirtualRouteTestCase(base.BaseTestCase):
     def test_virtual_route_with_dev(self):
         route = keepalived.KeepalivedVirtualRoute(n_consts.IPv4_ANY, '1.2.3.4',
@@ -63,3 +63,61 @@ class TestInterfacePollingMinimizer(base.BaseTestCase):
     def test__is_polling_required_returns_when_updates_are_present(self):
         with self.mock_has_updates(True):
             self.assertTrue(self.pm._is_polling_required())
+
+
+class TestGetLinkPollingManager(base.BaseTestCase):
+
+    def test_return_always_poll_by_default(self):
+        with polling.get_link_polling_manager() as pm:
+            self.assertEqual(pm.__class__, base_polling.AlwaysPoll)
+
+    def test_manage_link_polling_minimizer(self):
+        mock_target = 'neutron.agent.linux.polling.LinkPollingMinimizer'
+        with mock.patch('%s.start' % mock_target) as mock_start:
+            with mock.patch('%s.stop' % mock_target) as mock_stop:
+                with polling.get_link_polling_manager(
+                        minimize_polling=True) as pm:
+                    self.assertEqual(pm.__class__,
+                                     polling.LinkPollingMinimizer)
+                mock_stop.assert_has_calls([mock.call()])
+            mock_start.assert_has_calls([mock.call()])
+
+
+class TestLinkPollingMinimizer(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestLinkPollingMinimizer, self).setUp()
+        self.pm = polling.LinkPollingMinimizer(resync_interval=60)
+        self.pm._monitor = mock.Mock()
+        self.pm._monitor.is_active.return_value = True
+        self.pm._monitor.has_updates = False
+        self.time = mock.patch('time.time', return_value=1000).start()
+
+    def test__is_polling_required_before_first_polling(self):
+        self.assertTrue(self.pm._is_polling_required())
+
+    def test__is_polling_required_returns_when_updates_are_present(self):
+        self.pm.polling_completed()
+        self.pm._monitor.has_updates = True
+        self.assertTrue(self.pm._is_polling_required())
+
+    def test__is_polling_not_required_without_updates(self):
+        self.pm.polling_completed()
+        self.time.return_value = 1059
+        self.assertFalse(self.pm._is_polling_required())
+
+    def test__is_polling_required_on_resync_interval(self):
+        self.pm.polling_completed()
+        self.time.return_value = 1060
+        self.assertTrue(self.pm._is_polling_required())
+
+    def test__is_polling_not_required_without_resync_interval(self):
+        self.pm._resync_interval = 0
+        self.pm.polling_completed()
+        self.time.return_value = 100000
+        self.assertFalse(self.pm._is_polling_required())
+
+    def test__is_polling_required_when_monitor_is_not_active(self):
+        self.pm.polling_completed()
+        self.pm._monitor.is_active.return_value = False
+        self.assertTrue(self.pm._is_polling_required())
@@ -14,12 +14,14 @@
 
 import socket
 
+import eventlet
 import mock
 import six
 import testtools
 
 import oslo_i18n
 
+from neutron.agent.linux import command_accounting
 from neutron.agent.linux import utils
 from neutron.tests import base
 from neutron.tests.common import helpers
@@ -157,6 +159,78 @@ class AgentUtilsExecuteTest(base.BaseTestCase):
         result = utils.execute(['ls', self.test_file], return_stderr=True)
         self.assertEqual((out_data, err_data), result)
 
+    def test_command_accounting_disabled(self):
+        self.mock_popen.return_value = ["", ""]
+        with mock.patch.object(command_accounting.CommandAccounting,
+                               'record') as record:
+            utils.execute(['ls'])
+        self.assertFalse(record.called)
+
+    def test_command_accounting(self):
+        self.config(group='AGENT', command_accounting=True)
+        mock.patch.object(command_accounting, '_accounting', None).start()
+        mock.patch.object(command_accounting.CommandAccounting,
+                          'start').start()
+        # Output sizes are accounted in bytes, before decoding
+        self.mock_popen.return_value = [b"\xc3\xa9t\xc3\xa9", b""]
+        utils.execute(['ls'], process_input='input')
+        self.process.return_value.returncode = 1
+        self.assertRaises(RuntimeError, utils.execute, ['ls'],
+                          log_fail_as_error=False)
+        stats = command_accounting.get_accounting().get_stats()
+        self.assertEqual({'count': 2, 'failures': 1, 'stdin_bytes': 5,
+                          'stdout_bytes': 10},
+                         {key: stats['binaries']['ls'][key]
+                          for key in ('count', 'failures', 'stdin_bytes',
+                                      'stdout_bytes')})
+        self.assertTrue(any(call_site.startswith(
+            '%s:test_command_accounting:' % __name__)
+            for call_site in stats['call_sites']))
+
+
+class TestRootwrapDaemonHelper(base.BaseTestCase):
+    def setUp(self):
+        super(TestRootwrapDaemonHelper, self).setUp()
+        self.config(group='AGENT', root_helper_daemon='sudo daemon',
+                    root_helper_daemon_pool_size=2)
+        mock.patch.object(utils.RootwrapDaemonHelper,
+                          '_RootwrapDaemonHelper__clients', None).start()
+        self.client = mock.patch.object(utils.client, 'Client').start()
+
+    def test_execute(self):
+        self.client.return_value.execute.return_value = (0, 'out', '')
+        self.assertEqual((0, 'out', ''),
+                         utils.execute_rootwrap_daemon(['ls'], 'in', None))
+        self.client.assert_called_with(['sudo', 'daemon'])
+        self.client.return_value.execute.assert_called_once_with(['ls'],
+                                                                 'in')
+
+    def test_get_client_round_robin(self):
+        self.client.side_effect = lambda cmd: mock.Mock()
+        clients = [utils.RootwrapDaemonHelper.get_client() for i in range(4)]
+        self.assertEqual(2, self.client.call_count)
+        self.assertEqual(clients[:2], clients[2:])
+        self.assertIsNot(clients[0], clients[1])
+
+    def test_concurrent_commands_share_clients(self):
+        running = []
+        concurrency = []
+
+        def execute(cmd, process_input):
+            running.append(cmd)
+            concurrency.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(cmd)
+
+        self.client.return_value.execute.side_effect = execute
+        self.config(group='AGENT', root_helper_daemon_pool_size=1)
+        pool = eventlet.GreenPool()
+        for i in range(6):
+            pool.spawn(utils.execute_rootwrap_daemon, ['ls'], None, None)
+        pool.waitall()
+        # the commands are not serialized by the client of the daemon
+        self.assertEqual(6, max(concurrency))
+
 
 class AgentUtilsExecuteEncodeTest(base.BaseTestCase):
     def setUp(self):
@@ -45,3 +45,27 @@ class TestL3AgentNotifyAPI(base.BaseTestCase):
 
     def test_del_arp_entry(self):
         self._test_arp_update('del_arp_entry')
+
+    @mock.patch('neutron.common.utils.is_extension_supported',
+                return_value=True)
+    @mock.patch('neutron.manager.NeutronManager.get_service_plugins')
+    def test_routers_delta_updated(self, get_plugins, ext_supported):
+        plugin = get_plugins.return_value.get.return_value
+        hosts = {'r1': ['host1', 'host2'], 'r2': ['host1']}
+        plugin.get_hosts_to_notify.side_effect = (
+            lambda ctx, router_id: hosts[router_id])
+        delta1 = {'router_id': 'r1', 'revision_number': 3}
+        delta2 = {'router_id': 'r2', 'revision_number': 7}
+        self.l3_notifier.routers_delta_updated(mock.Mock(), [delta1, delta2])
+
+        self.rpc_client_mock.prepare.assert_has_calls(
+            [mock.call(topic='l3_agent', server='host1', version='1.4'),
+             mock.call(topic='l3_agent', server='host2', version='1.4')],
+            any_order=True)
+        cctxt = self.rpc_client_mock.prepare.return_value
+        cctxt.cast.assert_has_calls(
+            [mock.call(mock.ANY, 'routers_delta_updated',
+                       deltas=[delta1, delta2]),
+             mock.call(mock.ANY, 'routers_delta_updated', deltas=[delta1])],
+            any_order=True)
+        self.assertEqual(2, cctxt.cast.call_count)
@@ -91,6 +91,48 @@ class TestDhcpRpcCallback(base.BaseTestCase):
                     {'id': 'b', 'subnets': [subnets[0]], 'ports': []}]
         self.assertEqual(expected, networks)
 
+    def test_get_active_network_ids(self):
+        self.plugin.get_networks.return_value = [{'id': 'a'}, {'id': 'b'}]
+        self.plugin.get_ports.return_value = []
+        self.assertEqual(['a', 'b'],
+                         self.callbacks.get_active_network_ids(mock.Mock(),
+                                                               host='host'))
+        self.plugin.get_ports.assert_called_once_with(
+            mock.ANY, filters={'network_id': ['a', 'b'],
+                               'status': [constants.PORT_STATUS_DOWN]},
+            fields=['network_id', 'device_owner'])
+
+    def test_get_active_network_ids_pending_networks_first(self):
+        self.plugin.get_networks.return_value = [
+            {'id': 'a'}, {'id': 'b'}, {'id': 'c'}, {'id': 'd'}]
+        self.plugin.get_ports.return_value = [
+            {'network_id': 'b', 'device_owner': constants.DEVICE_OWNER_DHCP},
+            {'network_id': 'c', 'device_owner': 'compute:nova'},
+            {'network_id': 'd', 'device_owner': None}]
+        self.assertEqual(['c', 'd', 'a', 'b'],
+                         self.callbacks.get_active_network_ids(mock.Mock(),
+                                                               host='host'))
+
+    def test_get_active_network_ids_no_network(self):
+        self.plugin.get_networks.return_value = []
+        self.assertEqual([], self.callbacks.get_active_network_ids(
+            mock.Mock(), host='host'))
+        self.assertFalse(self.plugin.get_ports.called)
+
+    def test_get_networks_info(self):
+        self.plugin.get_networks.return_value = [{'id': 'a'}, {'id': 'b'}]
+        port = {'network_id': 'a'}
+        subnet = {'network_id': 'b', 'id': 'c'}
+        self.plugin.get_ports.return_value = [port]
+        self.plugin.get_subnets.return_value = [subnet]
+        networks = self.callbacks.get_networks_info(
+            mock.Mock(), network_ids=['a', 'b', 'd'], host='host')
+        expected = [{'id': 'a', 'subnets': [], 'ports': [port]},
+                    {'id': 'b', 'subnets': [subnet], 'ports': []}]
+        self.assertEqual(expected, networks)
+        self.plugin.get_networks.assert_called_once_with(
+            mock.ANY, filters={'id': ['a', 'b', 'd']})
+
     def _test__port_action_with_failures(self, exc=None, action=None):
         port = {
             'network_id': 'foo_network_id',
@@ -308,9 +350,7 @@ class TestDhcpRpcCallback(base.BaseTestCase):
         context = mock.Mock()
         port_ids = range(10)
         with mock.patch.object(provisioning_blocks,
-                               'provisioning_complete') as pc:
+                               'bulk_provisioning_complete') as pc:
             self.callbacks.dhcp_ready_on_ports(context, port_ids)
-        calls = [mock.call(context, port_id, resources.PORT,
-                           provisioning_blocks.DHCP_ENTITY)
-                 for port_id in port_ids]
-        pc.assert_has_calls(calls)
+        pc.assert_called_once_with(context, port_ids, resources.PORT,
+                                   provisioning_blocks.DHCP_ENTITY)
@@ -65,3 +65,40 @@ class TestL3RpcCallback(testlib_api.SqlTestCase):
         updated_subnet = res[0]
         self.assertEqual(updated_subnet['cidr'], data[subnet['id']])
         self.assertEqual(updated_subnet['allocation_pools'], allocation_pools)
+
+    def test_get_ports_by_subnets(self):
+        subnets = []
+        for cidr in ('10.0.0.0/24', '10.0.1.0/24'):
+            subnet = {'subnet': {'network_id': self.network['id'],
+                                 'tenant_id': 'tenant_id',
+                                 'cidr': cidr,
+                                 'ip_version': 4,
+                                 'name': cidr,
+                                 'enable_dhcp': False,
+                                 'gateway_ip': constants.ATTR_NOT_SPECIFIED,
+                                 'host_routes': None,
+                                 'dns_nameservers': None,
+                                 'allocation_pools': None}}
+            subnets.append(self.plugin.create_subnet(self.ctx, subnet))
+        port = {'port': {'network_id': self.network['id'],
+                         'tenant_id': 'tenant_id',
+                         'name': '',
+                         'admin_state_up': True,
+                         'device_id': '',
+                         'device_owner': '',
+                         'mac_address': constants.ATTR_NOT_SPECIFIED,
+                         'fixed_ips': [{'subnet_id': s['id']}
+                                       for s in subnets]}}
+        port = self.plugin.create_port(self.ctx, port)
+
+        res = self.callbacks.get_ports_by_subnets(
+            self.ctx, subnet_ids=[subnets[0]['id'], subnets[1]['id'],
+                                  'unknown'])
+
+        self.assertEqual({subnets[0]['id'], subnets[1]['id'], 'unknown'},
+                         set(res))
+        self.assertEqual([port['id']],
+                         [p['id'] for p in res[subnets[0]['id']]])
+        self.assertEqual([port['id']],
+                         [p['id'] for p in res[subnets[1]['id']]])
+        self.assertEqual([], res['unknown'])
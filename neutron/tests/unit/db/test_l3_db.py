@@ -16,11 +16,13 @@
 import mock
 from neutron_lib import constants as n_const
 from neutron_lib import exceptions as n_exc
+from oslo_config import cfg
 import testtools
 
 from neutron.callbacks import events
 from neutron.callbacks import registry
 from neutron.callbacks import resources
+from neutron.common import constants as l3_const
 from neutron.db import l3_db
 from neutron.extensions import l3
 from neutron import manager
@@ -54,21 +56,46 @@ class TestL3_NAT_dbonly_mixin(base.BaseTestCase):
         self.assertFalse(get_p.called)
 
     def test__get_subnets_by_network(self):
-        """Basic test that the right query is called"""
+        """Basic test that the right queries are called"""
         context = mock.MagicMock()
         query = context.session.query().outerjoin().filter()
-        query.__iter__.return_value = [(mock.sentinel.subnet_db,
-                                        mock.sentinel.address_scope_id)]
+        query.__iter__.return_value = [mock.Mock(
+            id=mock.sentinel.subnet_id,
+            cidr=mock.sentinel.cidr,
+            gateway_ip=mock.sentinel.gateway_ip,
+            network_id=mock.sentinel.network_id,
+            ipv6_ra_mode=mock.sentinel.ipv6_ra_mode,
+            subnetpool_id=mock.sentinel.subnetpool_id,
+            address_scope_id=mock.sentinel.address_scope_id)]
+        dns_query = context.session.query().filter().order_by()
+        dns_query.__iter__.return_value = [
+            (mock.sentinel.subnet_id, mock.sentinel.dns1),
+            (mock.sentinel.subnet_id, mock.sentinel.dns2)]
 
         with mock.patch.object(manager.NeutronManager, 'get_plugin') as get_p:
-            get_p()._make_subnet_dict.return_value = {
-                'network_id': mock.sentinel.network_id}
             subnets = self.db._get_subnets_by_network_list(
                 context, [mock.sentinel.network_id])
+        self.assertFalse(get_p()._make_subnet_dict.called)
         self.assertEqual({
             mock.sentinel.network_id: [{
-                'address_scope_id': mock.sentinel.address_scope_id,
-                'network_id': mock.sentinel.network_id}]}, subnets)
+                'id': mock.sentinel.subnet_id,
+                'cidr': mock.sentinel.cidr,
+                'gateway_ip': mock.sentinel.gateway_ip,
+                'dns_nameservers': [mock.sentinel.dns1, mock.sentinel.dns2],
+                'network_id': mock.sentinel.network_id,
+                'ipv6_ra_mode': mock.sentinel.ipv6_ra_mode,
+                'subnetpool_id': mock.sentinel.subnetpool_id,
+                'address_scope_id': mock.sentinel.address_scope_id}]},
+            subnets)
+
+    def test__get_subnets_by_network_no_subnets(self):
+        context = mock.MagicMock()
+        query = context.session.query().outerjoin().filter()
+        query.__iter__.return_value = []
+        subnets = self.db._get_subnets_by_network_list(
+            context, [mock.sentinel.network_id])
+        self.assertEqual({mock.sentinel.network_id: []}, subnets)
+        self.assertFalse(context.session.query().filter().order_by.called)
 
     def test__populate_ports_for_subnets_none(self):
         """Basic test that the method runs correctly with no ports"""
@@ -96,7 +123,7 @@ class TestL3_NAT_dbonly_mixin(base.BaseTestCase):
                   'id': 'port_id',
                   'fixed_ips': [{'subnet_id': mock.sentinel.subnet_id}]}]
         with mock.patch.object(manager.NeutronManager, 'get_plugin') as get_p:
-            get_p().get_networks.return_value = [{'id': 'net_id', 'mtu': 1446}]
+            get_p().get_networks_mtu.return_value = {'net_id': 1446}
             self.db._populate_mtu_and_subnets_for_ports(mock.sentinel.context,
                                                         ports)
             keys = ('id', 'cidr', 'gateway_ip', 'ipv6_ra_mode',
@@ -112,6 +139,67 @@ class TestL3_NAT_dbonly_mixin(base.BaseTestCase):
                                'subnets': [{k: subnet[k] for k in keys}],
                                'address_scopes': address_scopes}], ports)
 
+    @mock.patch.object(l3_db.L3_NAT_dbonly_mixin,
+                       '_get_subnets_by_network_list')
+    def test__populate_ports_for_subnets_shared_network(
+            self, get_subnets_by_network):
+        subnet4 = {'id': 'subnet4', 'cidr': '10.0.0.0/24',
+                   'gateway_ip': '10.0.0.1', 'dns_nameservers': [],
+                   'ipv6_ra_mode': None, 'subnetpool_id': None,
+                   'address_scope_id': 'scope4'}
+        subnet6 = {'id': 'subnet6', 'cidr': '2001:db8::/64',
+                   'gateway_ip': '2001:db8::1', 'dns_nameservers': [],
+                   'ipv6_ra_mode': None, 'subnetpool_id': None,
+                   'address_scope_id': None}
+        get_subnets_by_network.return_value = {'net_id': [subnet4, subnet6]}
+
+        ports = [{'network_id': 'net_id', 'id': 'port1',
+                  'fixed_ips': [{'subnet_id': 'subnet4'},
+                                {'subnet_id': 'subnet6'}]},
+                 {'network_id': 'net_id', 'id': 'port2',
+                  'fixed_ips': [{'subnet_id': 'subnet4'}]}]
+        with mock.patch.object(manager.NeutronManager, 'get_plugin') as get_p:
+            get_p().get_networks_mtu.return_value = {'net_id': 1450}
+            self.db._populate_mtu_and_subnets_for_ports(mock.sentinel.context,
+                                                        ports)
+        get_subnets_by_network.assert_called_once_with(
+            mock.sentinel.context, ['net_id'])
+        self.assertEqual(['subnet4', 'subnet6'],
+                         [s['id'] for s in ports[0]['subnets']])
+        self.assertEqual([], ports[0]['extra_subnets'])
+        self.assertEqual([24, 64],
+                         [ip['prefixlen'] for ip in ports[0]['fixed_ips']])
+        self.assertEqual(['subnet4'], [s['id'] for s in ports[1]['subnets']])
+        self.assertEqual(['subnet6'],
+                         [s['id'] for s in ports[1]['extra_subnets']])
+        self.assertIsNot(ports[0]['subnets'][0], ports[1]['subnets'][0])
+        for port in ports:
+            self.assertEqual({4: 'scope4', 6: None}, port['address_scopes'])
+            self.assertEqual(1450, port['mtu'])
+
+    def test__get_mtus_by_network_list(self):
+        with mock.patch.object(manager.NeutronManager, 'get_plugin') as get_p:
+            get_p().get_networks_mtu.return_value = {'net_id': 1450}
+            mtus = self.db._get_mtus_by_network_list(mock.sentinel.context,
+                                                     ['net_id'])
+        self.assertEqual({'net_id': 1450}, mtus)
+        get_p().get_networks_mtu.assert_called_once_with(
+            mock.sentinel.context, ['net_id'])
+        self.assertFalse(get_p().get_networks.called)
+
+    def test__get_mtus_by_network_list_from_networks(self):
+        with mock.patch.object(manager.NeutronManager, 'get_plugin') as get_p:
+            get_p.return_value = mock.Mock(spec=['get_networks'])
+            get_p().get_networks.return_value = [{'id': 'net_id', 'mtu': 1450},
+                                                 {'id': 'net_id2'}]
+            mtus = self.db._get_mtus_by_network_list(mock.sentinel.context,
+                                                     ['net_id', 'net_id2'])
+        self.assertEqual({'net_id': 1450, 'net_id2': 0}, mtus)
+        get_p().get_networks.assert_called_once_with(
+            mock.sentinel.context,
+            filters={'network_id': ['net_id', 'net_id2']},
+            fields=['id', 'mtu'])
+
     def test__get_sync_floating_ips_no_query(self):
         """Basic test that no query is performed if no router ids are passed"""
         db = l3_db.L3_NAT_dbonly_mixin()
@@ -198,6 +286,35 @@ class TestL3_NAT_dbonly_mixin(base.BaseTestCase):
         with testtools.ExpectedException(n_exc.ServicePortInUse):
             self.db.prevent_l3_port_deletion(mock.Mock(), None)
 
+    def _test__get_floatingip_router_delta(self, floating_ips):
+        ctx = mock.MagicMock()
+        router_db = mock.Mock(revision_number=4)
+        with mock.patch.object(self.db, '_get_router',
+                               return_value=router_db),\
+                mock.patch.object(self.db, '_get_sync_floating_ips',
+                                  return_value=floating_ips) as get_fips:
+            delta = self.db._get_floatingip_router_delta(
+                ctx, 'router_id', 'fip_id')
+        router_db.bump_revision.assert_called_once_with()
+        get_fips.assert_called_once_with(ctx, ['router_id'],
+                                         floatingip_ids=['fip_id'])
+        self.assertEqual('router_id', delta['router_id'])
+        self.assertEqual(4, delta['revision_number'])
+        return delta
+
+    def test__get_floatingip_router_delta_added(self):
+        fip = {'id': 'fip_id', 'router_id': 'router_id'}
+        delta = self._test__get_floatingip_router_delta([fip])
+        self.assertEqual(l3_const.ROUTER_DELTA_FLOATINGIP_ADDED,
+                         delta['type'])
+        self.assertEqual(fip, delta['floatingip'])
+
+    def test__get_floatingip_router_delta_removed(self):
+        delta = self._test__get_floatingip_router_delta([])
+        self.assertEqual(l3_const.ROUTER_DELTA_FLOATINGIP_REMOVED,
+                         delta['type'])
+        self.assertEqual({'id': 'fip_id'}, delta['floatingip'])
+
     @mock.patch.object(l3_db, '_notify_subnetpool_address_scope_update')
     def test_subscribe_address_scope_of_subnetpool(self, notify):
         l3_db.L3RpcNotifierMixin._subscribe_callbacks()
@@ -243,6 +360,40 @@ class L3_NAT_db_mixin(base.BaseTestCase):
                 self.assertFalse(urgi.called)
                 self.assertFalse(nru.called)
 
+    def _test_update_floatingip_notify(self, delta_updates):
+        self.db._l3_rpc_notifier = mock.Mock()
+        cfg.CONF.set_override('router_delta_updates', delta_updates)
+        old_fip = {'id': 'fip_id', 'router_id': 'r1'}
+        new_fip = {'id': 'fip_id', 'router_id': 'r2'}
+        with mock.patch.object(self.db, '_update_floatingip',
+                               return_value=(old_fip, new_fip)),\
+                mock.patch.object(self.db, '_get_floatingip_router_delta',
+                                  side_effect=lambda ctx, r, f: r):
+            self.db.update_floatingip(mock.sentinel.ctx, 'fip_id', {})
+        return self.db.l3_rpc_notifier
+
+    def test_update_floatingip_notifies_routers_updated(self):
+        notifier = self._test_update_floatingip_notify(False)
+        self.assertFalse(notifier.routers_delta_updated.called)
+        router_ids = notifier.routers_updated.call_args[0][1]
+        self.assertEqual({'r1', 'r2'}, set(router_ids))
+
+    def test_update_floatingip_notifies_router_deltas(self):
+        notifier = self._test_update_floatingip_notify(True)
+        self.assertFalse(notifier.routers_updated.called)
+        deltas = notifier.routers_delta_updated.call_args[0][1]
+        self.assertEqual({'r1', 'r2'}, set(deltas))
+
+    def test_notify_floatingip_routers_updated_router_not_found(self):
+        self.db._l3_rpc_notifier = mock.Mock()
+        cfg.CONF.set_override('router_delta_updates', True)
+        with mock.patch.object(self.db, '_get_floatingip_router_delta',
+                               side_effect=l3.RouterNotFound(
+                                   router_id='r1')):
+            self.db.notify_floatingip_routers_updated(
+                mock.sentinel.ctx, ['r1', None], 'fip_id')
+        self.assertFalse(self.db.l3_rpc_notifier.routers_delta_updated.called)
+
     def test_create_router_no_gateway(self):
         self._test_create_router()
 
@@ -230,7 +230,8 @@ class L3HATestCase(L3HATestFramework):
         # store shorter name for readability
         get_method = self.plugin._get_active_l3_agent_routers_sync_data
         # r1 should be hidden
-        expected = [self.plugin.get_router(self.admin_ctx, r2['id'])]
+        expected = [dict(self.plugin.get_router(self.admin_ctx, r2['id']),
+                         revision_number=mock.ANY)]
         self.assertEqual(expected, get_method(self.admin_ctx, None, None,
                                               [r1['id'], r2['id']]))
         # but once it transitions back, all is well in the world again!
@@ -32,6 +32,9 @@ class TestStatusBarriers(testlib_api.SqlTestCase):
         self.port = self._make_port()
         registry.subscribe(self.provisioned, resources.PORT,
                            pb.PROVISIONING_COMPLETE)
+        self.bulk_provisioned = mock.Mock()
+        registry.subscribe(self.bulk_provisioned, resources.PORT,
+                           pb.BULK_PROVISIONING_COMPLETE)
 
     def _make_net(self):
         with self.ctx.session.begin():
@@ -94,6 +97,81 @@ class TestStatusBarriers(testlib_api.SqlTestCase):
                                  resources.PORT, 'entity2')
         self.assertFalse(self.provisioned.called)
 
+    def test_bulk_provisioning_complete(self):
+        ports = [self.port] + [self._make_port() for i in range(3)]
+        for port in ports:
+            pb.add_provisioning_component(self.ctx, port.id, resources.PORT,
+                                          'entity1')
+        # the last port is also waiting for another entity
+        pb.add_provisioning_component(self.ctx, ports[-1].id, resources.PORT,
+                                      'entity2')
+        port_ids = [port.id for port in ports]
+        pb.bulk_provisioning_complete(self.ctx, port_ids + ['xyz'],
+                                      resources.PORT, 'entity1')
+        self.provisioned.assert_has_calls(
+            [mock.call(resources.PORT, pb.PROVISIONING_COMPLETE, mock.ANY,
+                       context=self.ctx, object_id=port_id)
+             for port_id in port_ids[:-1]])
+        self.assertEqual(3, self.provisioned.call_count)
+        self.bulk_provisioned.assert_called_once_with(
+            resources.PORT, pb.BULK_PROVISIONING_COMPLETE, mock.ANY,
+            context=self.ctx, object_ids=port_ids[:-1])
+        for port_id in port_ids[:-1]:
+            self.assertFalse(pb.is_object_blocked(self.ctx, port_id,
+                                                  resources.PORT))
+        self.assertTrue(pb.is_object_blocked(self.ctx, port_ids[-1],
+                                             resources.PORT))
+
+    def test_bulk_provisioning_complete_chunks(self):
+        ports = [self.port] + [self._make_port() for i in range(4)]
+        for port in ports:
+            pb.add_provisioning_component(self.ctx, port.id, resources.PORT,
+                                          'entity1')
+        with mock.patch.object(pb, '_BULK_QUERY_SIZE', 2):
+            pb.bulk_provisioning_complete(self.ctx,
+                                          [port.id for port in ports],
+                                          resources.PORT, 'entity1')
+        self.assertEqual(5, self.provisioned.call_count)
+        for port in ports:
+            self.assertFalse(pb.is_object_blocked(self.ctx, port.id,
+                                                  resources.PORT))
+
+    def test_bulk_provisioning_complete_all_blocked(self):
+        pb.add_provisioning_component(self.ctx, self.port.id, resources.PORT,
+                                      'entity1')
+        pb.add_provisioning_component(self.ctx, self.port.id, resources.PORT,
+                                      'entity2')
+        pb.bulk_provisioning_complete(self.ctx, [self.port.id],
+                                      resources.PORT, 'entity1')
+        self.assertFalse(self.provisioned.called)
+        self.assertFalse(self.bulk_provisioned.called)
+
+    def test_provisioning_complete_bulk_event(self):
+        pb.provisioning_complete(self.ctx, self.port.id, resources.PORT,
+                                 'entity')
+        self.bulk_provisioned.assert_called_once_with(
+            resources.PORT, pb.BULK_PROVISIONING_COMPLETE, mock.ANY,
+            context=self.ctx, object_ids=[self.port.id])
+
+    def test_get_blocked_object_ids(self):
+        ports = [self.port] + [self._make_port() for i in range(3)]
+        for port in ports[1:]:
+            pb.add_provisioning_component(self.ctx, port.id, resources.PORT,
+                                          'entity1')
+        pb.add_provisioning_component(self.ctx, ports[1].id, resources.PORT,
+                                      'entity2')
+        with mock.patch.object(pb, '_BULK_QUERY_SIZE', 2):
+            blocked = pb.get_blocked_object_ids(
+                self.ctx, [port.id for port in ports[:3]] + ['xyz'],
+                resources.PORT)
+        self.assertEqual(set([ports[1].id, ports[2].id]), blocked)
+
+    def test_bulk_provisioning_complete_in_transaction(self):
+        with self.ctx.session.begin():
+            self.assertRaises(RuntimeError, pb.bulk_provisioning_complete,
+                              self.ctx, [self.port.id], resources.PORT,
+                              'entity1')
+
     def test_is_object_blocked(self):
         pb.add_provisioning_component(self.ctx, self.port.id, resources.PORT,
                                       'e1')
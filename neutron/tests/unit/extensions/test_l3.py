@@ -3700,6 +3700,43 @@ class TestL3DbOperationBounds(test_db_base_plugin_v2.DbOperationBoundMixin,
             self._assert_object_list_queries_constant(float_maker,
                                                       'floatingips')
 
+    def _sync_data_and_count_queries(self, router_ids):
+        plugin = manager.NeutronManager.get_service_plugins()[
+            service_constants.L3_ROUTER_NAT]
+        self._db_execute_count = 0
+        routers = plugin.get_sync_data(context.get_admin_context(),
+                                       router_ids)
+        self.assertEqual(len(router_ids), len(routers))
+        return self._db_execute_count
+
+    def test_router_sync_data_queries_constant(self):
+        with self.subnet(**self.kwargs) as s:
+            self._set_net_external(s['subnet']['network_id'])
+            router_ids = []
+
+            def router_maker():
+                ext_info = {'network_id': s['subnet']['network_id']}
+                router = self._make_router(self.fmt,
+                                           external_gateway_info=ext_info,
+                                           **self.kwargs)
+                network = self._make_network(self.fmt, 'net', True,
+                                             **self.kwargs)
+                cidr = '10.1.%d.0/24' % len(router_ids)
+                subnet = self._make_subnet(
+                    self.fmt, network, netaddr.IPNetwork(cidr)[1], cidr,
+                    dns_nameservers=['8.8.8.8', '8.8.4.4'], **self.kwargs)
+                self._router_interface_action(
+                    'add', router['router']['id'],
+                    subnet['subnet']['id'], None)
+                router_ids.append(router['router']['id'])
+
+            router_maker()
+            before_count = self._sync_data_and_count_queries(router_ids)
+            # one more router shouldn't change the db query count
+            router_maker()
+            self.assertEqual(before_count,
+                             self._sync_data_and_count_queries(router_ids))
+
 
 class TestL3DbOperationBoundsTenant(TestL3DbOperationBounds):
     admin = False
@@ -240,6 +240,27 @@ class TestCommonAgentLoop(base.BaseTestCase):
         self._test_scan_devices(previous, updated, fake_current, expected,
                                 sync=False, fake_ts_current={2: 1000})
 
+    def test_scan_devices_without_polling_required(self):
+        previous = {'current': set([1, 2]),
+                    'updated': set(),
+                    'added': set(),
+                    'removed': set(),
+                    'timestamps': {2: 600}}
+        self.agent.mgr = mock.Mock()
+        self.agent.rpc_callbacks.get_and_clear_updated_devices.return_value =\
+            set([2, 3])
+        results = self.agent.scan_devices(previous, sync=False,
+                                          polling_required=False)
+        expected = {'current': set([1, 2]),
+                    'updated': set([2]),
+                    'added': set(),
+                    'removed': set(),
+                    'timestamps': {2: 600}}
+        self.assertEqual(expected, results)
+        self.assertFalse(self.agent.mgr.get_all_devices.called)
+        self.assertFalse(
+            self.agent.mgr.get_devices_modified_timestamps.called)
+
     def test_scan_devices_added_removed(self):
         previous = {'current': set([1, 2]),
                     'updated': set(),
@@ -1058,6 +1058,79 @@ class TestLinuxBridgeRpcCallbacks(base.BaseTestCase):
         cfg.CONF.set_override('arp_responder', True, 'VXLAN')
         self._test_fdb_remove(proxy_enabled=True)
 
+    def _test_fdb_add_batch(self, proxy_enabled=False):
+        cfg.CONF.set_override('batch_fdb_updates', True, 'VXLAN')
+        fdb_entries = {'net_id':
+                       {'ports':
+                        {'agent_ip': [constants.FLOODING_ENTRY,
+                                      ['port_mac', 'port_ip'],
+                                      ['known_mac', 'known_ip']],
+                         'agent_ip2': [constants.FLOODING_ENTRY],
+                         LOCAL_IP: [constants.FLOODING_ENTRY]},
+                        'network_type': 'vxlan',
+                        'segment_id': 1}}
+        fdb_show = ('known_mac dst agent_ip self permanent\n'
+                    'learned_mac master brqnet_id\n')
+        neigh_show = 'known_ip lladdr known_mac PERMANENT\n'
+
+        def execute(cmd, **kwargs):
+            if cmd[:3] == ['bridge', 'fdb', 'show']:
+                return fdb_show
+            if cmd[:3] == ['ip', 'neigh', 'show']:
+                return neigh_show
+            return ''
+
+        with mock.patch.object(utils, 'execute',
+                               side_effect=execute) as execute_fn, \
+                mock.patch.object(ip_lib.IpNeighCommand, 'add',
+                                  return_value='') as add_fn:
+            self.lb_rpc.fdb_add(None, fdb_entries)
+
+            batch_calls = [c for c in execute_fn.call_args_list
+                           if c[0][0][:2] == ['bridge', '-force']]
+            self.assertEqual(1, len(batch_calls))
+            lines = batch_calls[0][1]['process_input'].splitlines()
+            self.assertEqual(3, len(lines))
+            self.assertIn('fdb replace port_mac dev vxlan-1 dst agent_ip',
+                          lines)
+            flooding = [line for line in lines
+                        if constants.FLOODING_ENTRY[0] in line]
+            self.assertEqual(
+                sorted(['add', 'append']),
+                sorted(line.split()[1] for line in flooding))
+            self.assertFalse(any(LOCAL_IP in line for line in lines))
+            if proxy_enabled:
+                add_fn.assert_called_once_with('port_ip', 'port_mac')
+            else:
+                add_fn.assert_not_called()
+
+    def test_fdb_add_batch(self):
+        self._test_fdb_add_batch(proxy_enabled=False)
+
+    def test_fdb_add_batch_with_arp_responder(self):
+        cfg.CONF.set_override('arp_responder', True, 'VXLAN')
+        self._test_fdb_add_batch(proxy_enabled=True)
+
+    def test_fdb_remove_batch(self):
+        cfg.CONF.set_override('batch_fdb_updates', True, 'VXLAN')
+        fdb_entries = {'net_id':
+                       {'ports':
+                        {'agent_ip': [constants.FLOODING_ENTRY,
+                                      ['port_mac', 'port_ip']]},
+                        'network_type': 'vxlan',
+                        'segment_id': 1}}
+
+        with mock.patch.object(utils, 'execute',
+                               return_value='') as execute_fn:
+            self.lb_rpc.fdb_remove(None, fdb_entries)
+
+            execute_fn.assert_called_once_with(
+                ['bridge', '-force', '-batch', '-'],
+                process_input='fdb delete %s dev vxlan-1 dst agent_ip\n'
+                              'fdb delete port_mac dev vxlan-1 '
+                              'dst agent_ip\n' % constants.FLOODING_ENTRY[0],
+                run_as_root=True, check_exit_code=False)
+
     def _test_fdb_update_chg_ip(self, proxy_enabled=False):
         fdb_entries = {'chg_ip':
                        {'net_id':
@@ -476,6 +476,45 @@ class TestEmbSwitch(base.BaseTestCase):
             result = self.emb_switch.get_pci_device(self.WRONG_PCI_SLOT)
             self.assertIsNone(result)
 
+    def test_vf_details_read_once_per_loop(self):
+        vf_count = 63
+        scanned_devices = [('0000:06:%02x.1' % i, i) for i in range(vf_count)]
+        link_show = '\n'.join(
+            ['2: eth2: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500'] +
+            ['    vf %d MAC 00:00:00:00:00:%02x, spoof checking on, '
+             'link-state enable' % (i, i) for i in range(vf_count)])
+        with mock.patch("neutron.plugins.ml2.drivers.mech_sriov.agent."
+                        "eswitch_manager.PciOsWrapper.scan_vf_devices",
+                        return_value=scanned_devices):
+            emb_switch = esm.EmbSwitch(self.PHYS_NET, self.DEV_NAME, set())
+        with mock.patch.object(emb_switch.pci_dev_wrapper, "_as_root",
+                               return_value=link_show) as mock_as_root,\
+                mock.patch("os.listdir", side_effect=OSError()):
+            devices = emb_switch.get_assigned_devices_info()
+            self.assertEqual(vf_count, len(devices))
+            for mac, pci_slot in devices:
+                self.assertTrue(emb_switch.get_device_state(pci_slot))
+                emb_switch.set_device_state(pci_slot, True)
+                emb_switch.set_device_spoofcheck(pci_slot, True)
+            self.assertEqual(1, mock_as_root.call_count)
+
+            emb_switch.clear_vf_cache()
+            emb_switch.get_assigned_devices_info()
+            self.assertEqual(2, mock_as_root.call_count)
+
+    def test_get_assigned_devices_info_macvtap_read_once(self):
+        with mock.patch("os.listdir", return_value=["eth0"]),\
+                mock.patch("neutron.plugins.ml2.drivers.mech_sriov.agent."
+                           "pci_lib.PciDeviceIPWrapper."
+                           "get_macvtap_assigned_interfaces",
+                           return_value=set()) as get_macvtap,\
+                mock.patch("neutron.plugins.ml2.drivers.mech_sriov.agent."
+                           "pci_lib.PciDeviceIPWrapper."
+                           "is_macvtap_assigned") as is_macvtap:
+            self.assertFalse(self.emb_switch.get_assigned_devices_info())
+            self.assertEqual(1, get_macvtap.call_count)
+            self.assertFalse(is_macvtap.called)
+
     def test_get_pci_list(self):
         result = self.emb_switch.get_pci_slot_list()
         self.assertEqual([tup[0] for tup in self.SCANNED_DEVICES],
@@ -557,6 +596,13 @@ class TestPciOsWrapper(base.BaseTestCase):
         esm.PciOsWrapper.is_assigned_vf(self.DEV_NAME, self.VF_INDEX)
         mock_is_macvtap_assigned.called_with(self.VF_INDEX, "eth0")
 
+    @mock.patch("os.listdir", return_value=["eth0", "eth1"])
+    def test_is_assigned_vf_macvtap_ifnames(self, *args):
+        self.assertTrue(esm.PciOsWrapper.is_assigned_vf(
+            self.DEV_NAME, self.VF_INDEX, lambda: {"eth1"}))
+        self.assertFalse(esm.PciOsWrapper.is_assigned_vf(
+            self.DEV_NAME, self.VF_INDEX, lambda: {"eth2"}))
+
     @mock.patch("os.listdir", side_effect=OSError())
     @mock.patch("neutron.plugins.ml2.drivers.mech_sriov.agent.pci_lib."
                 "PciDeviceIPWrapper.is_macvtap_assigned")
@@ -98,6 +98,65 @@ class TestPciLib(base.BaseTestCase):
                               self.pci_wrapper.get_vf_state,
                               self.VF_INDEX)
 
+    def test_get_vf_details_cached(self):
+        with mock.patch.object(self.pci_wrapper,
+                               "_as_root") as mock_as_root:
+            mock_as_root.return_value = self.VF_LINK_SHOW
+            self.pci_wrapper.get_assigned_macs([0, 1, 2])
+            self.assertTrue(self.pci_wrapper.get_vf_state(self.VF_INDEX))
+            self.assertFalse(
+                self.pci_wrapper.get_vf_state(self.VF_INDEX_DISABLE))
+            self.assertEqual(1, mock_as_root.call_count)
+
+            self.pci_wrapper.clear_vf_cache()
+            self.pci_wrapper.get_vf_state(self.VF_INDEX)
+            self.assertEqual(2, mock_as_root.call_count)
+
+    def test_get_vf_state_unknown_vf(self):
+        with mock.patch.object(self.pci_wrapper,
+                               "_as_root") as mock_as_root:
+            mock_as_root.return_value = self.VF_LINK_SHOW
+            self.assertFalse(self.pci_wrapper.get_vf_state(5))
+
+    def test_parse_vf_link_show_rate_and_spoofcheck(self):
+        vf_line = ('vf 3 MAC fa:16:3e:68:4e:79, tx rate 100 (Mbps), '
+                   'max_tx_rate 100Mbps, min_tx_rate 10Mbps, spoof '
+                   'checking on, link-state auto')
+        details = self.pci_wrapper._parse_vf_link_show(vf_line)
+        self.assertEqual({'vf': 3, 'MAC': 'fa:16:3e:68:4e:79',
+                          'link-state': 'auto', 'spoofchk': 'on',
+                          'max_tx_rate': 100, 'min_tx_rate': 10},
+                         details)
+
+    def test_set_vf_state_cached_state_skipped(self):
+        with mock.patch.object(self.pci_wrapper,
+                               "_as_root") as mock_as_root:
+            mock_as_root.return_value = self.VF_LINK_SHOW
+            self.pci_wrapper.get_vf_state(self.VF_INDEX)
+            mock_as_root.reset_mock()
+
+            self.pci_wrapper.set_vf_state(self.VF_INDEX, True)
+            self.pci_wrapper.set_vf_spoofcheck(self.VF_INDEX, False)
+            self.assertFalse(mock_as_root.called)
+
+            self.pci_wrapper.set_vf_state(self.VF_INDEX, False)
+            mock_as_root.assert_called_once_with(
+                [], "link", ("set", self.DEV_NAME, "vf",
+                             str(self.VF_INDEX), "state", "disable"))
+            self.assertFalse(self.pci_wrapper.get_vf_state(self.VF_INDEX))
+            self.assertEqual(1, mock_as_root.call_count)
+
+    def test_set_vf_state_fail_clears_cache(self):
+        with mock.patch.object(self.pci_wrapper,
+                               "_as_root") as mock_as_root:
+            mock_as_root.return_value = self.VF_LINK_SHOW
+            self.pci_wrapper.get_vf_state(self.VF_INDEX)
+            mock_as_root.side_effect = Exception()
+            self.assertRaises(exc.IpCommandDeviceError,
+                              self.pci_wrapper.set_vf_state,
+                              self.VF_INDEX, False)
+            self.assertIsNone(self.pci_wrapper._vf_details)
+
     def test_set_vf_state(self):
         with mock.patch.object(self.pci_wrapper, "_as_root"):
             result = self.pci_wrapper.set_vf_state(self.VF_INDEX,
@@ -196,6 +255,15 @@ class TestPciLib(base.BaseTestCase):
             self.assertFalse(
                 pci_lib.PciDeviceIPWrapper.is_macvtap_assigned('enp129s0f2'))
 
+    def test_get_macvtap_assigned_interfaces(self):
+        with mock.patch.object(pci_lib.PciDeviceIPWrapper,
+                               "_execute") as mock_exec:
+            mock_exec.return_value = '\n'.join(
+                (self.IP_LINK_SHOW_WITH_MACVTAP, self.MACVTAP_LINK_SHOW2))
+            self.assertEqual(
+                {'enp129s0f1', 'p1p2_1'},
+                pci_lib.PciDeviceIPWrapper.get_macvtap_assigned_interfaces())
+
     def test_is_macvtap_assigned_failed(self):
         with mock.patch.object(pci_lib.PciDeviceIPWrapper,
                                "_execute") as mock_exec:
@@ -234,6 +234,42 @@ class Ml2DBTestCase(testlib_api.SqlTestCase):
         port = ml2_db.get_port(self.ctx.session, port_id)
         self.assertIsNone(port)
 
+    def test_get_ports(self):
+        network_id = 'foo-network-id'
+        port_ids = ['foo-port-id-1', 'foo-port-id-2', 'foo-port-id-3']
+        self._setup_neutron_network(network_id)
+        for port_id in port_ids:
+            self._setup_neutron_port(network_id, port_id)
+        self._setup_neutron_portbinding(port_ids[0],
+                                        portbindings.VIF_TYPE_OVS, 'host')
+
+        with mock.patch.object(ml2_db, 'MAX_PORTS_PER_QUERY', 2):
+            ports = ml2_db.get_ports(self.ctx.session,
+                                     port_ids[:2] + ['foo-port-id-4'])
+        ports = {port.id: port for port in ports}
+        self.assertEqual(set(port_ids[:2]), set(ports))
+        self.assertEqual('host', ports[port_ids[0]].port_binding.host)
+        self.assertIsNone(ports[port_ids[1]].port_binding)
+
+    def test_get_binding_levels_by_port(self):
+        network_id = 'foo-network-id'
+        port_ids = ['foo-port-id-1', 'foo-port-id-2']
+        self._setup_neutron_network(network_id)
+        with self.ctx.session.begin(subtransactions=True):
+            for port_id in port_ids:
+                self._setup_neutron_port(network_id, port_id)
+                for level in (1, 0):
+                    self.ctx.session.add(models.PortBindingLevel(
+                        port_id=port_id, host='host', level=level,
+                        driver='driver%d' % level))
+
+        levels = ml2_db.get_binding_levels_by_port(self.ctx.session,
+                                                   port_ids[:1])
+        self.assertEqual([(port_ids[0], 'host')], list(levels))
+        self.assertEqual(['driver0', 'driver1'],
+                         [level.driver
+                          for level in levels[(port_ids[0], 'host')]])
+
     def test_get_port_from_device_mac(self):
         network_id = 'foo-network-id'
         port_id = 'foo-port-id'
@@ -641,18 +641,72 @@ class TestMl2DbOperationBoundsTenant(TestMl2DbOperationBounds):
 
 class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
 
-    def test__port_provisioned_with_blocks(self):
+    def _make_bound_ports(self, network, count=2):
+        host_arg = {portbindings.HOST_ID: 'host-ovs-no_filter'}
+        port_ids = [self._make_port(self.fmt, network['network']['id'],
+                                    arg_list=(portbindings.HOST_ID,),
+                                    **host_arg)['port']['id']
+                    for i in range(count)]
+        self.assertEqual([constants.PORT_STATUS_DOWN] * count,
+                         self._get_statuses(port_ids))
+        return port_ids
+
+    def _get_statuses(self, port_ids):
         plugin = manager.NeutronManager.get_plugin()
-        ups = mock.patch.object(plugin, 'update_port_status').start()
-        with self.port() as port:
-            mock.patch('neutron.plugins.ml2.plugin.db.get_port').start()
-            provisioning_blocks.add_provisioning_component(
-                self.context, port['port']['id'], 'port', 'DHCP')
-            plugin._port_provisioned('port', 'evt', 'trigger',
-                                     self.context, port['port']['id'])
-        self.assertFalse(ups.called)
+        return [plugin.get_port(self.context, port_id)['status']
+                for port_id in port_ids]
 
-    def test__port_provisioned_no_binding(self):
+    def test__ports_provisioned(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as network:
+            port_ids = self._make_bound_ports(network)
+            with mock.patch.object(ml2_plugin.registry, 'notify') as notify:
+                plugin._ports_provisioned('port', 'evt', 'trigger',
+                                          self.context, port_ids)
+            self.assertEqual([constants.PORT_STATUS_ACTIVE] * 2,
+                             self._get_statuses(port_ids))
+            self.assertEqual(
+                port_ids,
+                [c[1]['port']['id'] for c in notify.call_args_list
+                 if c[0][:2] == ('port', events.AFTER_UPDATE)])
+
+    def test__ports_provisioned_with_blocks(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as network:
+            port_ids = self._make_bound_ports(network)
+            provisioning_blocks.add_provisioning_component(
+                self.context, port_ids[1], 'port', 'DHCP')
+            plugin._ports_provisioned('port', 'evt', 'trigger',
+                                      self.context, port_ids)
+            self.assertEqual([constants.PORT_STATUS_ACTIVE,
+                              constants.PORT_STATUS_DOWN],
+                             self._get_statuses(port_ids))
+
+    def test__ports_provisioned_one_transaction(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as network:
+            port_ids = self._make_bound_ports(network, count=3)
+            with mock.patch.object(plugin, 'update_port_status') as ups:
+                plugin._ports_provisioned('port', 'evt', 'trigger',
+                                          self.context, port_ids)
+            self.assertFalse(ups.called)
+            self.assertEqual([constants.PORT_STATUS_ACTIVE] * 3,
+                             self._get_statuses(port_ids))
+
+    def test__ports_provisioned_fall_back_to_each_port(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.network() as network:
+            port_ids = self._make_bound_ports(network)
+            with mock.patch.object(
+                    plugin.mechanism_manager, 'update_port_precommit',
+                    side_effect=[ml2_exc.MechanismDriverError(
+                        method='update_port_precommit'), None, None]):
+                plugin._ports_provisioned('port', 'evt', 'trigger',
+                                          self.context, port_ids)
+            self.assertEqual([constants.PORT_STATUS_ACTIVE] * 2,
+                             self._get_statuses(port_ids))
+
+    def test__ports_provisioned_no_binding(self):
         plugin = manager.NeutronManager.get_plugin()
         with self.network() as net:
             net_id = net['network']['id']
@@ -660,13 +714,16 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
         port_db = models_v2.Port(
             id=port_id, tenant_id='tenant', network_id=net_id,
             mac_address='08:00:01:02:03:04', admin_state_up=True,
-            status='ACTIVE', device_id='vm_id',
+            status='DOWN', device_id='vm_id',
             device_owner=DEVICE_OWNER_COMPUTE
         )
         with self.context.session.begin():
             self.context.session.add(port_db)
-        self.assertIsNone(plugin._port_provisioned('port', 'evt', 'trigger',
-                                                   self.context, port_id))
+        with mock.patch.object(plugin.mechanism_manager,
+                               'update_port_precommit') as precommit:
+            plugin._ports_provisioned('port', 'evt', 'trigger',
+                                      self.context, [port_id, 'missing'])
+        self.assertFalse(precommit.called)
 
     def test_create_router_port_and_fail_create_postcommit(self):
 
@@ -1290,6 +1347,28 @@ class Test_GetNetworkMtu(Ml2PluginV2TestCase):
         }
         self.assertEqual(1300, plugin._get_network_mtu(net))
 
+    def test_get_networks_mtu(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self._register_type_driver_with_mtu('driver1', 1400)
+        self._register_type_driver_with_mtu('driver2', 1300)
+        segments = {'net1': [{driver_api.NETWORK_TYPE: 'driver1',
+                              driver_api.PHYSICAL_NETWORK: 'physnet1',
+                              driver_api.SEGMENTATION_ID: None}],
+                    'net2': [{driver_api.NETWORK_TYPE: 'driver1',
+                              driver_api.PHYSICAL_NETWORK: 'physnet1',
+                              driver_api.SEGMENTATION_ID: None},
+                             {driver_api.NETWORK_TYPE: 'driver2',
+                              driver_api.PHYSICAL_NETWORK: 'physnet2',
+                              driver_api.SEGMENTATION_ID: None}],
+                    'net3': []}
+        with mock.patch.object(segments_db, 'get_networks_segments',
+                               return_value=segments) as get_segments:
+            mtus = plugin.get_networks_mtu(self.context,
+                                           ['net1', 'net2', 'net3'])
+        self.assertEqual({'net1': 1400, 'net2': 1300, 'net3': 0}, mtus)
+        get_segments.assert_called_once_with(self.context.session,
+                                             ['net1', 'net2', 'net3'])
+
 
 class TestMl2DvrPortsV2(TestMl2PortsV2):
     def setUp(self):
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the time and queries get_sync_data takes to build the routers
+
+Routers with a gateway and interfaces on dual subnet networks are created in
+the in-memory sqlite database of the unit tests, and get_sync_data is then
+called for all of them. The time spent building the interfaces and populating
+the ports with their subnets and MTUs is reported separately, e.g.:
+
+    l3_sync_data_benchmark.py --routers 150 --interfaces 2 --runs 5
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+import unittest
+
+import netaddr
+from oslo_config import cfg
+from oslo_utils import timeutils
+
+from neutron import context
+from neutron.tests.unit.db import test_db_base_plugin_v2
+from neutron.tests.unit.extensions import test_l3
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--routers', type=int, default=150,
+                        help='Number of routers to sync.')
+    parser.add_argument('--interfaces', type=int, default=2,
+                        help='Number of interfaces of each router.')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Number of get_sync_data calls to average.')
+    return parser.parse_args()
+
+
+def timed(timings, name, func):
+    def wrapper(*args, **kwargs):
+        watch = timeutils.StopWatch().start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[name] = timings.get(name, 0) + watch.elapsed()
+    return wrapper
+
+
+class SyncDataBenchmark(test_db_base_plugin_v2.DbOperationBoundMixin,
+                        test_l3.L3AgentDbIntTestCase):
+
+    args = None
+
+    def setUp(self):
+        super(SyncDataBenchmark, self).setUp()
+        for resource in ('network', 'subnet', 'port', 'router'):
+            cfg.CONF.set_override('quota_%s' % resource, -1, 'QUOTAS')
+
+    def _create_routers(self, ext_net_id):
+        router_ids = []
+        for i in range(self.args.routers):
+            router = self._make_router(
+                self.fmt, None,
+                external_gateway_info={'network_id': ext_net_id})
+            for j in range(self.args.interfaces):
+                network = self._make_network(self.fmt, 'net', True)
+                index = i * self.args.interfaces + j
+                cidr = netaddr.IPNetwork('10.%d.%d.0/24' % (index // 256,
+                                                            index % 256))
+                subnet = self._make_subnet(
+                    self.fmt, network, str(cidr[1]), str(cidr),
+                    dns_nameservers=['8.8.8.8', '8.8.4.4'])
+                cidr = netaddr.IPNetwork('fd00:%x::/64' % index)
+                self._create_subnet(
+                    self.fmt, net_id=network['network']['id'],
+                    tenant_id=network['network']['tenant_id'],
+                    cidr=str(cidr), gateway_ip=str(cidr[1]), ip_version=6)
+                self._router_interface_action(
+                    'add', router['router']['id'],
+                    subnet['subnet']['id'], None)
+            router_ids.append(router['router']['id'])
+        return router_ids
+
+    def runTest(self):
+        with self.subnet(cidr='172.16.0.0/16') as s:
+            self._set_net_external(s['subnet']['network_id'])
+            router_ids = self._create_routers(s['subnet']['network_id'])
+
+            ctx = context.get_admin_context()
+            # The first call is left out of the measurement
+            self.assertEqual(len(router_ids),
+                             len(self.plugin.get_sync_data(ctx, router_ids)))
+
+            timings = {}
+            for name in ('_get_sync_routers', '_get_sync_interfaces',
+                         '_get_sync_floating_ips',
+                         '_populate_mtu_and_subnets_for_ports',
+                         '_get_mtus_by_network_list',
+                         '_get_subnets_by_network_list'):
+                self.patch_method(name, timings)
+            self._db_execute_count = 0
+            watch = timeutils.StopWatch().start()
+            for _ in range(self.args.runs):
+                self.plugin.get_sync_data(ctx, router_ids)
+            elapsed = watch.elapsed()
+
+        runs = float(self.args.runs)
+        print('routers: %d with %d interface(s) each' %
+              (self.args.routers, self.args.interfaces))
+        print('get_sync_data: %.3fs, %d queries per call' %
+              (elapsed / runs, self._db_execute_count / runs))
+        for name, seconds in sorted(timings.items()):
+            print('  %s: %.3fs' % (name, seconds / runs))
+
+    def patch_method(self, name, timings):
+        func = getattr(self.plugin, name)
+        setattr(self.plugin, name, timed(timings, name, func))
+        self.addCleanup(delattr, self.plugin, name)
+
+
+def main():
+    SyncDataBenchmark.args = parse_args()
+    result = unittest.TextTestRunner(verbosity=0).run(SyncDataBenchmark())
+    return 0 if result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the throughput of the commands run as root by the agents
+
+The commands are executed with neutron.agent.linux.utils.execute from
+concurrent greenthreads, either by forking the root helper for each command
+or through root_helper_daemon with a given number of daemons, e.g.:
+
+    rootwrap_benchmark.py --root-helper 'sudo neutron-rootwrap /etc/neutron/rootwrap.conf'
+    rootwrap_benchmark.py --root-helper-daemon 'sudo neutron-rootwrap-daemon /etc/neutron/rootwrap.conf' --daemons 4
+"""  # noqa
+
+from __future__ import print_function
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa
+import shlex  # noqa
+
+from oslo_config import cfg  # noqa
+from oslo_utils import timeutils  # noqa
+
+from neutron.agent.common import config  # noqa
+from neutron.agent.linux import utils  # noqa
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--root-helper', default='sudo')
+    parser.add_argument('--root-helper-daemon')
+    parser.add_argument('--daemons', type=int, default=1,
+                        help='Number of root helper daemons.')
+    parser.add_argument('--count', type=int, default=10000,
+                        help='Number of commands to execute.')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Number of greenthreads executing commands.')
+    parser.add_argument('--command', action='append',
+                        help='Command to execute, may be repeated to '
+                             'execute several commands in turn. Defaults to '
+                             '"ip link show lo" and "iptables-save".')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config.register_root_helper(cfg.CONF)
+    cfg.CONF([], project='neutron')
+    cfg.CONF.set_override('root_helper', args.root_helper, 'AGENT')
+    cfg.CONF.set_override('root_helper_daemon', args.root_helper_daemon,
+                          'AGENT')
+    cfg.CONF.set_override('root_helper_daemon_pool_size', args.daemons,
+                          'AGENT')
+    commands = [shlex.split(command) for command in
+                args.command or ['ip link show lo', 'iptables-save']]
+
+    # Spawn the daemons outside of the measurement
+    pool = eventlet.GreenPool(args.concurrency)
+    for i in range(args.daemons if args.root_helper_daemon else 0):
+        pool.spawn(utils.execute, commands[0], run_as_root=True)
+    pool.waitall()
+
+    latencies = []
+
+    def execute(cmd):
+        watch = timeutils.StopWatch().start()
+        utils.execute(cmd, run_as_root=True)
+        latencies.append(watch.elapsed())
+
+    watch = timeutils.StopWatch().start()
+    for i in range(args.count):
+        pool.spawn(execute, commands[i % len(commands)])
+    pool.waitall()
+    elapsed = watch.elapsed()
+
+    latencies.sort()
+    print('mode: %s' % ('%d daemon(s)' % args.daemons
+                        if args.root_helper_daemon else 'fork per command'))
+    print('commands: %d in %.2fs, %.1f commands/s' %
+          (args.count, elapsed, args.count / elapsed))
+    print('latency: p50 %.1fms, p99 %.1fms, max %.1fms' %
+          (latencies[len(latencies) // 2] * 1000,
+           latencies[int(len(latencies) * 0.99)] * 1000,
+           latencies[-1] * 1000))
+
+
+if __name__ == '__main__':
+    main()